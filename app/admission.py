@@ -0,0 +1,101 @@
+"""
+Admission control for expensive endpoints.
+
+Each controller counts the requests it has admitted and not yet finished
+(including those still waiting for a worker thread) and keeps an EWMA of
+their latency. A request is rejected up front with OverloadedError (503 +
+Retry-After) when
+
+- MAX_IN_FLIGHT requests are already in flight, or
+- at least half of that is in flight and the EWMA latency is above the
+  latency target, i.e. a queue is building up.
+
+Rejecting early is cheap; admitting work that finishes after the caller
+has given up wastes the LLM call and the DB write.
+"""
+
+import math
+import os
+import threading
+import time
+
+from app.core.errors import OverloadedError
+
+ENABLED = os.getenv("LOAD_SHEDDING", "1") == "1"
+
+EWMA_ALPHA = 0.2
+MAX_RETRY_AFTER_SECONDS = 30
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_in_flight: int, latency_target: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.latency_target = latency_target
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latency: float | None = None
+        self._admitted = 0
+        self._rejected = 0
+
+    def _overloaded(self) -> bool:
+        if self._in_flight >= self.max_in_flight:
+            return True
+        # Below half capacity requests are always admitted, so the latency
+        # estimate keeps getting fresh samples once load drops.
+        return (
+            self._in_flight * 2 >= self.max_in_flight
+            and self._latency is not None
+            and self._latency > self.latency_target
+        )
+
+    def _retry_after(self) -> int:
+        # Roughly the time the work already in flight needs to drain.
+        latency = self._latency or self.latency_target
+        drain = latency * self._in_flight / self.max_in_flight
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(drain)))
+
+    def enter(self) -> float:
+        with self._lock:
+            if self._overloaded():
+                self._rejected += 1
+                raise OverloadedError(
+                    "Server is overloaded, retry later",
+                    retry_after=self._retry_after(),
+                )
+            self._in_flight += 1
+            self._admitted += 1
+        return time.monotonic()
+
+    def exit(self, started: float) -> None:
+        latency = time.monotonic() - started
+        with self._lock:
+            self._in_flight -= 1
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += EWMA_ALPHA * (latency - self._latency)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "latency_ewma_ms": round((self._latency or 0.0) * 1000, 2),
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+            }
+
+
+runs = AdmissionController(
+    "runs",
+    max_in_flight=int(os.getenv("RUNS_MAX_IN_FLIGHT", "32")),
+    latency_target=float(os.getenv("RUNS_LATENCY_TARGET_SECONDS", "2.0")),
+)
+
+lists = AdmissionController(
+    "lists",
+    max_in_flight=int(os.getenv("LISTS_MAX_IN_FLIGHT", "64")),
+    latency_target=float(os.getenv("LISTS_LATENCY_TARGET_SECONDS", "1.0")),
+)
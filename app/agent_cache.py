@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Callable
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from app.db.models import Agent, Tool
+
+MAX_ENTRIES = 10_000
+
+# How often a worker re-reads a tenant's version from the DB. Changes made
+# through this process are invalidated immediately; changes made by other
+# workers become visible within this interval.
+VERSION_CHECK_INTERVAL_SECONDS = 1.0
+
+_AGENT_FIELDS = ("name", "role", "description", "tools")
+_TOOL_FIELDS = ("name",)
+
+_VERSION_SQL = text("SELECT version FROM cache_versions WHERE tenant_id = :tenant_id")
+_BUMP_SQL = text(
+    "INSERT INTO cache_versions (tenant_id, version) VALUES (:tenant_id, 1) "
+    "ON CONFLICT (tenant_id) DO UPDATE SET version = cache_versions.version + 1 "
+    "RETURNING version"
+)
+
+_PENDING = "agent_cache_pending"
+
+
+@dataclass(frozen=True, slots=True)
+class AgentSnapshot:
+    id: int
+    tenant_id: str
+    name: str
+    role: str
+    description: str
+    tool_ids: tuple[int, ...]
+    tool_names: tuple[str, ...]
+
+    @classmethod
+    def from_agent(cls, agent: Agent) -> "AgentSnapshot":
+        tools = sorted(agent.tools, key=lambda t: t.id)
+        return cls(
+            id=agent.id,
+            tenant_id=agent.tenant_id,
+            name=agent.name,
+            role=agent.role,
+            description=agent.description,
+            tool_ids=tuple(t.id for t in tools),
+            tool_names=tuple(t.name for t in tools),
+        )
+
+
+class AgentCache:
+    """
+    Tenant-scoped LRU cache of agent snapshots.
+
+    Entries are dropped precisely when an agent, or a tool it uses, is
+    changed or deleted through an ORM session in this process. Other
+    workers' changes are picked up through the cache_versions table.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, int], AgentSnapshot] = OrderedDict()
+        self._by_tool: dict[tuple[str, int], set[int]] = {}
+        # Bumped on every local invalidation so that a load which raced
+        # with a write does not store what it read.
+        self._generation: dict[str, int] = {}
+        # tenant_id -> (last seen DB version, monotonic time of the check)
+        self._versions: dict[str, tuple[int, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        db: Session,
+        tenant_id: str,
+        agent_id: int,
+        load: Callable[[], AgentSnapshot | None],
+    ) -> AgentSnapshot | None:
+        self._sync_version(db, tenant_id)
+
+        key = (tenant_id, agent_id)
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+            generation = self._generation.get(tenant_id, 0)
+
+        snapshot = load()
+
+        if snapshot is not None:
+            with self._lock:
+                if self._generation.get(tenant_id, 0) == generation:
+                    self._put(key, snapshot)
+        return snapshot
+
+    def invalidate(
+        self,
+        tenant_id: str,
+        agent_ids: set[int],
+        tool_ids: set[int],
+        new_version: int | None = None,
+    ) -> None:
+        with self._lock:
+            self._generation[tenant_id] = self._generation.get(tenant_id, 0) + 1
+
+            affected = set(agent_ids)
+            for tool_id in tool_ids:
+                affected |= self._by_tool.get((tenant_id, tool_id), set())
+            for agent_id in affected:
+                self._remove((tenant_id, agent_id))
+
+            # Our own bump: skip the tenant-wide drop on the next check.
+            known = self._versions.get(tenant_id)
+            if new_version is not None and known and known[0] == new_version - 1:
+                self._versions[tenant_id] = (new_version, known[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_tool.clear()
+            self._generation.clear()
+            self._versions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _sync_version(self, db: Session, tenant_id: str) -> None:
+        now = time.monotonic()
+        known = self._versions.get(tenant_id)
+        if known and now - known[1] < VERSION_CHECK_INTERVAL_SECONDS:
+            return
+
+        version = db.execute(_VERSION_SQL, {"tenant_id": tenant_id}).scalar() or 0
+
+        with self._lock:
+            if known is not None and known[0] != version:
+                for key in [k for k in self._entries if k[0] == tenant_id]:
+                    self._remove(key)
+                self._generation[tenant_id] = self._generation.get(tenant_id, 0) + 1
+            self._versions[tenant_id] = (version, now)
+
+    def _put(self, key: tuple[str, int], snapshot: AgentSnapshot) -> None:
+        self._remove(key)
+        self._entries[key] = snapshot
+        for tool_id in snapshot.tool_ids:
+            self._by_tool.setdefault((key[0], tool_id), set()).add(key[1])
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple[str, int]) -> None:
+        snapshot = self._entries.pop(key, None)
+        if snapshot is None:
+            return
+        for tool_id in snapshot.tool_ids:
+            agents = self._by_tool.get((key[0], tool_id))
+            if agents is not None:
+                agents.discard(key[1])
+                if not agents:
+                    del self._by_tool[(key[0], tool_id)]
+
+
+agent_cache = AgentCache()
+
+
+def _changed(obj, fields: tuple[str, ...]) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[f].history.has_changes() for f in fields)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session: Session, flush_context) -> None:
+    changed: dict[str, tuple[set[int], set[int]]] = {}
+
+    for obj in chain(session.dirty, session.deleted):
+        deleted = obj in session.deleted
+        if isinstance(obj, Agent) and (deleted or _changed(obj, _AGENT_FIELDS)):
+            changed.setdefault(obj.tenant_id, (set(), set()))[0].add(obj.id)
+        elif isinstance(obj, Tool) and (deleted or _changed(obj, _TOOL_FIELDS)):
+            # Tool deletes cascade through agent_tools, so every agent that
+            # used the tool is invalidated via the cache's tool index.
+            changed.setdefault(obj.tenant_id, (set(), set()))[1].add(obj.id)
+
+    if not changed:
+        return
+
+    pending = session.info.setdefault(_PENDING, {})
+    conn = session.connection()
+    for tenant_id, (agent_ids, tool_ids) in changed.items():
+        version = conn.execute(_BUMP_SQL, {"tenant_id": tenant_id}).scalar()
+        entry = pending.setdefault(tenant_id, [set(), set(), None])
+        entry[0] |= agent_ids
+        entry[1] |= tool_ids
+        entry[2] = version
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    for tenant_id, (agent_ids, tool_ids, version) in session.info.pop(
+        _PENDING, {}
+    ).items():
+        agent_cache.invalidate(tenant_id, agent_ids, tool_ids, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING, None)
@@ -4,6 +4,11 @@ from app.core.errors import (
     ConflictError,
     BadRequestError,
     RateLimitError,
+    OverloadedError,
+    DeadlineExceededError,
+    RequestCancelledError,
+    ProviderError,
+    QuotaExceededError,
 )
 
 
@@ -14,6 +19,25 @@ def raise_http(e: Exception) -> None:
         raise HTTPException(status_code=409, detail=str(e))
     if isinstance(e, BadRequestError):
         raise HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, QuotaExceededError):
+        raise HTTPException(
+            status_code=429,
+            detail={"message": str(e), "quota": e.quota},
+            headers={"Retry-After": str(e.retry_after)},
+        )
     if isinstance(e, RateLimitError):
         raise HTTPException(status_code=429, detail=str(e))
+    if isinstance(e, OverloadedError):
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if isinstance(e, DeadlineExceededError):
+        raise HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, RequestCancelledError):
+        # Nobody is listening any more; 499 as in nginx for the access log.
+        raise HTTPException(status_code=499, detail=str(e))
+    if isinstance(e, ProviderError):
+        raise HTTPException(status_code=502, detail=str(e))
     raise HTTPException(status_code=500, detail="Internal server error")
@@ -2,14 +2,20 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from app.deps import get_tenant_id, get_db
-from app.db.models import Tool, Agent
+from app.api.error_map import raise_http
+from app.core.errors import DomainError
+from app.deps import get_tenant_id, get_db, get_read_db
+from app.db.query_budget import query_budget
+from app.db.models import Agent
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.tools_repo import ToolsRepository
 from app.schemas import AgentCreate, AgentUpdate, AgentOut
 
 router = APIRouter(tags=["agents"])
 
 
 @router.post("/agents", response_model=AgentOut, status_code=201)
+@query_budget(5)
 def create_agent(
     payload: AgentCreate,
     tenant_id: str = Depends(get_tenant_id),
@@ -23,14 +29,7 @@ def create_agent(
     )
 
     if payload.tool_ids:
-        tools = (
-            db.query(Tool)
-            .filter(
-                Tool.tenant_id == tenant_id,
-                Tool.id.in_(payload.tool_ids),
-            )
-            .all()
-        )
+        tools = ToolsRepository(db).get_many(tenant_id, payload.tool_ids)
 
         if len(tools) != len(set(payload.tool_ids)):
             from fastapi import HTTPException
@@ -52,6 +51,10 @@ def create_agent(
         raise HTTPException(
             status_code=409, detail="Agent name already exists for this tenant"
         )
+    except DomainError as e:
+        # e.g. the tenant is being moved to another shard (503)
+        db.rollback()
+        raise_http(e)
     except Exception:
         db.rollback()
         from fastapi import HTTPException
@@ -70,21 +73,13 @@ def create_agent(
 
 
 @router.get("/agents", response_model=list[AgentOut])
+@query_budget(2)
 def list_agents(
     tool_name: str | None = None,
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    query = db.query(Agent).filter(Agent.tenant_id == tenant_id)
-
-    if tool_name:
-        query = (
-            query.join(Agent.tools)
-            .filter(Tool.tenant_id == tenant_id, Tool.name == tool_name)
-            .distinct()
-        )
-
-    agents = query.order_by(Agent.id.asc()).all()
+    agents = AgentsRepository(db).list(tenant_id, tool_name)
 
     return [
         AgentOut(
@@ -99,19 +94,13 @@ def list_agents(
 
 
 @router.get("/agents/{agent_id}", response_model=AgentOut)
+@query_budget(3)
 def get_agent(
     agent_id: int,
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    agent = (
-        db.query(Agent)
-        .filter(
-            Agent.id == agent_id,
-            Agent.tenant_id == tenant_id,
-        )
-        .first()
-    )
+    agent = AgentsRepository(db).get_snapshot(tenant_id, agent_id)
 
     if not agent:
         from fastapi import HTTPException
@@ -123,25 +112,19 @@ def get_agent(
         name=agent.name,
         role=agent.role,
         description=agent.description,
-        tool_ids=[t.id for t in agent.tools],
+        tool_ids=list(agent.tool_ids),
     )
 
 
 @router.put("/agents/{agent_id}", response_model=AgentOut)
+@query_budget(8)
 def update_agent(
     agent_id: int,
     payload: AgentUpdate,
     tenant_id: str = Depends(get_tenant_id),
     db: Session = Depends(get_db),
 ):
-    agent = (
-        db.query(Agent)
-        .filter(
-            Agent.id == agent_id,
-            Agent.tenant_id == tenant_id,
-        )
-        .first()
-    )
+    agent = AgentsRepository(db).get(tenant_id, agent_id)
 
     if not agent:
         from fastapi import HTTPException
@@ -161,14 +144,7 @@ def update_agent(
     # - [..]  => replace tools with given list
     if payload.tool_ids is not None:
         if payload.tool_ids:
-            tools = (
-                db.query(Tool)
-                .filter(
-                    Tool.tenant_id == tenant_id,
-                    Tool.id.in_(payload.tool_ids),
-                )
-                .all()
-            )
+            tools = ToolsRepository(db).get_many(tenant_id, payload.tool_ids)
             if len(tools) != len(set(payload.tool_ids)):
                 from fastapi import HTTPException
 
@@ -189,6 +165,10 @@ def update_agent(
         raise HTTPException(
             status_code=409, detail="Agent name already exists for this tenant"
         )
+    except DomainError as e:
+        # e.g. the tenant is being moved to another shard (503)
+        db.rollback()
+        raise_http(e)
     except Exception:
         db.rollback()
         from fastapi import HTTPException
@@ -207,19 +187,13 @@ def update_agent(
 
 
 @router.delete("/agents/{agent_id}", status_code=204)
+@query_budget(3)
 def delete_agent(
     agent_id: int,
     tenant_id: str = Depends(get_tenant_id),
     db: Session = Depends(get_db),
 ):
-    agent = (
-        db.query(Agent)
-        .filter(
-            Agent.id == agent_id,
-            Agent.tenant_id == tenant_id,
-        )
-        .first()
-    )
+    agent = AgentsRepository(db).get(tenant_id, agent_id)
 
     if not agent:
         from fastapi import HTTPException
@@ -227,5 +201,9 @@ def delete_agent(
         raise HTTPException(status_code=404, detail="Agent not found")
 
     db.delete(agent)
-    db.commit()
+    try:
+        db.commit()
+    except DomainError as e:
+        db.rollback()
+        raise_http(e)
     return None
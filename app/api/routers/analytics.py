@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api.error_map import raise_http
+from app.db.query_budget import query_budget
+from app.deps import admitted, get_tenant_id, get_read_db, with_deadline
+from app.repositories.analytics_repo import AnalyticsRepository
+from app.schemas import (
+    AgentTokenUsage,
+    ResponseSizeStats,
+    RunStatsBucket,
+    RunStatsOut,
+    TokenCounts,
+    TokenUsageOut,
+)
+from app.services.analytics_service import AnalyticsService
+
+router = APIRouter(tags=["analytics"])
+
+DEADLINE_SECONDS = 10.0
+
+
+def _tokens(prompt: int, response: int) -> TokenCounts:
+    return TokenCounts(prompt=prompt, response=response, total=prompt + response)
+
+
+@router.get(
+    "/analytics/runs",
+    response_model=RunStatsOut,
+    dependencies=[
+        Depends(admitted("lists")),
+        Depends(with_deadline(DEADLINE_SECONDS)),
+    ],
+)
+@query_budget(1)
+def run_stats(
+    granularity: str = "hour",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    group_by: str = "agent,model",
+    agent_id: int | None = None,
+    model: str | None = None,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        start, end, dims, rows = AnalyticsService(AnalyticsRepository(db)).run_stats(
+            tenant_id=tenant_id,
+            granularity=granularity,
+            start=start,
+            end=end,
+            group_by=group_by,
+            agent_id=agent_id,
+            model=model,
+        )
+
+        return RunStatsOut(
+            granularity=granularity,
+            start=start,
+            end=end,
+            buckets=[
+                RunStatsBucket(
+                    bucket_start=r.bucket_start,
+                    agent_id=r.agent_id if "agent_id" in dims else None,
+                    model=r.model if "model" in dims else None,
+                    run_count=r.run_count,
+                    response_bytes=ResponseSizeStats(
+                        total=r.response_bytes_total,
+                        avg=r.response_bytes_total / r.run_count,
+                        min=r.response_bytes_min,
+                        max=r.response_bytes_max,
+                    ),
+                    tokens=_tokens(r.prompt_tokens, r.response_tokens),
+                )
+                for r in rows
+            ],
+        )
+    except Exception as e:
+        raise_http(e)
+
+
+@router.get(
+    "/analytics/tokens",
+    response_model=TokenUsageOut,
+    dependencies=[
+        Depends(admitted("lists")),
+        Depends(with_deadline(DEADLINE_SECONDS)),
+    ],
+)
+@query_budget(1)
+def token_usage(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = 20,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        start, end, prompt, response, rows = AnalyticsService(
+            AnalyticsRepository(db)
+        ).token_usage(tenant_id=tenant_id, start=start, end=end, limit=limit)
+
+        return TokenUsageOut(
+            start=start,
+            end=end,
+            tokens=_tokens(prompt, response),
+            agents=[
+                AgentTokenUsage(
+                    agent_id=r.agent_id,
+                    run_count=r.run_count,
+                    tokens=_tokens(r.prompt_tokens, r.response_tokens),
+                )
+                for r in rows
+            ],
+        )
+    except Exception as e:
+        raise_http(e)
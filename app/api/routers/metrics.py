@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends
+
+from app import (
+    admission,
+    model_registry,
+    quotas,
+    replay,
+    run_feed,
+    scheduler,
+    schedules,
+    singleflight,
+    tools,
+    webhooks,
+)
+from app.context_cache import context_cache
+from app.deps import get_tenant_id
+
+router = APIRouter(tags=["metrics"])
+
+
+def _llm_scheduling(tenant_id: str) -> dict:
+    # Per-tenant figures would show every tenant's traffic; callers only
+    # see their own next to the aggregate counts.
+    stats = scheduler.llm_scheduler.stats()
+    stats["tenants"] = {t: v for t, v in stats["tenants"].items() if t == tenant_id}
+    return stats
+
+
+@router.get("/metrics")
+def metrics(tenant_id: str = Depends(get_tenant_id)):
+    return {
+        "model_backends": model_registry.registry.stats(),
+        "llm_coalescing": singleflight.llm_calls.stats(),
+        "llm_scheduling": _llm_scheduling(tenant_id),
+        "admission": {
+            "runs": admission.runs.stats(),
+            "lists": admission.lists.stats(),
+        },
+        "tools": tools.executor.stats(),
+        "conversation_context": context_cache.stats(),
+        "replays": replay.runner.stats(),
+        "run_feed": run_feed.feed.stats(),
+        "webhooks": webhooks.dispatcher.stats(),
+        "quotas": quotas.tracker.stats(),
+        "schedules": schedules.runner.stats(),
+    }
@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app import deps, replay
+from app.api.error_map import raise_http
+from app.db.query_budget import query_budget
+from app.deps import get_tenant_id, get_db, get_read_db
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.replays_repo import ReplaysRepository
+from app.schemas import (
+    ReplayCreate,
+    ReplayJobOut,
+    ReplayResultListOut,
+    ReplayResultOut,
+)
+from app.services.replays_service import ReplaysService, throughput
+
+router = APIRouter(tags=["replays"])
+
+
+def _service(db: Session) -> ReplaysService:
+    return ReplaysService(ReplaysRepository(db), AgentsRepository(db))
+
+
+def _job(job) -> ReplayJobOut:
+    return ReplayJobOut(
+        id=job.id,
+        status=job.status,
+        target_model=job.target_model,
+        agent_id=job.agent_id,
+        source_model=job.source_model,
+        created_from=job.created_from,
+        created_to=job.created_to,
+        total=job.total,
+        processed=job.processed,
+        failed=job.failed,
+        runs_per_second=round(throughput(job), 2),
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+@router.post("/replays", response_model=ReplayJobOut, status_code=201)
+@query_budget(6)
+def create_replay(
+    payload: ReplayCreate,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        job = _service(db).create_job(
+            tenant_id,
+            payload.target_model,
+            agent_id=payload.agent_id,
+            source_model=payload.source_model,
+            created_from=payload.created_from,
+            created_to=payload.created_to,
+        )
+    except Exception as e:
+        raise_http(e)
+
+    replay.runner.start(tenant_id, job.id, lambda: deps.write_session(tenant_id))
+    return _job(job)
+
+
+@router.get("/replays/{job_id}", response_model=ReplayJobOut)
+@query_budget(1)
+def get_replay(
+    job_id: int,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        return _job(_service(db).get_job(tenant_id, job_id))
+    except Exception as e:
+        raise_http(e)
+
+
+@router.get("/replays/{job_id}/results", response_model=ReplayResultListOut)
+@query_budget(1)
+def list_replay_results(
+    job_id: int,
+    after: int = 0,
+    limit: int = 20,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        rows = _service(db).list_results(tenant_id, job_id, after, limit)
+        return ReplayResultListOut(
+            items=[ReplayResultOut.model_validate(r) for r in rows],
+            next_after=rows[-1].id if len(rows) == limit else None,
+        )
+    except Exception as e:
+        raise_http(e)
@@ -1,37 +1,117 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import hashlib
+import json
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app import deps, idempotency, run_feed, scheduler, singleflight, tools
 from app.api.error_map import raise_http
-from app.deps import get_tenant_id, get_db
+from app.deps import admitted, get_tenant_id, get_db, get_read_db, with_deadline
+from app.db.query_budget import query_budget
 from app.schemas import (
     RunAgentRequest,
     RunAgentResponse,
     ExecutionOut,
+    ExecutionStepOut,
     ExecutionListOut,
+    ExecutionChangesOut,
+    ExecutionSearchHit,
+    ExecutionSearchOut,
+    ConversationCreate,
+    ConversationOut,
+    TurnCreate,
+    TurnOut,
+    TurnListOut,
 )
 
 from app.repositories.runs_repo import RunsRepository
 from app.repositories.agents_repo import AgentsRepository
-from app.services.runs_service import RunsService
+from app.repositories.conversations_repo import ConversationsRepository
+from app.services.runs_service import (
+    CHANGES_PAGE_SIZE,
+    DEFAULT_SNIPPET_LEN,
+    RunsService,
+)
 
 router = APIRouter(tags=["runs"])
 
+# Upper bounds for the request deadline; clients may ask for less with the
+# X-Request-Timeout header.
+RUN_DEADLINE_SECONDS = 30.0
+LIST_DEADLINE_SECONDS = 10.0
+
+# Change feed: an idle stream sends a comment line this often so proxies
+# keep it open, and ends after STREAM_MAX_SECONDS (clients reconnect with
+# Last-Event-ID and miss nothing).
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("RUN_STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_MAX_SECONDS = float(os.getenv("RUN_STREAM_MAX_SECONDS", "300"))
+STREAM_RETRY_MS = 1000
+LONG_POLL_MAX_WAIT_SECONDS = 30.0
+
 
 def _service(db: Session) -> RunsService:
     return RunsService(
         RunsRepository(db),
         AgentsRepository(db),
+        llm_coalescer=singleflight.llm_calls if singleflight.ENABLED else None,
+        llm_scheduler=scheduler.llm_scheduler if scheduler.ENABLED else None,
+        tool_executor=tools.executor if tools.ENABLED else None,
+        conversations_repo=ConversationsRepository(db),
     )
 
 
-@router.post("/agents/{agent_id}/run", response_model=RunAgentResponse)
+def _steps(execution) -> list[ExecutionStepOut]:
+    return [
+        ExecutionStepOut(
+            step=s.step,
+            tool_id=s.tool_id,
+            tool_name=s.tool_name,
+            arguments=json.loads(s.arguments),
+            output=s.output,
+            error=s.error,
+            cached=s.cached,
+            duration_ms=s.duration_ms,
+        )
+        for s in execution.steps
+    ]
+
+
+def _turn(execution, steps: bool = False) -> TurnOut:
+    return TurnOut(
+        conversation_id=execution.conversation_id,
+        turn=execution.turn,
+        message=execution.prompt,
+        response=execution.response,
+        prompt_tokens=execution.prompt_tokens,
+        response_tokens=execution.response_tokens,
+        status=execution.status,
+        created_at=execution.created_at,
+        steps=_steps(execution) if steps else [],
+    )
+
+
+@router.post(
+    "/agents/{agent_id}/run",
+    response_model=RunAgentResponse,
+    dependencies=[
+        Depends(admitted("runs")),
+        Depends(with_deadline(RUN_DEADLINE_SECONDS)),
+    ],
+)
+@query_budget(11)  # +2 the first time a tenant or model is seen
 def run_agent(
     agent_id: int,
     payload: RunAgentRequest,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
     tenant_id: str = Depends(get_tenant_id),
     db: Session = Depends(get_db),
 ):
-    try:
+    def execute() -> RunAgentResponse:
         execution = _service(db).run(
             tenant_id=tenant_id,
             agent_id=agent_id,
@@ -44,19 +124,128 @@ def run_agent(
             model=execution.model,
             prompt=execution.prompt,
             response=execution.response,
+            prompt_tokens=execution.prompt_tokens,
+            response_tokens=execution.response_tokens,
+            status=execution.status,
             created_at=execution.created_at,
+            steps=_steps(execution),
+        )
+
+    try:
+        if idempotency_key is None:
+            return execute()
+
+        fingerprint = hashlib.sha256(
+            f"{agent_id}\0{payload.model}\0{payload.task}".encode("utf-8")
+        ).hexdigest()
+        result, replayed = idempotency.run_once(
+            tenant_id, idempotency_key, fingerprint, execute
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
+    except Exception as e:
+        raise_http(e)
+
+
+@router.post(
+    "/agents/{agent_id}/conversations",
+    response_model=ConversationOut,
+    status_code=201,
+)
+@query_budget(5)
+def start_conversation(
+    agent_id: int,
+    payload: ConversationCreate,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        return _service(db).start_conversation(tenant_id, agent_id, payload.model)
+    except Exception as e:
+        raise_http(e)
+
+
+@router.get("/conversations/{conversation_id}", response_model=ConversationOut)
+@query_budget(1)
+def get_conversation(
+    conversation_id: int,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        return _service(db).get_conversation(tenant_id, conversation_id)
+    except Exception as e:
+        raise_http(e)
+
+
+@router.post(
+    "/conversations/{conversation_id}/turns",
+    response_model=TurnOut,
+    dependencies=[
+        Depends(admitted("runs")),
+        Depends(with_deadline(RUN_DEADLINE_SECONDS)),
+    ],
+)
+@query_budget(13)  # +2 the first time a tenant or model is seen
+def add_turn(
+    conversation_id: int,
+    payload: TurnCreate,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        execution = _service(db).converse(tenant_id, conversation_id, payload.message)
+        return _turn(execution, steps=True)
+    except Exception as e:
+        raise_http(e)
+
+
+@router.get(
+    "/conversations/{conversation_id}/turns",
+    response_model=TurnListOut,
+    dependencies=[
+        Depends(admitted("lists")),
+        Depends(with_deadline(LIST_DEADLINE_SECONDS)),
+    ],
+)
+@query_budget(1)
+def list_turns(
+    conversation_id: int,
+    after: int = 0,
+    limit: int = 20,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        rows = _service(db).list_turns(tenant_id, conversation_id, after, limit)
+        return TurnListOut(
+            items=[_turn(e) for e in rows],
+            next_after=rows[-1].turn if len(rows) == limit else None,
         )
     except Exception as e:
         raise_http(e)
 
 
-@router.get("/agents/{agent_id}/runs", response_model=ExecutionListOut)
+@router.get(
+    "/agents/{agent_id}/runs",
+    response_model=ExecutionListOut,
+    # Unrequested fields are left out rather than sent as null.
+    response_model_exclude_unset=True,
+    dependencies=[
+        Depends(admitted("lists")),
+        Depends(with_deadline(LIST_DEADLINE_SECONDS)),
+    ],
+)
+@query_budget(2)
 def list_agent_runs(
     agent_id: int,
     limit: int = 20,
     offset: int = 0,
+    fields: str | None = None,
+    snippet_len: int = DEFAULT_SNIPPET_LEN,
     tenant_id: str = Depends(get_tenant_id),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     try:
         total, rows = _service(db).list_runs(
@@ -64,22 +253,190 @@ def list_agent_runs(
             agent_id=agent_id,
             limit=limit,
             offset=offset,
+            fields=fields,
+            snippet_len=snippet_len,
         )
 
         return ExecutionListOut(
             total=total,
             limit=limit,
             offset=offset,
+            items=[ExecutionOut(**row) for row in rows],
+        )
+    except Exception as e:
+        raise_http(e)
+
+
+@router.get(
+    "/runs/search",
+    response_model=ExecutionSearchOut,
+    dependencies=[
+        Depends(admitted("lists")),
+        Depends(with_deadline(LIST_DEADLINE_SECONDS)),
+    ],
+)
+@query_budget(1)
+def search_runs(
+    q: str,
+    limit: int = 20,
+    cursor: str | None = None,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        rows, next_cursor = _service(db).search_runs(
+            tenant_id=tenant_id,
+            q=q,
+            limit=limit,
+            cursor=cursor,
+        )
+
+        return ExecutionSearchOut(
             items=[
-                ExecutionOut(
+                ExecutionSearchHit(
                     id=e.id,
+                    agent_id=e.agent_id,
                     model=e.model,
                     prompt=e.prompt,
                     response=e.response,
+                    prompt_tokens=e.prompt_tokens,
+                    response_tokens=e.response_tokens,
+                    status=e.status,
                     created_at=e.created_at,
                 )
                 for e in rows
             ],
+            next_cursor=next_cursor,
+        )
+    except Exception as e:
+        raise_http(e)
+
+
+def _changes(tenant_id: str, agent_id: int, after: int) -> list[dict]:
+    db = deps.read_session(tenant_id)
+    try:
+        return _service(db).run_changes(tenant_id, agent_id, after)
+    finally:
+        db.close()
+
+
+def _subscribe(tenant_id: str, agent_id: int) -> run_feed.Subscription:
+    sub = run_feed.feed.subscribe(tenant_id, agent_id)
+    if sub is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many open change feeds",
+            headers={"Retry-After": "5"},
+        )
+    return sub
+
+
+def _sse_event(event: dict) -> str:
+    data = ExecutionOut(**event).model_dump_json(exclude_unset=True)
+    return f"id: {event['id']}\nevent: run\ndata: {data}\n\n"
+
+
+async def _stream(sub, tenant_id: str, agent_id: int, backlog: list[dict]):
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        # Runs stored while the backlog was read can arrive on the feed too.
+        sent = set()
+        while True:
+            for event in backlog:
+                sent.add(event["id"])
+                yield _sse_event(event)
+            if len(backlog) < CHANGES_PAGE_SIZE:
+                break
+            backlog = await run_in_threadpool(
+                _changes, tenant_id, agent_id, backlog[-1]["id"]
+            )
+
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + STREAM_MAX_SECONDS
+        while (remaining := ends_at - loop.time()) > 0:
+            event = await sub.get(min(STREAM_HEARTBEAT_SECONDS, remaining))
+            if event is None:
+                yield ": heartbeat\n\n"
+            elif event["id"] not in sent:
+                yield _sse_event(event)
+            if sub.overflowed and sub.queue.empty():
+                # Too far behind: end here and catch up on reconnect.
+                return
+    finally:
+        run_feed.feed.unsubscribe(sub)
+
+
+@router.get("/agents/{agent_id}/runs/stream")
+@query_budget(1)
+async def stream_agent_runs(
+    agent_id: int,
+    after: int | None = None,
+    last_event_id: int | None = Header(default=None, alias="Last-Event-ID"),
+    tenant_id: str = Depends(get_tenant_id),
+):
+    """
+    Server-sent events for the agent's new runs, each with the run as data
+    and its id as the event id. With `after` (or Last-Event-ID, as sent by
+    a reconnecting EventSource) the runs stored since that id come first.
+    """
+    sub = _subscribe(tenant_id, agent_id)
+    resume = last_event_id if last_event_id is not None else after
+    try:
+        # Subscribed first, so nothing stored meanwhile is missed.
+        backlog = (
+            []
+            if resume is None
+            else await run_in_threadpool(_changes, tenant_id, agent_id, resume)
+        )
+    except Exception as e:
+        run_feed.feed.unsubscribe(sub)
+        raise_http(e)
+
+    return StreamingResponse(
+        _stream(sub, tenant_id, agent_id, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/agents/{agent_id}/runs/changes",
+    response_model=ExecutionChangesOut,
+    response_model_exclude_unset=True,
+)
+@query_budget(1)
+async def poll_agent_runs(
+    agent_id: int,
+    after: int,
+    wait: float = 25.0,
+    tenant_id: str = Depends(get_tenant_id),
+):
+    """
+    Long poll: the agent's runs with id > after, waiting up to `wait`
+    seconds for the first one. Pass the returned last_id as the next after.
+    """
+    if not 0 <= wait <= LONG_POLL_MAX_WAIT_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"wait must be between 0 and {LONG_POLL_MAX_WAIT_SECONDS:g}",
         )
+
+    sub = _subscribe(tenant_id, agent_id)
+    try:
+        items = await run_in_threadpool(_changes, tenant_id, agent_id, after)
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + wait
+        while not items and (remaining := ends_at - loop.time()) > 0:
+            event = await sub.get(remaining)
+            if event is None:
+                break
+            items = [e for e in (event, *sub.drain()) if e["id"] > after]
     except Exception as e:
         raise_http(e)
+    finally:
+        run_feed.feed.unsubscribe(sub)
+
+    return ExecutionChangesOut(
+        items=[ExecutionOut(**e) for e in items],
+        last_id=max((e["id"] for e in items), default=after),
+    )
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api.error_map import raise_http
+from app.db.query_budget import query_budget
+from app.deps import get_tenant_id, get_db, get_read_db
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.schedules_repo import SchedulesRepository
+from app.schemas import ScheduleCreate, ScheduleOut
+from app.services.schedules_service import SchedulesService
+
+router = APIRouter(tags=["schedules"])
+
+
+def _service(db: Session) -> SchedulesService:
+    return SchedulesService(SchedulesRepository(db), AgentsRepository(db))
+
+
+@router.post(
+    "/agents/{agent_id}/schedules", response_model=ScheduleOut, status_code=201
+)
+@query_budget(7)
+def create_schedule(
+    agent_id: int,
+    payload: ScheduleCreate,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        return _service(db).create(tenant_id, agent_id, payload)
+    except Exception as e:
+        raise_http(e)
+
+
+@router.get("/agents/{agent_id}/schedules", response_model=list[ScheduleOut])
+@query_budget(4)
+def list_schedules(
+    agent_id: int,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        return _service(db).list(tenant_id, agent_id)
+    except Exception as e:
+        raise_http(e)
+
+
+@router.delete("/agents/{agent_id}/schedules/{schedule_id}", status_code=204)
+@query_budget(3)
+def delete_schedule(
+    agent_id: int,
+    schedule_id: int,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        _service(db).delete(tenant_id, agent_id, schedule_id)
+    except Exception as e:
+        raise_http(e)
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.api.error_map import raise_http
-from app.deps import get_tenant_id, get_db
+from app.deps import get_tenant_id, get_db, get_read_db
+from app.db.query_budget import query_budget
 from app.schemas import ToolCreate, ToolUpdate, ToolOut
 from app.repositories.tools_repo import ToolsRepository
 from app.services.tools_service import ToolsService
@@ -11,6 +12,7 @@ router = APIRouter(tags=["tools"])
 
 
 @router.post("/tools", response_model=ToolOut, status_code=201)
+@query_budget(2)
 def create_tool(
     payload: ToolCreate,
     tenant_id: str = Depends(get_tenant_id),
@@ -24,14 +26,20 @@ def create_tool(
 
 
 @router.get("/tools", response_model=list[ToolOut])
-def list_tools(tenant_id: str = Depends(get_tenant_id), db: Session = Depends(get_db)):
+@query_budget(1)
+def list_tools(
+    tenant_id: str = Depends(get_tenant_id), db: Session = Depends(get_read_db)
+):
     service = ToolsService(ToolsRepository(db))
     return service.list(tenant_id)
 
 
 @router.get("/tools/{tool_id}", response_model=ToolOut)
+@query_budget(1)
 def get_tool(
-    tool_id: int, tenant_id: str = Depends(get_tenant_id), db: Session = Depends(get_db)
+    tool_id: int,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
 ):
     try:
         service = ToolsService(ToolsRepository(db))
@@ -41,6 +49,7 @@ def get_tool(
 
 
 @router.put("/tools/{tool_id}", response_model=ToolOut)
+@query_budget(4)
 def update_tool(
     tool_id: int,
     payload: ToolUpdate,
@@ -55,6 +64,7 @@ def update_tool(
 
 
 @router.delete("/tools/{tool_id}", status_code=204)
+@query_budget(3)
 def delete_tool(
     tool_id: int, tenant_id: str = Depends(get_tenant_id), db: Session = Depends(get_db)
 ):
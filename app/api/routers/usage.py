@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+
+from app import quotas
+from app.db.query_budget import query_budget
+from app.deps import get_tenant_id
+from app.schemas import UsageOut
+
+router = APIRouter(tags=["usage"])
+
+
+@router.get("/usage", response_model=UsageOut)
+@query_budget(0)
+def get_usage(tenant_id: str = Depends(get_tenant_id)):
+    # From this worker's counters: includes other workers' usage up to
+    # their last flush (see app.quotas).
+    return quotas.tracker.usage(tenant_id)
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api.error_map import raise_http
+from app.db.query_budget import query_budget
+from app.deps import get_tenant_id, get_db, get_read_db
+from app.repositories.webhooks_repo import WebhooksRepository
+from app.schemas import (
+    WebhookCreate,
+    WebhookCreatedOut,
+    WebhookDeliveryListOut,
+    WebhookDeliveryOut,
+    WebhookOut,
+)
+from app.services.webhooks_service import WebhooksService
+
+router = APIRouter(tags=["webhooks"])
+
+
+def _service(db: Session) -> WebhooksService:
+    return WebhooksService(WebhooksRepository(db))
+
+
+@router.post("/webhooks", response_model=WebhookCreatedOut, status_code=201)
+@query_budget(3)
+def create_webhook(
+    payload: WebhookCreate,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        return _service(db).create(tenant_id, payload.url)
+    except Exception as e:
+        raise_http(e)
+
+
+@router.get("/webhooks", response_model=list[WebhookOut])
+@query_budget(1)
+def list_webhooks(
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    return _service(db).list(tenant_id)
+
+
+@router.delete("/webhooks/{webhook_id}", status_code=204)
+@query_budget(3)
+def delete_webhook(
+    webhook_id: int,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        _service(db).delete(tenant_id, webhook_id)
+    except Exception as e:
+        raise_http(e)
+
+
+@router.get("/webhooks/{webhook_id}/deliveries", response_model=WebhookDeliveryListOut)
+@query_budget(1)
+def list_webhook_deliveries(
+    webhook_id: int,
+    after: int = 0,
+    limit: int = 20,
+    tenant_id: str = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        rows = _service(db).list_deliveries(tenant_id, webhook_id, after, limit)
+        return WebhookDeliveryListOut(
+            items=[WebhookDeliveryOut.model_validate(r) for r in rows],
+            next_after=rows[-1].id if len(rows) == limit else None,
+        )
+    except Exception as e:
+        raise_http(e)
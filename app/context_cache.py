@@ -0,0 +1,98 @@
+"""
+In-process cache of assembled conversation context.
+
+A conversation's prompt is the agent header, the running summary and the
+last WINDOW_TURNS turns, each rendered once. Keeping the rendered window
+between turns means the next turn only renders and appends its own
+message instead of reloading and re-rendering the history. Entries are
+tagged with the conversation's turn count, so an entry that another
+worker has moved past is simply reloaded from the database.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+MAX_ENTRIES = 10_000
+
+# Turns kept verbatim in the prompt; older ones are folded into the summary.
+WINDOW_TURNS = int(os.getenv("CONVERSATION_WINDOW_TURNS", "8"))
+
+# Upper bound on the folded summary of older turns.
+SUMMARY_MAX_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_MAX_TOKENS", "256"))
+
+
+def render_turn(message: str, response: str) -> str:
+    return f"User: {message}\nAgent: {response}\n"
+
+
+@dataclass(frozen=True, slots=True)
+class ConversationContext:
+    turn_count: int
+    summary: str
+    summarized_turns: int
+    # rendered turns after summarized_turns, oldest first
+    window: tuple[str, ...]
+
+    def append(self, message: str, response: str) -> "ConversationContext":
+        return ConversationContext(
+            turn_count=self.turn_count + 1,
+            summary=self.summary,
+            summarized_turns=self.summarized_turns,
+            window=self.window + (render_turn(message, response),),
+        )
+
+
+class ContextCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, int], ConversationContext] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, tenant_id: str, conversation_id: int, turn_count: int
+    ) -> ConversationContext | None:
+        """The cached context, if it is still at `turn_count`."""
+        key = (tenant_id, conversation_id)
+        with self._lock:
+            context = self._entries.get(key)
+            if context is None or context.turn_count != turn_count:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return context
+
+    def put(
+        self, tenant_id: str, conversation_id: int, context: ConversationContext
+    ) -> None:
+        key = (tenant_id, conversation_id)
+        with self._lock:
+            self._entries[key] = context
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant_id: str, conversation_id: int) -> None:
+        with self._lock:
+            self._entries.pop((tenant_id, conversation_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+context_cache = ContextCache()
@@ -16,3 +16,28 @@ class BadRequestError(DomainError):
 
 class RateLimitError(DomainError):
     pass
+
+
+class OverloadedError(DomainError):
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(DomainError):
+    pass
+
+
+class RequestCancelledError(DomainError):
+    pass
+
+
+class ProviderError(DomainError):
+    pass
+
+
+class QuotaExceededError(DomainError):
+    def __init__(self, message: str, quota: dict, retry_after: int):
+        super().__init__(message)
+        self.quota = quota
+        self.retry_after = retry_after
@@ -1,27 +1,103 @@
+import os
+import threading
+import time
+
 from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 
-DATABASE_URL = "sqlite:///./agent_platform.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./agent_platform.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+
+def read_only_url(url: str) -> str:
+    """SQLite files are reopened read-only; other backends are used as-is."""
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database and u.database != ":memory:":
+        return f"sqlite:///file:{u.database}?mode=ro&uri=true"
+    return url
+
+
+# Reads go to a replica in Postgres deployments (READ_DATABASE_URL); locally
+# the same SQLite file is opened with mode=ro.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or read_only_url(DATABASE_URL)
+
+# Writes are serialized by SQLite anyway; a small pool keeps writers from
+# tying up connections that list/export reads could use.
+WRITE_POOL_SIZE = int(os.getenv("WRITE_POOL_SIZE", "2"))
+
+# After a tenant writes, its reads stay on the write side for this long so
+# it never reads older data than it just wrote (replica lag bound).
+READ_YOUR_WRITES_SECONDS = 5.0
 
 
-@event.listens_for(engine, "connect")
 def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
 
+def _create_engine(url: str, **kwargs):
+    """
+    create_engine with the SQLite-only connection options (thread sharing,
+    foreign keys) applied only to SQLite URLs, so a Postgres primary or
+    replica URL connects as-is.
+    """
+    sqlite = make_url(url).get_backend_name() == "sqlite"
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if sqlite else {},
+        **kwargs,
+    )
+    if sqlite:
+        event.listen(engine, "connect", enable_sqlite_foreign_keys)
+    return engine
+
+
+engine = _create_engine(DATABASE_URL, pool_size=WRITE_POOL_SIZE, max_overflow=0)
+
+read_engine = _create_engine(READ_DATABASE_URL)
+
+
 SessionLocal = sessionmaker(
     bind=engine,
     autocommit=False,
     autoflush=False,
 )
 
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    autocommit=False,
+    autoflush=False,
+)
+
+
+_last_write: dict[str, float] = {}
+_last_write_lock = threading.Lock()
+
+
+def wrote_recently(tenant_id: str) -> bool:
+    with _last_write_lock:
+        at = _last_write.get(tenant_id)
+    return at is not None and time.monotonic() - at < READ_YOUR_WRITES_SECONDS
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_dirty(session, flush_context):
+    if "tenant_id" in session.info:
+        session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _record_write(session):
+    if session.info.pop("wrote", False):
+        with _last_write_lock:
+            _last_write[session.info["tenant_id"]] = time.monotonic()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write(session):
+    session.info.pop("wrote", None)
+
 
 class Base(DeclarativeBase):
     pass
@@ -0,0 +1,95 @@
+"""
+SQLite FTS5 index over agent_executions (prompt + response).
+
+The index is an external-content FTS5 table: it stores only the inverted
+index and reads column values back from agent_executions, so the text is
+not duplicated. Triggers keep it in sync with inserts, deletes (including
+FK cascades from agents) and updates.
+"""
+
+from sqlalchemy import DDL, event
+
+from .models import AgentExecution
+
+FTS_TABLE = "agent_executions_fts"
+
+# Rows that existed before the index was created are indexed afterwards in
+# small batches by scripts/backfill_search_index.py. This table records the
+# highest id the backfill has to cover (watermark) and how far it got
+# (position); rows above the watermark are indexed by the insert trigger.
+BACKFILL_TABLE = "search_index_backfill"
+
+# Only rows that are already in the index may be removed from it: issuing
+# an FTS5 'delete' for a row that was never indexed corrupts the index.
+_INDEXED = f"""
+    old.id > (SELECT watermark FROM {BACKFILL_TABLE} WHERE id = 1)
+    OR old.id <= (SELECT position FROM {BACKFILL_TABLE} WHERE id = 1)
+"""
+
+CREATE_STATEMENTS = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {BACKFILL_TABLE} (
+        id INTEGER NOT NULL PRIMARY KEY,
+        watermark INTEGER NOT NULL,
+        position INTEGER NOT NULL
+    )
+    """,
+    f"""
+    INSERT OR IGNORE INTO {BACKFILL_TABLE} (id, watermark, position)
+    SELECT 1, COALESCE(MAX(id), 0), 0 FROM agent_executions
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        prompt, response,
+        content='agent_executions', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON agent_executions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, prompt, response)
+        VALUES (new.id, new.prompt, new.response);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON agent_executions
+    WHEN {_INDEXED}
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, prompt, response)
+        VALUES ('delete', old.id, old.prompt, old.response);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF prompt, response ON agent_executions
+    WHEN {_INDEXED}
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, prompt, response)
+        VALUES ('delete', old.id, old.prompt, old.response);
+        INSERT INTO {FTS_TABLE}(rowid, prompt, response)
+        VALUES (new.id, new.prompt, new.response);
+    END
+    """,
+)
+
+DROP_STATEMENTS = (
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    f"DROP TABLE IF EXISTS {BACKFILL_TABLE}",
+)
+
+
+for _statement in CREATE_STATEMENTS:
+    event.listen(
+        AgentExecution.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite"),
+    )
+
+for _statement in DROP_STATEMENTS:
+    event.listen(
+        AgentExecution.__table__,
+        "before_drop",
+        DDL(_statement).execute_if(dialect="sqlite"),
+    )
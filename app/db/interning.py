@@ -0,0 +1,84 @@
+"""
+Dictionary tables for values repeated on every agent_executions row.
+
+Tenant ids and model names are stored once in tenant_names / model_names
+and referenced by integer. Name -> id lookups are cached per engine (each
+shard has its own dictionaries); an id learned inside a transaction is only
+cached once that transaction commits, so a rolled-back insert is never
+handed out.
+"""
+
+from __future__ import annotations
+
+import threading
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .models import ModelName, TenantName
+
+_PENDING = "interned_names"
+
+
+class Dictionary:
+    def __init__(self, model):
+        table = model.__table__
+        self.model = model
+        # DO UPDATE rather than DO NOTHING so RETURNING also yields the id of
+        # a name that already exists.
+        stmt = insert(table).values(name=bindparam("name"))
+        self._upsert = stmt.on_conflict_do_update(
+            index_elements=[table.c.name], set_={"name": stmt.excluded.name}
+        ).returning(table.c.id)
+        self._lock = threading.Lock()
+        self._ids: WeakKeyDictionary[Engine, dict[str, int]] = WeakKeyDictionary()
+
+    def ref_of(self, name):
+        """SQL expression for the id of `name` (a value or bindparam)."""
+        return select(self.model.id).where(self.model.name == name).scalar_subquery()
+
+    def ensure(self, conn: Connection | Session, name: str) -> int:
+        """The id of `name`, inserting it if needed. Not cached."""
+        return conn.execute(self._upsert, {"name": name}).scalar_one()
+
+    def ref(self, db: Session, name: str) -> int:
+        engine = db.get_bind().engine
+        with self._lock:
+            cached = self._ids.get(engine, {}).get(name)
+        if cached is not None:
+            return cached
+        ref = self.ensure(db, name)
+        db.info.setdefault(_PENDING, []).append((self, engine, name, ref))
+        return ref
+
+    def _remember(self, engine: Engine, name: str, ref: int) -> None:
+        with self._lock:
+            self._ids.setdefault(engine, {})[name] = ref
+
+    def forget(self, engine: Engine) -> None:
+        with self._lock:
+            self._ids.pop(engine, None)
+
+
+tenants = Dictionary(TenantName)
+models = Dictionary(ModelName)
+
+
+def forget(engine: Engine) -> None:
+    """Drop every cached id for `engine`, e.g. after rolling back inserts."""
+    tenants.forget(engine)
+    models.forget(engine)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_names(session: Session) -> None:
+    for dictionary, engine, name, ref in session.info.pop(_PENDING, ()):
+        dictionary._remember(engine, name, ref)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_names(session: Session) -> None:
+    session.info.pop(_PENDING, None)
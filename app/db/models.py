@@ -3,10 +3,19 @@ from __future__ import annotations
 from datetime import datetime
 
 import sqlalchemy as sa
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, column_property, mapped_column, relationship
 
 from .database import Base
+from .types import EpochMicros
 
 
 agent_tools = sa.Table(
@@ -74,11 +83,77 @@ class Agent(Base):
     )
 
 
+class Conversation(Base):
+    """
+    A multi-turn session with an agent. Turns are AgentExecution rows that
+    hold only that turn's message and reply; turns older than the rolling
+    window are folded into `summary`.
+    """
+
+    __tablename__ = "conversations"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+
+    agent_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("agents.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    model: Mapped[str] = mapped_column(String(50), nullable=False)
+
+    turn_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    summary: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    summarized_turns: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+    )
+
+
+class TenantName(Base):
+    """Dictionary of tenant ids; agent_executions stores the small integer."""
+
+    __tablename__ = "tenant_names"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+
+
+class ModelName(Base):
+    """Dictionary of model names; agent_executions stores the small integer."""
+
+    __tablename__ = "model_names"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
+
+
 class AgentExecution(Base):
+    """
+    One run. Tenant and model are interned (see app.db.interning) and
+    created_at is stored as epoch microseconds; tenant_id and model are
+    read-only views for code that only reads executions. Writes and filters
+    go through RunsRepository.
+    """
+
     __tablename__ = "agent_executions"
+    __table_args__ = (
+        sa.Index(
+            "ix_agent_executions_conversation_turn",
+            "conversation_id",
+            "turn",
+            unique=True,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    tenant_ref: Mapped[int] = mapped_column(
+        Integer, ForeignKey("tenant_names.id"), nullable=False, index=True
+    )
 
     agent_id: Mapped[int] = mapped_column(
         Integer,
@@ -87,14 +162,338 @@ class AgentExecution(Base):
         index=True,
     )
 
-    model: Mapped[str] = mapped_column(String(50), nullable=False)
+    model_ref: Mapped[int] = mapped_column(
+        Integer, ForeignKey("model_names.id"), nullable=False
+    )
+    # For conversation turns: only the new message, not the assembled prompt.
     prompt: Mapped[str] = mapped_column(Text, nullable=False)
+    # The task as the client sent it (runs only; NULL for turns and for old
+    # runs until scripts/backfill_tasks.py has run).
+    task: Mapped[str | None] = mapped_column(Text, nullable=True)
     response: Mapped[str] = mapped_column(Text, nullable=False)
 
+    # Turns are deleted together with their conversation through the agent.
+    conversation_id: Mapped[int | None] = mapped_column(
+        Integer,
+        ForeignKey("conversations.id"),
+        nullable=True,
+    )
+    turn: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Estimated with app.llm.estimate_tokens; prompt tokens cover every
+    # model turn of the run, including tool-calling turns.
+    prompt_tokens: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    response_tokens: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
+    # completed | timed_out | cancelled
+    status: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        default="completed",
+        server_default="completed",
+    )
+
     created_at: Mapped[datetime] = mapped_column(
-        DateTime,
+        EpochMicros,
         default=datetime.utcnow,
         nullable=False,
     )
 
+    tenant_id: Mapped[str] = column_property(
+        sa.select(TenantName.name)
+        .where(TenantName.id == tenant_ref)
+        .correlate_except(TenantName)
+        .scalar_subquery()
+    )
+    model: Mapped[str] = column_property(
+        sa.select(ModelName.name)
+        .where(ModelName.id == model_ref)
+        .correlate_except(ModelName)
+        .scalar_subquery()
+    )
+
     agent: Mapped["Agent"] = relationship("Agent", back_populates="executions")
+
+    steps: Mapped[list["ExecutionStep"]] = relationship(
+        "ExecutionStep",
+        back_populates="execution",
+        order_by="(ExecutionStep.step, ExecutionStep.position)",
+        passive_deletes=True,
+    )
+
+
+class ExecutionStep(Base):
+    """One tool call made during a run; calls of the same step ran in parallel."""
+
+    __tablename__ = "execution_steps"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    execution_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("agent_executions.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    step: Mapped[int] = mapped_column(Integer, nullable=False)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # No FK: the history outlives the tool.
+    tool_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    tool_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    arguments: Mapped[str] = mapped_column(Text, nullable=False)  # JSON
+    output: Mapped[str] = mapped_column(Text, nullable=False)
+
+    error: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    cached: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    duration_ms: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    execution: Mapped["AgentExecution"] = relationship(
+        "AgentExecution", back_populates="steps"
+    )
+
+
+class ReplayJob(Base):
+    """
+    Re-run of past tasks against another model (see app.replay).
+
+    Filters select runs with id <= watermark, so runs made after the job
+    was created are not picked up; `cursor` is the last source id done.
+    """
+
+    __tablename__ = "replay_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+
+    target_model: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Filters; NULL matches everything. No FK: the job outlives the agent.
+    agent_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    source_model: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    created_from: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_to: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    watermark: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # pending | running | completed | failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cursor: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class ReplayResult(Base):
+    """The target model's answer to one replayed run."""
+
+    __tablename__ = "replay_results"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    job_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("replay_jobs.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    # No FK: results are kept when the original run is deleted.
+    execution_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    response: Mapped[str] = mapped_column(Text, nullable=False)
+    error: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False)
+    response_tokens: Mapped[int] = mapped_column(Integer, nullable=False)
+    duration_ms: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class CacheVersion(Base):
+    """Per-tenant counter bumped on agent/tool changes; lets other workers
+    notice that their cached agent snapshots are stale."""
+
+    __tablename__ = "cache_versions"
+
+    tenant_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class RunRollup(Base):
+    """
+    Pre-aggregated run counts and response sizes per time bucket.
+
+    Maintained incrementally by RunsRepository.create; one row per
+    (tenant, granularity, bucket, agent, model).
+    """
+
+    __tablename__ = "run_rollups"
+
+    tenant_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    granularity: Mapped[str] = mapped_column(String(8), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    agent_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("agents.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    model: Mapped[str] = mapped_column(String(50), primary_key=True)
+
+    run_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    response_bytes_total: Mapped[int] = mapped_column(Integer, nullable=False)
+    response_bytes_min: Mapped[int] = mapped_column(Integer, nullable=False)
+    response_bytes_max: Mapped[int] = mapped_column(Integer, nullable=False)
+    prompt_tokens_total: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    response_tokens_total: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
+
+class RunRollupBackfill(Base):
+    """Progress of scripts/backfill_rollups.py over rows that predate rollups."""
+
+    __tablename__ = "run_rollups_backfill"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    watermark: Mapped[int] = mapped_column(Integer, nullable=False)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class TenantShard(Base):
+    """
+    Shard directory entry (sharding mode only, kept in the main database).
+
+    Tenants without a row live at the default shard URL; `frozen` blocks
+    writes while scripts/move_tenant.py copies the final changes.
+    """
+
+    __tablename__ = "tenant_shards"
+
+    tenant_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    url: Mapped[str] = mapped_column(String(500), nullable=False)
+    frozen: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+
+class Webhook(Base):
+    """A tenant's endpoint for completion events (see app.webhooks)."""
+
+    __tablename__ = "webhooks"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+
+    url: Mapped[str] = mapped_column(String(2000), nullable=False)
+    # Key of the HMAC signature on every request; shown once, on creation.
+    secret: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
+
+
+class WebhookDelivery(Base):
+    """
+    Outbox entry: one event for one webhook.
+
+    Written in the same transaction as the run or job it reports, so an
+    event is never lost or sent for a change that was rolled back. The
+    dispatcher claims due rows by pushing next_attempt_at out by a lease.
+    """
+
+    __tablename__ = "webhook_deliveries"
+    __table_args__ = (
+        sa.Index(
+            "ix_webhook_deliveries_due", "tenant_id", "status", "next_attempt_at"
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    webhook_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("webhooks.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    event: Mapped[str] = mapped_column(String(32), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # JSON
+
+    # pending | delivered | failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
+    delivered_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class TenantUsage(Base):
+    """
+    Runs and tokens per tenant and calendar day or month (UTC).
+
+    Written by app.quotas, which adds each worker's counts since its last
+    flush, so rows are totals across workers.
+    """
+
+    __tablename__ = "tenant_usage"
+
+    tenant_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # day | month
+    period: Mapped[str] = mapped_column(String(8), primary_key=True)
+    period_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+
+    runs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class AgentSchedule(Base):
+    """
+    A recurring run of an agent (see app.schedules).
+
+    Fires every interval_seconds at offset_seconds past each multiple of the
+    interval since the epoch; the offset is the schedule's jitter, fixed when
+    it is created. next_fire_at is stored as epoch microseconds so the
+    scheduler can advance it in SQL.
+    """
+
+    __tablename__ = "agent_schedules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    agent_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("agents.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    task: Mapped[str] = mapped_column(Text, nullable=False)
+    model: Mapped[str] = mapped_column(String(50), nullable=False)
+
+    interval_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    offset_seconds: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Due-schedule lookups range over this index.
+    next_fire_at: Mapped[datetime] = mapped_column(
+        EpochMicros, nullable=False, index=True
+    )
+    last_fired_at: Mapped[datetime | None] = mapped_column(EpochMicros, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
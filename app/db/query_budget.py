@@ -0,0 +1,144 @@
+"""
+Per-request SQL query accounting for development and tests.
+
+Every statement sent through a SQLAlchemy engine is counted against the
+request that issued it. Routes declare their expected number of queries
+with ``@query_budget(n)``; when a request goes over budget, or repeats the
+same statement shape often enough to look like an N+1, we either log it
+with a short stack summary (``QUERY_BUDGET_MODE=log``) or raise
+(``QUERY_BUDGET_MODE=raise``) so the offending test fails.
+"""
+
+import logging
+import os
+import re
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# "off" (default), "log" or "raise"
+MODE = os.getenv("QUERY_BUDGET_MODE", "off")
+
+# Same statement shape this many times in one request => likely N+1
+N_PLUS_ONE_THRESHOLD = 3
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_WHITESPACE = re.compile(r"\s+")
+_PARAM_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class QueryLog:
+    count: int = 0
+    shapes: Counter = field(default_factory=Counter)
+    # first stack seen for every shape that crossed N_PLUS_ONE_THRESHOLD
+    repeated: dict[str, str] = field(default_factory=dict)
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        shape = _shape(statement)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == N_PLUS_ONE_THRESHOLD:
+            self.repeated[shape] = _stack_summary()
+
+
+_current: ContextVar[QueryLog | None] = ContextVar("query_log", default=None)
+
+
+def query_budget(max_queries: int):
+    """Declare the maximum number of SQL statements a route may issue."""
+
+    def decorator(endpoint):
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+
+    return decorator
+
+
+def _shape(statement: str) -> str:
+    # Collapse whitespace and expanded IN lists so "IN (?, ?)" and
+    # "IN (?, ?, ?)" count as the same statement.
+    return _PARAM_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _stack_summary(limit: int = 6) -> str:
+    frames = [
+        f
+        for f in traceback.extract_stack()
+        if f.filename.startswith(_APP_DIR) and f.filename != __file__
+    ]
+    return "".join(traceback.format_list(frames[-limit:]))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    log = _current.get()
+    if log is not None:
+        log.record(statement)
+
+
+def check(log: QueryLog, route: str, budget: int | None) -> list[str]:
+    """Return a list of problems found for the request (empty if none)."""
+    problems = []
+
+    if budget is not None and log.count > budget:
+        problems.append(f"{route} issued {log.count} queries (budget {budget})")
+
+    for shape, stack in log.repeated.items():
+        problems.append(
+            f"{route} repeated a statement {log.shapes[shape]} times "
+            f"(likely N+1): {shape}\n{stack}"
+        )
+
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """
+    ASGI middleware that opens a QueryLog for each HTTP request and checks it
+    against the matched route's budget just before the response starts.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or MODE == "off":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = _current.set(log)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                endpoint = scope.get("endpoint")
+                budget = getattr(endpoint, "__query_budget__", None)
+                route = f"{scope['method']} {scope['path']}"
+                problems = check(log, route, budget)
+
+                if problems and MODE == "raise":
+                    raise QueryBudgetExceeded("\n".join(problems))
+                for problem in problems:
+                    logger.warning("Query budget: %s", problem)
+
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(log.count).encode()))
+                message = {**message, "headers": headers}
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,214 @@
+"""
+Optional per-tenant sharding.
+
+With TENANT_SHARDING=1 each tenant's tools, agents and runs live in their
+own database, so one tenant's run volume and write locks do not slow the
+others down. The main database (DATABASE_URL) only keeps the shard
+directory (tenant_shards); tenants without an entry use SHARD_URL_TEMPLATE.
+
+Engines are kept in an LRU registry with a small pool each, which bounds
+the number of open connections no matter how many tenants there are.
+Every shard is migrated to the latest Alembic revision the first time
+this process opens it.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.errors import OverloadedError
+
+from .database import enable_sqlite_foreign_keys, engine as main_engine
+
+ENABLED = os.getenv("TENANT_SHARDING") == "1"
+SHARD_URL_TEMPLATE = os.getenv(
+    "SHARD_URL_TEMPLATE", "sqlite:///./shards/{tenant_id}.db"
+)
+
+# At most MAX_OPEN_SHARDS * SHARD_POOL_SIZE shard connections are open.
+MAX_OPEN_SHARDS = int(os.getenv("MAX_OPEN_SHARDS", "16"))
+SHARD_POOL_SIZE = int(os.getenv("SHARD_POOL_SIZE", "2"))
+
+# Directory entries are re-read at most this often per tenant, so a move
+# or freeze done by another process is picked up within this interval.
+DIRECTORY_TTL_SECONDS = 1.0
+
+_MOVING = "Tenant is being moved, retry shortly"
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+_LOOKUP_SQL = text("SELECT url, frozen FROM tenant_shards WHERE tenant_id = :tenant_id")
+_ASSIGN_SQL = text(
+    "INSERT INTO tenant_shards (tenant_id, url, frozen) "
+    "VALUES (:tenant_id, :url, :frozen) "
+    "ON CONFLICT (tenant_id) DO UPDATE "
+    "SET url = excluded.url, frozen = excluded.frozen"
+)
+
+
+def migrate(engine: Engine) -> None:
+    """Upgrade one shard to the latest revision."""
+    cfg = Config()
+    cfg.set_main_option("script_location", str(MIGRATIONS_DIR))
+    sqlite = engine.dialect.name == "sqlite"
+    with engine.connect() as conn:
+        # As under the alembic CLI: table rebuilds in migrations must not
+        # cascade. The pragma is a no-op inside a transaction, so it is set
+        # before the migration's transaction begins.
+        if sqlite:
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+        with conn.begin():
+            cfg.attributes["connection"] = conn
+            command.upgrade(cfg, "head")
+        if sqlite:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            conn.commit()
+
+
+class ShardRegistry:
+    def __init__(
+        self,
+        directory: Engine,
+        url_template: str = SHARD_URL_TEMPLATE,
+        max_open: int = MAX_OPEN_SHARDS,
+        pool_size: int = SHARD_POOL_SIZE,
+    ) -> None:
+        self._directory = directory
+        self._url_template = url_template
+        self._max_open = max_open
+        self._pool_size = pool_size
+        self._lock = threading.Lock()
+        self._shards: OrderedDict[str, tuple[Engine, sessionmaker]] = OrderedDict()
+        self._opening: dict[str, threading.Lock] = {}
+        self._migrated: set[str] = set()
+        self._lookups: dict[str, tuple[str, bool, float]] = {}
+
+    def default_url(self, tenant_id: str) -> str:
+        return self._url_template.format(tenant_id=tenant_id)
+
+    def lookup(self, tenant_id: str, fresh: bool = False) -> tuple[str, bool]:
+        """Return (shard url, frozen) for a tenant."""
+        now = time.monotonic()
+        cached = self._lookups.get(tenant_id)
+        if not fresh and cached is not None and now - cached[2] < DIRECTORY_TTL_SECONDS:
+            return cached[0], cached[1]
+
+        with self._directory.connect() as conn:
+            row = conn.execute(_LOOKUP_SQL, {"tenant_id": tenant_id}).first()
+        if row is None:
+            url, frozen = self.default_url(tenant_id), False
+        else:
+            url, frozen = row.url, bool(row.frozen)
+
+        self._lookups[tenant_id] = (url, frozen, now)
+        return url, frozen
+
+    def assign(self, tenant_id: str, url: str, frozen: bool = False) -> None:
+        with self._directory.begin() as conn:
+            conn.execute(
+                _ASSIGN_SQL, {"tenant_id": tenant_id, "url": url, "frozen": frozen}
+            )
+        self._lookups.pop(tenant_id, None)
+
+    def session_factory(self, tenant_id: str) -> tuple[sessionmaker, bool]:
+        """Return (session factory for the tenant's shard, frozen)."""
+        url, frozen = self.lookup(tenant_id)
+        return self._open(url)[1], frozen
+
+    def write_session(self, tenant_id: str) -> Session:
+        """
+        Open a session for writes on the tenant's shard.
+
+        Raises OverloadedError while the tenant is frozen for a move. The
+        session re-checks the directory when it commits (see
+        _refuse_commit_during_move), so a write that started before the
+        freeze can never land on the old shard after the move copied it.
+        """
+        url, frozen = self.lookup(tenant_id)
+        if frozen:
+            raise OverloadedError(_MOVING, retry_after=1)
+        db = self._open(url)[1]()
+        db.info["shard"] = (self, tenant_id, url)
+        return db
+
+    def engine(self, url: str) -> Engine:
+        return self._open(url)[0]
+
+    def _open(self, url: str) -> tuple[Engine, sessionmaker]:
+        with self._lock:
+            shard = self._shards.get(url)
+            if shard is not None:
+                self._shards.move_to_end(url)
+                return shard
+            opening = self._opening.setdefault(url, threading.Lock())
+
+        # Creating and migrating a shard can take a while; only callers of
+        # the same shard wait for it.
+        with opening:
+            with self._lock:
+                shard = self._shards.get(url)
+            if shard is None:
+                shard = self._create(url)
+                with self._lock:
+                    self._shards[url] = shard
+                    self._opening.pop(url, None)
+                    while len(self._shards) > self._max_open:
+                        _, (evicted, _) = self._shards.popitem(last=False)
+                        # Connections still checked out are closed when
+                        # their sessions end.
+                        evicted.dispose()
+        return shard
+
+    def _create(self, url: str) -> tuple[Engine, sessionmaker]:
+        u = make_url(url)
+        sqlite = u.get_backend_name() == "sqlite"
+        if sqlite and u.database:
+            Path(u.database).parent.mkdir(parents=True, exist_ok=True)
+
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False} if sqlite else {},
+            pool_size=self._pool_size,
+            max_overflow=0,
+        )
+        if sqlite:
+            event.listen(engine, "connect", enable_sqlite_foreign_keys)
+
+        if url not in self._migrated:
+            migrate(engine)
+            self._migrated.add(url)
+
+        return engine, sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"open": len(self._shards), "max_open": self._max_open}
+
+    def dispose(self) -> None:
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), OrderedDict()
+        for engine, _ in shards:
+            engine.dispose()
+
+
+registry = ShardRegistry(main_engine)
+
+
+@event.listens_for(Session, "before_commit")
+def _refuse_commit_during_move(session):
+    shard = session.info.get("shard")
+    if shard is None:
+        return
+    owner, tenant_id, url = shard
+    current_url, frozen = owner.lookup(tenant_id, fresh=True)
+    if frozen or current_url != url:
+        raise OverloadedError(_MOVING, retry_after=1)
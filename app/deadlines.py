@@ -0,0 +1,122 @@
+"""
+Request deadlines and cancellation.
+
+A Deadline is created per request by the `with_deadline` route dependency
+(from the X-Request-Timeout header, capped by the route's default) and
+cancelled when the client disconnects. It is carried in a context
+variable, which follows the request into the worker thread, so that
+
+- the LLM scheduler stops waiting for a slot and RunsService stops before
+  the provider call and before committing,
+- SQLite aborts running statements (a progress handler checks it every
+  few thousand VM instructions); the resulting error is replaced by the
+  deadline's DomainError, so routers map it like any other.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.errors import DeadlineExceededError, RequestCancelledError
+
+HEADER = "X-Request-Timeout"
+
+# SQLite VM instructions between two deadline checks.
+PROGRESS_INTERVAL = 10_000
+
+_current: ContextVar["Deadline | None"] = ContextVar("deadline", default=None)
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def done(self) -> bool:
+        return self.cancelled or time.monotonic() >= self.expires_at
+
+    def error(self) -> Exception:
+        if self.cancelled:
+            return RequestCancelledError("Client closed the request")
+        return DeadlineExceededError("Request deadline exceeded")
+
+    def check(self) -> None:
+        if self.done():
+            raise self.error()
+
+
+def sleep(seconds: float) -> None:
+    """
+    Wait `seconds`, like a blocking provider call would; raises the current
+    request's deadline error as soon as it passes or the request is cancelled.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        if seconds > 0:
+            time.sleep(seconds)
+        return
+    deadline._cancelled.wait(min(seconds, deadline.remaining()))
+    deadline.check()
+
+
+def current() -> Deadline | None:
+    return _current.get()
+
+
+def check() -> None:
+    """Raise if the current request's deadline passed or it was cancelled."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
+
+
+@contextmanager
+def bound(deadline: Deadline | None):
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def detached():
+    """Run bookkeeping (e.g. recording a timed-out run) past the deadline."""
+    return bound(None)
+
+
+def _progress_handler() -> int:
+    deadline = _current.get()
+    return 1 if deadline is not None and deadline.done() else 0
+
+
+@event.listens_for(Engine, "connect")
+def _install_progress_handler(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.set_progress_handler(_progress_handler, PROGRESS_INTERVAL)
+
+
+@event.listens_for(Engine, "handle_error")
+def _raise_deadline_error(context):
+    deadline = _current.get()
+    if (
+        deadline is not None
+        and deadline.done()
+        and isinstance(context.original_exception, sqlite3.OperationalError)
+        and "interrupted" in str(context.original_exception)
+    ):
+        raise deadline.error()
@@ -1,9 +1,13 @@
+import asyncio
 from typing import Generator
 
-from fastapi import Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Request
 from sqlalchemy.orm import Session
 
-from .db.database import SessionLocal
+from . import admission, deadlines
+from .core.errors import OverloadedError
+from .db import shards
+from .db.database import ReadSessionLocal, SessionLocal, wrote_recently
 
 API_KEYS = {
     "key_tenant_a": "tenant_a",
@@ -25,9 +29,141 @@ def get_tenant_id(x_api_key: str = Header(default=None, alias="X-API-Key")) -> s
     return API_KEYS[x_api_key]
 
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+def get_db(
+    tenant_id: str = Depends(get_tenant_id),
+) -> Generator[Session, None, None]:
+    """
+    Session on the write side (primary, small dedicated pool).
+
+    In sharding mode the session is bound to the tenant's shard; writes are
+    refused with 503 while the tenant is frozen for a move.
+    """
+    try:
+        db = write_session(tenant_id)
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def write_session(tenant_id: str) -> Session:
+    """
+    A write-side session for the tenant, also for work outside a request
+    (e.g. replay jobs). Raises OverloadedError while the tenant is frozen.
+    """
+    if shards.ENABLED:
+        db = shards.registry.write_session(tenant_id)
+    else:
+        db = SessionLocal()
+    db.info["tenant_id"] = tenant_id
+    return db
+
+
+def get_read_db(
+    tenant_id: str = Depends(get_tenant_id),
+) -> Generator[Session, None, None]:
+    """
+    Session on the read side (read-only connection or replica).
+
+    A tenant that wrote within READ_YOUR_WRITES_SECONDS is served from the
+    write side instead, so it always sees its own writes. In sharding mode
+    reads use the tenant's shard.
+    """
+    db = read_session(tenant_id)
     try:
         yield db
     finally:
         db.close()
+
+
+def read_session(tenant_id: str) -> Session:
+    """A read-side session for the tenant, as get_read_db picks it."""
+    if shards.ENABLED:
+        factory, _ = shards.registry.session_factory(tenant_id)
+    elif wrote_recently(tenant_id):
+        factory = SessionLocal
+    else:
+        factory = ReadSessionLocal
+    return factory()
+
+
+def admitted(controller: str):
+    """
+    Route dependency that applies the named app.admission controller.
+
+    Declared in the route decorator and async, so it runs on the event loop
+    before the request takes (or waits for) a worker thread. The API key is
+    checked first: unauthenticated requests must not take admission slots
+    or pull the latency estimate down with their fast 401s.
+    """
+
+    async def dependency(
+        x_api_key: str = Header(default=None, alias="X-API-Key"),
+    ):
+        get_tenant_id(x_api_key)
+        if not admission.ENABLED:
+            yield
+            return
+
+        ctl = getattr(admission, controller)
+        try:
+            started = ctl.enter()
+        except OverloadedError as e:
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        try:
+            yield
+        finally:
+            ctl.exit(started)
+
+    return dependency
+
+
+async def _watch_disconnect(request: Request, deadline: deadlines.Deadline) -> None:
+    # Only used on routes whose body has already been read, so the watcher
+    # takes no messages the endpoint needs. After the (possibly empty) body
+    # a server only ever sends http.disconnect; anything else means the
+    # caller is not a real connection (e.g. the start-up warm-up), so stop.
+    body_done = False
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            deadline.cancel()
+            return
+        if body_done:
+            return
+        body_done = not message.get("more_body", False)
+
+
+def with_deadline(seconds: float):
+    """
+    Route dependency that gives the request a deadline (see app.deadlines).
+
+    The client may shorten it with the X-Request-Timeout header (seconds);
+    it is cancelled if the client disconnects.
+    """
+
+    async def dependency(
+        request: Request,
+        timeout: float | None = Header(default=None, alias=deadlines.HEADER),
+    ):
+        if timeout is not None:
+            timeout = min(max(timeout, 0.0), seconds)
+        deadline = deadlines.Deadline(seconds if timeout is None else timeout)
+        watcher = asyncio.create_task(_watch_disconnect(request, deadline))
+        try:
+            with deadlines.bound(deadline):
+                yield deadline
+        finally:
+            watcher.cancel()
+
+    return dependency
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, TypeVar
+
+from app.core.errors import BadRequestError, ConflictError
+
+T = TypeVar("T")
+
+TTL_SECONDS = 24 * 60 * 60
+WAIT_TIMEOUT_SECONDS = 30
+MAX_KEY_LENGTH = 255
+MAX_KEYS = 10_000
+
+# In-memory per-tenant idempotency store, same trade-offs as rate_limit:
+# entries live in this process only, so retries must reach the same worker.
+_entries: "OrderedDict[tuple[str, str], _Entry]" = OrderedDict()
+_lock = threading.Lock()
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "done", "result", "expires_at")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result = None
+        self.expires_at: float | None = None
+
+
+def _evict(now: float) -> None:
+    # Completed entries share one TTL, so the oldest sit at the front.
+    while _entries:
+        entry = next(iter(_entries.values()))
+        expired = entry.expires_at is not None and entry.expires_at <= now
+        if not expired and len(_entries) <= MAX_KEYS:
+            break
+        if entry.expires_at is None:
+            # Never drop an in-flight entry; its owner will finish it.
+            break
+        _entries.popitem(last=False)
+
+
+def run_once(
+    tenant_id: str, key: str, fingerprint: str, fn: Callable[[], T]
+) -> tuple[T, bool]:
+    """
+    Run fn at most once per (tenant_id, key) within TTL_SECONDS.
+
+    Returns (result, replayed). A request arriving while the first one with
+    the same key is still running waits for its result. If the first one
+    fails nothing is stored and the next attempt runs fn itself.
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise BadRequestError("Invalid Idempotency-Key")
+
+    k = (tenant_id, key)
+
+    while True:
+        with _lock:
+            _evict(time.time())
+            entry = _entries.get(k)
+            owner = entry is None
+            if owner:
+                entry = _Entry(fingerprint)
+                _entries[k] = entry
+
+        if owner:
+            try:
+                result = fn()
+            except BaseException:
+                with _lock:
+                    _entries.pop(k, None)
+                entry.done.set()
+                raise
+
+            with _lock:
+                entry.result = result
+                entry.expires_at = time.time() + TTL_SECONDS
+                _entries.move_to_end(k)
+            entry.done.set()
+            return result, False
+
+        if entry.fingerprint != fingerprint:
+            raise ConflictError("Idempotency-Key reused with a different request")
+
+        if not entry.done.wait(WAIT_TIMEOUT_SECONDS):
+            raise ConflictError("A request with this Idempotency-Key is in progress")
+
+        if entry.expires_at is not None:
+            return entry.result, True
+        # The first request failed; try again as the owner.
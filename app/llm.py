@@ -1,6 +1,40 @@
 import hashlib
+import math
+import os
+import re
+from typing import Iterator
 
-SUPPORTED_MODELS: set[str] = {"gpt-4o"}
+from app import model_registry
+
+# Context window per model, in tokens.
+CONTEXT_TOKENS: dict[str, int] = {"gpt-4o": 128_000}
+
+# Average characters per token of each model's tokenizer on English text;
+# close enough for budgeting and cost tracking without loading a tokenizer.
+CHARS_PER_TOKEN: dict[str, float] = {"gpt-4o": 4.0}
+
+# Part of the context window kept free for the response.
+RESPONSE_TOKEN_RESERVE = int(os.getenv("RESPONSE_TOKEN_RESERVE", "1024"))
+
+TRUNCATION_MARKER = " [truncated]"
+
+
+def estimate_tokens(model: str, text: str) -> int:
+    """Approximate token count of `text` for `model`; O(1) in the text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN.get(model, 4.0))
+
+
+def prompt_budget(model: str) -> int:
+    """Most prompt tokens `model` accepts while leaving room to answer."""
+    return CONTEXT_TOKENS[model] - RESPONSE_TOKEN_RESERVE
+
+
+def truncate_to_tokens(model: str, text: str, max_tokens: int) -> str:
+    """Cut `text` (marking the cut) so that it fits in `max_tokens`."""
+    if estimate_tokens(model, text) <= max_tokens:
+        return text
+    chars = int(max_tokens * CHARS_PER_TOKEN.get(model, 4.0)) - len(TRUNCATION_MARKER)
+    return text[: max(0, chars)] + TRUNCATION_MARKER
 
 
 def mock_llm_complete(model: str, prompt: str) -> str:
@@ -9,9 +43,74 @@ def mock_llm_complete(model: str, prompt: str) -> str:
 
     Generates a stable response by hashing the model and prompt,
     ensuring predictable behavior for tests without external API calls.
+    Latency and errors follow the configured mock provider.
     """
-    if model not in SUPPORTED_MODELS:
+    text = _mock_response(model, prompt)
+    return model_registry.registry.call(
+        model, lambda provider, cancel: "".join(provider.stream(model, text, cancel))
+    )
+
+
+def mock_llm_stream(model: str, prompt: str) -> Iterator[str]:
+    """mock_llm_complete's response, in chunks paced by the mock provider."""
+    text = _mock_response(model, prompt)
+    return model_registry.registry.stream(
+        model, lambda provider: provider.stream(model, text)
+    )
+
+
+def _mock_response(model: str, prompt: str) -> str:
+    if model not in model_registry.registry:
         raise ValueError(f"Unsupported model: {model}")
 
     digest = hashlib.sha256(f"{model}::{prompt}".encode("utf-8")).hexdigest()[:16]
     return f"[mock:{model}] digest={digest} | response=OK"
+
+
+_TASK_LINE = re.compile(r"^Task: (.*)$", re.MULTILINE)
+
+
+def mock_llm_tool_calls(
+    model: str, prompt: str, tools: list[str], observations: list[str]
+) -> list[tuple[str, dict]]:
+    """
+    Deterministic mock of a tool-calling model turn.
+
+    Asks for every offered tool once, with the task as the query, and
+    answers (no calls) as soon as it has seen tool results.
+    """
+    if model not in model_registry.registry:
+        raise ValueError(f"Unsupported model: {model}")
+    model_registry.registry.call(
+        model, lambda provider, cancel: provider.call(model, cancel)
+    )
+    if observations:
+        return []
+
+    match = _TASK_LINE.search(prompt)
+    query = match.group(1) if match else prompt
+    return [(name, {"query": query}) for name in tools]
+
+
+# Words kept from each turn folded into a conversation summary.
+SUMMARY_WORDS_PER_TURN = 24
+
+
+def mock_llm_summarize(model: str, summary: str, text: str, max_tokens: int) -> str:
+    """
+    Deterministic mock of folding one more turn into a running summary.
+
+    Keeps the first words of each folded turn; once the summary would go
+    over max_tokens, the oldest part is dropped.
+    """
+    if model not in model_registry.registry:
+        raise ValueError(f"Unsupported model: {model}")
+    model_registry.registry.call(
+        model, lambda provider, cancel: provider.call(model, cancel)
+    )
+
+    gist = " ".join(text.split()[:SUMMARY_WORDS_PER_TURN])
+    merged = f"{summary} | {gist}" if summary else gist
+    if estimate_tokens(model, merged) <= max_tokens:
+        return merged
+    return merged[-int(max_tokens * CHARS_PER_TOKEN.get(model, 4.0)) :]
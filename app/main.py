@@ -1,17 +1,52 @@
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI, Depends
+from starlette.concurrency import run_in_threadpool
+
+from app import quotas, scheduler, schedules, webhooks
+from app.compression import CompressionMiddleware
 
 from app.deps import get_tenant_id
+from app.db.database import engine, read_engine
+from app.db.query_budget import QueryBudgetMiddleware
+from app.warmup import warm_routes, warm_up
 from app.api.routers.tools import router as tools_router
 from app.api.routers.agents import router as agents_router
 from app.api.routers.runs import router as runs_router
+from app.api.routers.metrics import router as metrics_router
+from app.api.routers.analytics import router as analytics_router
+from app.api.routers.replays import router as replays_router
+from app.api.routers.webhooks import router as webhooks_router
+from app.api.routers.usage import router as usage_router
+from app.api.routers.schedules import router as schedules_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    to_thread.current_default_thread_limiter().total_tokens = scheduler.THREADPOOL_SIZE
+    await run_in_threadpool(warm_up, engine, read_engine)
+    await warm_routes(app)
+    await run_in_threadpool(quotas.tracker.sync)
+    quotas.tracker.start()
+    webhooks.dispatcher.start()
+    schedules.runner.start()
+    yield
+    await run_in_threadpool(schedules.runner.stop)
+    await run_in_threadpool(webhooks.dispatcher.stop)
+    await run_in_threadpool(quotas.tracker.stop)
 
 
 app = FastAPI(
     title="Mini Agent Platform",
     description="Multi-tenant Agent Platform with Tools, Agents, deterministic mock LLM execution and run history.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(QueryBudgetMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 
 @app.get("/")
 def root():
@@ -31,3 +66,9 @@ def whoami(tenant_id: str = Depends(get_tenant_id)):
 app.include_router(tools_router)
 app.include_router(agents_router)
 app.include_router(runs_router)
+app.include_router(analytics_router)
+app.include_router(replays_router)
+app.include_router(webhooks_router)
+app.include_router(usage_router)
+app.include_router(schedules_router)
+app.include_router(metrics_router)
@@ -0,0 +1,180 @@
+"""
+Simulated provider behavior for the mock LLM.
+
+By default mock model calls return at once. Setting MOCK_LLM_LATENCY makes
+every call (tool-calling turns, completions, summaries) wait like a real
+provider, and MOCK_LLM_ERROR_RATE makes some of them fail with
+ProviderError, so concurrency limits, deadlines and load shedding can be
+exercised locally and in the benchmarks.
+
+Both settings take a default and per-model overrides, e.g.
+
+    MOCK_LLM_LATENCY="lognormal:800:0.5,gpt-4o=long_tail:300:1.5"
+    MOCK_LLM_ERROR_RATE="0.01,gpt-4o=0.05"
+
+Latency profiles (times in milliseconds):
+
+- fixed:MS                 always MS
+- lognormal:MEDIAN:SIGMA   lognormal around MEDIAN; SIGMA widens the spread
+- long_tail:MIN:ALPHA      Pareto from MIN; the smaller ALPHA, the heavier the tail
+
+The latency is the time to the first chunk. Completions then arrive in
+chunks of about MOCK_LLM_CHUNK_CHARS characters, MOCK_LLM_CHUNK_MS apart.
+
+Draws come from one random generator per model seeded with MOCK_LLM_SEED,
+so the n-th call to a model always gets the same latency and outcome.
+Waits end early with the request's deadline error once it passes, or with
+ProviderError when the caller cancels the call (a hedge that lost).
+
+Each backend of a model in app.model_registry has its own MockProvider.
+"""
+
+import math
+import os
+import random
+import threading
+from typing import Iterator
+
+from app import deadlines
+from app.core.errors import ProviderError
+
+
+class LatencyProfile:
+    """A latency distribution, sampled in seconds."""
+
+    def __init__(self, kind: str, params: tuple[float, ...]):
+        arity = {"fixed": 1, "lognormal": 2, "long_tail": 2}
+        if kind not in arity:
+            raise ValueError(f"Unknown latency profile: {kind}")
+        if len(params) != arity[kind]:
+            raise ValueError(f"{kind} takes {arity[kind]} parameter(s)")
+        if kind == "long_tail" and params[1] <= 0:
+            raise ValueError("long_tail ALPHA must be positive")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyProfile":
+        """Parse "kind:param:param" (see the module docstring)."""
+        kind, *params = spec.strip().split(":")
+        return cls(kind, tuple(float(p) for p in params))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            ms = rng.lognormvariate(math.log(median), sigma)
+        else:
+            low, alpha = self.params
+            ms = low * rng.paretovariate(alpha)
+        return ms / 1000
+
+    @property
+    def mean(self) -> float:
+        """Expected latency in seconds (inf for tails too heavy to have one)."""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            ms = median * math.exp(sigma**2 / 2)
+        else:
+            low, alpha = self.params
+            ms = low * alpha / (alpha - 1) if alpha > 1 else math.inf
+        return ms / 1000
+
+
+def parse_per_model(spec: str, parse=str) -> dict[str | None, object]:
+    """
+    Parse "default,model=value,..." into {None: default, model: value}.
+
+    Only the part before the first "=" of an item is taken as the model.
+    """
+    values = {}
+    for item in filter(None, (p.strip() for p in spec.split(","))):
+        model, sep, value = item.partition("=")
+        if sep:
+            values[model.strip()] = parse(value)
+        else:
+            values[None] = parse(item)
+    return values
+
+
+class MockProvider:
+    def __init__(
+        self,
+        latency: dict[str | None, LatencyProfile] | None = None,
+        error_rate: dict[str | None, float] | None = None,
+        chunk_chars: int = 16,
+        chunk_seconds: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency = latency or {}
+        self.error_rate = error_rate or {}
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_seconds = chunk_seconds
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._rngs: dict[str, random.Random] = {}
+        self._calls = 0
+        self._errors = 0
+
+    @classmethod
+    def from_env(cls, seed_offset: int = 0) -> "MockProvider":
+        """Configured from the settings; backends differ by seed_offset."""
+        return cls(
+            latency=parse_per_model(
+                os.getenv("MOCK_LLM_LATENCY", ""), LatencyProfile.parse
+            ),
+            error_rate=parse_per_model(os.getenv("MOCK_LLM_ERROR_RATE", ""), float),
+            chunk_chars=int(os.getenv("MOCK_LLM_CHUNK_CHARS", "16")),
+            chunk_seconds=float(os.getenv("MOCK_LLM_CHUNK_MS", "0")) / 1000,
+            seed=int(os.getenv("MOCK_LLM_SEED", "0")) + seed_offset,
+        )
+
+    def _draw(self, model: str) -> tuple[float, bool]:
+        profile = self.latency.get(model, self.latency.get(None))
+        error_rate = self.error_rate.get(model, self.error_rate.get(None, 0.0))
+        with self._lock:
+            rng = self._rngs.get(model)
+            if rng is None:
+                rng = self._rngs[model] = random.Random(f"{self.seed}:{model}")
+            # Always draw both so one setting does not shift the other's sequence.
+            delay = profile.sample(rng) if profile is not None else 0.0
+            failed = rng.random() < error_rate
+            self._calls += 1
+            self._errors += failed
+        return delay, failed
+
+    def call(self, model: str, cancel: threading.Event | None = None) -> None:
+        """Wait for the provider's first response; raise if the call fails."""
+        delay, failed = self._draw(model)
+        _wait(delay, cancel)
+        if failed:
+            raise ProviderError(f"{model} provider returned an error")
+
+    def stream(
+        self, model: str, text: str, cancel: threading.Event | None = None
+    ) -> Iterator[str]:
+        """Yield `text` in chunks, paced like a streamed completion."""
+        self.call(model, cancel)
+        for start in range(0, len(text), self.chunk_chars):
+            if start:
+                _wait(self.chunk_seconds, cancel)
+            yield text[start : start + self.chunk_chars]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self._calls, "injected_errors": self._errors}
+
+
+def _wait(seconds: float, cancel: threading.Event | None) -> None:
+    if cancel is None:
+        # Still wakes up when the request is cancelled.
+        deadlines.sleep(seconds)
+        return
+    deadline = deadlines.current()
+    cancel.wait(min(seconds, deadline.remaining()) if deadline else seconds)
+    if cancel.is_set():
+        raise ProviderError("Call cancelled")
+    deadlines.check()
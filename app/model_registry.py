@@ -0,0 +1,265 @@
+"""
+Supported models and the backends that serve them.
+
+Each model has one or more backends (here MockProvider stand-ins; in
+production, provider regions or deployments). Every call updates its
+backend's latency statistics: an EWMA and a window of recent samples for
+percentiles. A backend that fails BACKEND_FAILURE_THRESHOLD calls in a row
+is taken out of rotation for BACKEND_COOLDOWN_SECONDS, then gets traffic
+again and is back for good after one success.
+
+A call goes to the healthy backend with the lowest EWMA (backends without
+samples first, so new ones get measured). A small share of calls
+(BACKEND_PROBE_RATE) goes to another healthy backend instead, so a backend
+that was slow once is measured again later.
+
+With LLM_HEDGING=1, if the chosen backend has not answered after its
+HEDGE_PERCENTILE latency (or failed before that), the same call is also
+sent to the next best backend. The first success wins and the other call is cancelled, so a
+slow backend costs at most one percentile wait instead of its whole tail,
+for about (1 - HEDGE_PERCENTILE) extra provider calls. Only calls that
+return a whole result are hedged; a stream stays on its backend.
+"""
+
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, TypeVar
+
+from app.core.errors import DeadlineExceededError, RequestCancelledError
+from app.mock_provider import MockProvider
+
+T = TypeVar("T")
+
+# Stand-in backends per model, each a MockProvider with its own seed.
+MODEL_BACKENDS = int(os.getenv("MODEL_BACKENDS", "1"))
+
+# Weight of the newest sample in a backend's latency EWMA.
+EWMA_ALPHA = float(os.getenv("BACKEND_EWMA_ALPHA", "0.2"))
+
+# Latency percentiles are computed over this many recent calls per backend.
+LATENCY_SAMPLES = 200
+
+FAILURE_THRESHOLD = int(os.getenv("BACKEND_FAILURE_THRESHOLD", "3"))
+COOLDOWN_SECONDS = float(os.getenv("BACKEND_COOLDOWN_SECONDS", "10"))
+PROBE_RATE = float(os.getenv("BACKEND_PROBE_RATE", "0.02"))
+
+HEDGING = os.getenv("LLM_HEDGING", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+# Hedge delay while a backend has fewer than HEDGE_MIN_SAMPLES samples.
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("HEDGE_DEFAULT_DELAY_MS", "1000")) / 1000
+HEDGE_MIN_SAMPLES = 20
+
+# Threads running hedged calls; both attempts of a call run here while the
+# caller waits.
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "64"))
+
+
+class Backend:
+    def __init__(self, name: str, provider: MockProvider):
+        self.name = name
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._samples: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.ewma: float | None = None
+        self._failures_in_row = 0
+        self._down_until = 0.0
+        self.calls = 0
+        self.failures = 0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.failures += 1
+                self._failures_in_row += 1
+                if self._failures_in_row >= FAILURE_THRESHOLD:
+                    self._down_until = time.monotonic() + COOLDOWN_SECONDS
+                return
+            self._failures_in_row = 0
+            self._samples.append(seconds)
+            self.ewma = (
+                seconds
+                if self.ewma is None
+                else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma
+            )
+
+    def healthy(self, now: float | None = None) -> bool:
+        return (now or time.monotonic()) >= self._down_until
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> dict:
+        p95 = self.percentile(0.95)
+        return {
+            "name": self.name,
+            "healthy": self.healthy(),
+            "ewma_ms": None if self.ewma is None else round(self.ewma * 1000, 1),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        models: dict[str, list[Backend]],
+        hedging: bool = HEDGING,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        probe_rate: float = PROBE_RATE,
+        seed: int | None = None,
+    ):
+        self._models = models
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.probe_rate = probe_rate
+        self._rng = random.Random(seed)
+        self._pool = ThreadPoolExecutor(HEDGE_WORKERS, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedges_won = 0
+
+    @classmethod
+    def stand_in(cls, models: list[str], backends: int = MODEL_BACKENDS, **kwargs):
+        """Each model served by `backends` MockProviders configured from env."""
+        return cls(
+            {
+                model: [
+                    Backend(f"{model}-{i}", MockProvider.from_env(seed_offset=i))
+                    for i in range(max(1, backends))
+                ]
+                for model in models
+            },
+            **kwargs,
+        )
+
+    def __contains__(self, model: str) -> bool:
+        return model in self._models
+
+    def names(self) -> list[str]:
+        return sorted(self._models)
+
+    def backends(self, model: str) -> list[Backend]:
+        return self._models[model]
+
+    def rank(self, model: str) -> list[Backend]:
+        """Backends in the order calls try them."""
+        now = time.monotonic()
+        backends = self._models[model]
+        healthy = [b for b in backends if b.healthy(now)]
+        # With every backend down, keep serving from all of them.
+        ranked = sorted(healthy or backends, key=lambda b: b.ewma or 0.0)
+        with self._lock:
+            if len(ranked) > 1 and self._rng.random() < self.probe_rate:
+                ranked.insert(0, ranked.pop(self._rng.randrange(1, len(ranked))))
+        return ranked
+
+    def call(
+        self, model: str, fn: Callable[[MockProvider, threading.Event | None], T]
+    ) -> T:
+        """
+        Run fn(provider, cancel) on the best backend, hedged if enabled.
+
+        fn must give up (raise) once `cancel` is set; it is None when the
+        call is not hedged.
+        """
+        ranked = self.rank(model)
+        if not self.hedging or len(ranked) < 2:
+            return _attempt(ranked[0], fn, None)
+        return self._hedged(ranked[0], ranked[1], fn)
+
+    def _hedged(self, primary: Backend, secondary: Backend, fn) -> T:
+        cancels = {}
+
+        def submit(backend: Backend) -> Future:
+            cancel = threading.Event()
+            # Copy the context so attempts see the request's deadline.
+            future = self._pool.submit(
+                contextvars.copy_context().run, _attempt, backend, fn, cancel
+            )
+            cancels[future] = cancel
+            return future
+
+        first = submit(primary)
+        delay = primary.percentile(self.hedge_percentile)
+        done, pending = wait(
+            [first],
+            timeout=HEDGE_DEFAULT_DELAY_SECONDS if delay is None else delay,
+        )
+        if pending or first.exception() is not None:
+            with self._lock:
+                self.hedged += 1
+            pending.add(submit(secondary))
+
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        cancels[other].set()
+                    if future is not first:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return future.result()
+                error = error or future.exception()
+            if not pending:
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    def stream(
+        self, model: str, fn: Callable[[MockProvider], Iterator[T]]
+    ) -> Iterator[T]:
+        """Yield from fn(provider) on the best backend (never hedged)."""
+        backend = self.rank(model)[0]
+        started = time.perf_counter()
+        try:
+            yield from fn(backend.provider)
+        except _NOT_THE_BACKEND:
+            raise
+        except Exception:
+            backend.record(time.perf_counter() - started, ok=False)
+            raise
+        backend.record(time.perf_counter() - started, ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hedging = {"hedged": self.hedged, "hedges_won": self.hedges_won}
+        return {
+            "hedging": {"enabled": self.hedging, **hedging},
+            "models": {
+                model: [b.stats() for b in backends]
+                for model, backends in self._models.items()
+            },
+        }
+
+
+# Errors that end a call without saying anything about its backend.
+_NOT_THE_BACKEND = (DeadlineExceededError, RequestCancelledError)
+
+
+def _attempt(backend: Backend, fn, cancel: threading.Event | None):
+    started = time.perf_counter()
+    try:
+        result = fn(backend.provider, cancel)
+    except _NOT_THE_BACKEND:
+        raise
+    except Exception:
+        # Nor does a hedge that was cancelled because the other one won.
+        if cancel is None or not cancel.is_set():
+            backend.record(time.perf_counter() - started, ok=False)
+        raise
+    backend.record(time.perf_counter() - started, ok=True)
+    return result
+
+
+registry = ModelRegistry.stand_in(["gpt-4o"])
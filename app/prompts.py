@@ -0,0 +1,78 @@
+"""
+Prompt assembly, shared by live runs, conversation turns and replays.
+
+Keeping it in one place means a replayed task is sent exactly as a new run
+of the same task would be today.
+"""
+
+from app.core.errors import BadRequestError
+from app.context_cache import ConversationContext
+from app.llm import estimate_tokens, prompt_budget, truncate_to_tokens
+
+INSTRUCTIONS = "Instructions: Respond as the agent, using tools when relevant.\n"
+
+_TOOLS_LINE = "\nTools: "
+_TASK_LINE = "\n\nTask: "
+
+
+def build_prompt(agent, task: str, history: str = "") -> str:
+    tool_names = ", ".join(sorted(agent.tool_names)) if agent.tool_names else "none"
+    return (
+        f"Agent Name: {agent.name}\n"
+        f"Role: {agent.role}\n"
+        f"Description: {agent.description}\n"
+        f"Tools: {tool_names}\n\n"
+        f"{history}"
+        f"Task: {task}\n"
+        f"{INSTRUCTIONS}"
+    )
+
+
+def conversation_history(context: ConversationContext) -> str:
+    summary = context.summary
+    return (
+        (f"Conversation summary: {summary}\n\n" if summary else "")
+        + "".join(context.window)
+        + ("\n" if context.window else "")
+    )
+
+
+def fit_task(
+    model: str,
+    agent,
+    task: str,
+    history: str = "",
+    overflow: str = "truncate",
+) -> str:
+    """
+    Return the task, truncated if needed so the prompt fits the model.
+
+    With overflow="reject" an oversized task raises BadRequestError instead.
+    """
+    budget = prompt_budget(model)
+    overhead = estimate_tokens(model, build_prompt(agent, "", history))
+    task_tokens = estimate_tokens(model, task)
+    if overhead + task_tokens <= budget:
+        return task
+
+    if overflow == "reject" or overhead >= budget:
+        raise BadRequestError(
+            f"Prompt is about {overhead + task_tokens} tokens; "
+            f"{model} accepts {budget}"
+        )
+    return truncate_to_tokens(model, task, budget - overhead)
+
+
+def task_from_prompt(prompt: str) -> str | None:
+    """
+    The task of a prompt built by build_prompt without history, or None if
+    the prompt does not have that shape. Used to backfill runs stored before
+    the task had its own column.
+    """
+    tools = prompt.find(_TOOLS_LINE)
+    start = prompt.find(_TASK_LINE, tools) if tools >= 0 else -1
+    end = len(prompt) - len("\n" + INSTRUCTIONS)
+    if start < 0 or not prompt.endswith("\n" + INSTRUCTIONS):
+        return None
+    start += len(_TASK_LINE)
+    return prompt[start:end] if start <= end else None
@@ -0,0 +1,304 @@
+"""
+Per-tenant daily and monthly quotas on runs and tokens.
+
+Limits come from QUOTA_RUNS_PER_DAY, QUOTA_RUNS_PER_MONTH,
+QUOTA_TOKENS_PER_DAY and QUOTA_TOKENS_PER_MONTH, each "default,tenant=limit"
+(e.g. "1000,tenant_b=50"); 0 or unset means no limit. Periods are UTC
+calendar days and months.
+
+Checks never query the database. For each tenant and period a worker keeps
+the total it last read from tenant_usage plus what it counted since. A
+flush thread adds the worker's counts to tenant_usage every
+USAGE_FLUSH_SECONDS and on shutdown, then reads the totals back, which
+picks up the other workers' usage as well. Totals are loaded at start-up.
+
+Overshoot is bounded. Runs are reserved under a lock, so a single worker
+never admits more than the run limit. With several workers, a tenant can
+go over by at most what the other workers counted in one flush interval.
+Tokens are only known once a run is done, so runs are admitted while token
+usage is below the limit, and the last runs can overshoot by their own
+tokens.
+"""
+
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable
+
+from app import deps
+from app.core.errors import QuotaExceededError
+from app.repositories.usage_repo import UsageRepository
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("day", "month")
+METRICS = ("runs", "tokens")
+
+FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "5"))
+
+
+def parse_limits(spec: str) -> dict[str | None, int]:
+    """Parse "default,tenant=limit,..." into {None: default, tenant: limit}."""
+    limits = {}
+    for item in filter(None, (p.strip() for p in spec.split(","))):
+        tenant, sep, value = item.rpartition("=")
+        limits[tenant.strip() if sep else None] = int(value)
+    return limits
+
+
+def limits_from_env() -> dict[tuple[str, str], dict[str | None, int]]:
+    """{(metric, period): parse_limits(QUOTA_<METRIC>_PER_<PERIOD>)}."""
+    return {
+        (metric, period): parse_limits(
+            os.getenv(f"QUOTA_{metric.upper()}_PER_{period.upper()}", "")
+        )
+        for metric in METRICS
+        for period in PERIODS
+    }
+
+
+def period_start(period: str, now: datetime) -> datetime:
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start if period == "day" else start.replace(day=1)
+
+
+def period_end(period: str, start: datetime) -> datetime:
+    if period == "day":
+        return datetime.fromordinal(start.toordinal() + 1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+@dataclass
+class _Counter:
+    # [runs, tokens]: stored total as last read, sent in the flush that is
+    # in progress, and counted here since.
+    stored: list[int] = field(default_factory=lambda: [0, 0])
+    flushing: list[int] = field(default_factory=lambda: [0, 0])
+    pending: list[int] = field(default_factory=lambda: [0, 0])
+
+    def used(self, i: int) -> int:
+        return self.stored[i] + self.flushing[i] + self.pending[i]
+
+
+class UsageTracker:
+    def __init__(
+        self,
+        limits: dict[tuple[str, str], dict[str | None, int]] | None = None,
+        tenants: Callable[[], Iterable[str]] = lambda: deps.API_KEYS.values(),
+        flush_seconds: float = FLUSH_SECONDS,
+    ):
+        self.limits = limits_from_env() if limits is None else limits
+        self.tenants = tenants
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._syncing = threading.Lock()
+        # (tenant, period, period start) -> counter; past periods are kept
+        # until their counts are flushed.
+        self._counters: dict[tuple[str, str, datetime], _Counter] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._flushes = 0
+        self._flush_errors = 0
+
+    def limit(self, tenant_id: str, metric: str, period: str) -> int | None:
+        limits = self.limits.get((metric, period), {})
+        return limits.get(tenant_id, limits.get(None, 0)) or None
+
+    def _current(self, tenant_id: str, now: datetime) -> dict[str, _Counter]:
+        # Called with the lock held.
+        return {
+            period: self._counters.setdefault(
+                (tenant_id, period, period_start(period, now)), _Counter()
+            )
+            for period in PERIODS
+        }
+
+    def reserve(self, tenant_id: str) -> None:
+        """
+        Count one run, or raise QuotaExceededError if any of the tenant's
+        run or token quotas is used up.
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            counters = self._current(tenant_id, now)
+            for period, counter in counters.items():
+                for i, metric in enumerate(METRICS):
+                    limit = self.limit(tenant_id, metric, period)
+                    used = counter.used(i)
+                    if limit is not None and used >= limit:
+                        raise self._exceeded(metric, period, limit, used, now)
+            for counter in counters.values():
+                counter.pending[0] += 1
+
+    def release(self, tenant_id: str) -> None:
+        """Give back a reserved run that never reached the provider."""
+        self._add(tenant_id, runs=-1)
+
+    def charge(self, tenant_id: str, tokens: int) -> None:
+        """Count the tokens of a reserved run once they are known."""
+        self._add(tenant_id, tokens=tokens)
+
+    def _add(self, tenant_id: str, runs: int = 0, tokens: int = 0) -> None:
+        with self._lock:
+            for counter in self._current(tenant_id, datetime.utcnow()).values():
+                counter.pending[0] += runs
+                counter.pending[1] += tokens
+
+    @staticmethod
+    def _exceeded(
+        metric: str, period: str, limit: int, used: int, now: datetime
+    ) -> QuotaExceededError:
+        resets_at = period_end(period, period_start(period, now))
+        return QuotaExceededError(
+            f"Quota exceeded: {limit} {metric} per {period}",
+            quota={
+                "metric": metric,
+                "period": period,
+                "limit": limit,
+                "used": used,
+                "resets_at": resets_at.isoformat(),
+            },
+            retry_after=math.ceil((resets_at - now).total_seconds()),
+        )
+
+    def usage(self, tenant_id: str) -> dict[str, dict]:
+        """The tenant's usage and limits per period, as this worker knows them."""
+        now = datetime.utcnow()
+        with self._lock:
+            counters = self._current(tenant_id, now)
+            used = {period: (c.used(0), c.used(1)) for period, c in counters.items()}
+        result = {}
+        for period, (runs, tokens) in used.items():
+            start = period_start(period, now)
+            result[period] = {
+                "period_start": start,
+                "resets_at": period_end(period, start),
+                "runs": runs,
+                "runs_limit": self.limit(tenant_id, "runs", period),
+                "tokens": tokens,
+                "tokens_limit": self.limit(tenant_id, "tokens", period),
+            }
+        return result
+
+    def sync(self) -> None:
+        """Add the counts made here to tenant_usage and read the totals back."""
+        with self._syncing:
+            now = datetime.utcnow()
+            with self._lock:
+                tenants = set(self.tenants()) | {key[0] for key in self._counters}
+                for counter in self._counters.values():
+                    counter.flushing, counter.pending = counter.pending, [0, 0]
+            for tenant_id in tenants:
+                self._sync_tenant(tenant_id, now)
+            with self._lock:
+                self._flushes += 1
+                current = {period_start(p, now) for p in PERIODS}
+                for key in [
+                    key
+                    for key, c in self._counters.items()
+                    if key[2] not in current and c.pending == [0, 0]
+                ]:
+                    del self._counters[key]
+
+    def _sync_tenant(self, tenant_id: str, now: datetime) -> None:
+        with self._lock:
+            sending = {
+                key: counter
+                for key, counter in self._counters.items()
+                if key[0] == tenant_id and counter.flushing != [0, 0]
+            }
+            rows = [
+                {
+                    "tenant_id": tenant_id,
+                    "period": period,
+                    "period_start": start,
+                    "runs": counter.flushing[0],
+                    "tokens": counter.flushing[1],
+                }
+                for (_, period, start), counter in sending.items()
+            ]
+        try:
+            db = deps.write_session(tenant_id)
+        except Exception:
+            self._flush_failed(tenant_id, sending.values())
+            return
+        with db:
+            repo = UsageRepository(db)
+            try:
+                repo.add(rows)
+            except Exception:
+                self._flush_failed(tenant_id, sending.values())
+                return
+            try:
+                totals = repo.current(
+                    tenant_id, {p: period_start(p, now) for p in PERIODS}
+                )
+            except Exception:
+                # Stored, but the other workers' usage is not known yet.
+                logger.warning("Usage read failed for %s", tenant_id, exc_info=True)
+                totals = None
+
+        with self._lock:
+            for counter in sending.values():
+                if totals is None:
+                    counter.stored = [
+                        s + f for s, f in zip(counter.stored, counter.flushing)
+                    ]
+                counter.flushing = [0, 0]
+            if totals is not None:
+                for period, counter in self._current(tenant_id, now).items():
+                    counter.stored = list(totals.get(period, (0, 0)))
+
+    def _flush_failed(self, tenant_id: str, counters) -> None:
+        logger.warning("Usage flush failed for %s", tenant_id, exc_info=True)
+        with self._lock:
+            self._flush_errors += 1
+            # Not stored: send it with the next flush.
+            for counter in counters:
+                counter.pending = [
+                    p + f for p, f in zip(counter.pending, counter.flushing)
+                ]
+                counter.flushing = [0, 0]
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="usage-flush", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread and flush what is left."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.sync()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Usage flush failed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tracked": len(self._counters),
+                "unflushed_runs": sum(
+                    c.pending[0] for key, c in self._counters.items() if key[1] == "day"
+                ),
+                "flushes": self._flushes,
+                "flush_errors": self._flush_errors,
+            }
+
+
+tracker = UsageTracker()
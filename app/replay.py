@@ -0,0 +1,139 @@
+"""
+Bulk replay of past runs against another model.
+
+A replay job streams the tenant's matching runs in id order, BATCH_SIZE at
+a time, rebuilds each prompt from the stored task with the agent's current
+definition (app.prompts, exactly as a new run would) and sends it to the
+target model. Only the final completion is replayed; tools are not called.
+
+Model calls of all jobs share one pool of REPLAY_WORKERS threads and go
+through the fair LLM scheduler like live traffic, so a large replay cannot
+crowd out live runs. Each batch's results are written together with the
+job's progress in one transaction. A job interrupted by a restart stays
+"running" with its cursor at the last batch written.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from app import scheduler
+from app.llm import estimate_tokens, mock_llm_complete
+from app.prompts import build_prompt, fit_task
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.replays_repo import ReplaysRepository
+
+logger = logging.getLogger(__name__)
+
+# Model calls in flight at once in this process, across all replay jobs.
+WORKERS = int(os.getenv("REPLAY_WORKERS", "4"))
+
+# Runs read, replayed and written per transaction.
+BATCH_SIZE = int(os.getenv("REPLAY_BATCH_SIZE", "100"))
+
+
+class ReplayRunner:
+    def __init__(self, workers: int = WORKERS, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="replay")
+        self._lock = threading.Lock()
+        self._active: set[int] = set()
+
+    def start(
+        self, tenant_id: str, job_id: int, open_session: Callable[[], Session]
+    ) -> None:
+        """Run the job in a background thread."""
+        threading.Thread(
+            target=self.run,
+            args=(tenant_id, job_id, open_session),
+            name=f"replay-{job_id}",
+            daemon=True,
+        ).start()
+
+    def run(
+        self, tenant_id: str, job_id: int, open_session: Callable[[], Session]
+    ) -> None:
+        with self._lock:
+            if job_id in self._active:
+                return
+            self._active.add(job_id)
+        try:
+            with open_session() as db:
+                self._run(db, tenant_id, job_id)
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _run(self, db: Session, tenant_id: str, job_id: int) -> None:
+        replays = ReplaysRepository(db)
+        agents = AgentsRepository(db)
+        job = replays.load_detached(tenant_id, job_id)
+        if job is None or job.status != "pending":
+            return
+
+        replays.set_status(job, "running")
+        try:
+            snapshots = {}
+            while page := replays.source_page(job, self.batch_size):
+                for row in page:
+                    if row.agent_id not in snapshots:
+                        snapshots[row.agent_id] = agents.get_snapshot(
+                            tenant_id, row.agent_id
+                        )
+                # Hold no connection while the model calls run.
+                db.rollback()
+                results = list(
+                    self._pool.map(
+                        lambda row: self._replay(job, snapshots[row.agent_id], row),
+                        page,
+                    )
+                )
+                replays.save_batch(job, page[-1].id, results)
+        except Exception as e:
+            logger.exception("Replay job %s failed", job_id)
+            db.rollback()
+            replays.set_status(job, "failed", f"{type(e).__name__}: {e}")
+            return
+        replays.set_status(job, "completed")
+
+    def _replay(self, job, agent, row) -> dict:
+        model = job.target_model
+        started = time.perf_counter()
+        prompt = ""
+        try:
+            if agent is None:
+                raise LookupError("Agent not found")
+            prompt = build_prompt(agent, fit_task(model, agent, row.task))
+            response = self._complete(job.tenant_id, model, prompt)
+            error = False
+        except Exception as e:
+            response = f"{type(e).__name__}: {e}"
+            error = True
+        return {
+            "execution_id": row.id,
+            "response": response,
+            "error": error,
+            "prompt_tokens": estimate_tokens(model, prompt),
+            "response_tokens": 0 if error else estimate_tokens(model, response),
+            "duration_ms": round((time.perf_counter() - started) * 1000),
+        }
+
+    def _complete(self, tenant_id: str, model: str, prompt: str) -> str:
+        def call() -> str:
+            return mock_llm_complete(model, prompt)
+
+        if not scheduler.ENABLED:
+            return call()
+        return scheduler.llm_scheduler.run(tenant_id, model, call)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active_jobs": len(self._active)}
+
+
+runner = ReplayRunner()
@@ -1,6 +1,36 @@
-from sqlalchemy.orm import Session
+from __future__ import annotations
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session, selectinload
+from app.agent_cache import AgentSnapshot, agent_cache
 from app.db.models import Agent, Tool
 
+# Statements are built once; per call only the bound parameters change, so
+# every call reuses the same compiled SQL from the engine's cache.
+_LIST = (
+    select(Agent)
+    .options(selectinload(Agent.tools))
+    .where(Agent.tenant_id == bindparam("tenant_id"))
+    .order_by(Agent.id.asc())
+)
+_LIST_BY_TOOL = (
+    select(Agent)
+    .options(selectinload(Agent.tools))
+    .join(Agent.tools)
+    .where(
+        Agent.tenant_id == bindparam("tenant_id"),
+        Tool.tenant_id == bindparam("tenant_id"),
+        Tool.name == bindparam("tool_name"),
+    )
+    .distinct()
+    .order_by(Agent.id.asc())
+)
+_GET = select(Agent).where(
+    Agent.tenant_id == bindparam("tenant_id"),
+    Agent.id == bindparam("agent_id"),
+)
+_GET_WITH_TOOLS = _GET.options(selectinload(Agent.tools))
+
 
 class AgentsRepository:
     def __init__(self, db: Session):
@@ -22,22 +52,28 @@ class AgentsRepository:
         return agent
 
     def list(self, tenant_id: str, tool_name: str | None = None) -> list[Agent]:
-        q = self.db.query(Agent).filter(Agent.tenant_id == tenant_id)
-
         if tool_name:
-            q = (
-                q.join(Agent.tools)
-                .filter(Tool.tenant_id == tenant_id, Tool.name == tool_name)
-                .distinct()
-            )
+            params = {"tenant_id": tenant_id, "tool_name": tool_name}
+            return list(self.db.scalars(_LIST_BY_TOOL, params))
 
-        return q.order_by(Agent.id.asc()).all()
+        return list(self.db.scalars(_LIST, {"tenant_id": tenant_id}))
 
     def get(self, tenant_id: str, agent_id: int) -> Agent | None:
-        return (
-            self.db.query(Agent)
-            .filter(Agent.tenant_id == tenant_id, Agent.id == agent_id)
-            .first()
+        params = {"tenant_id": tenant_id, "agent_id": agent_id}
+        return self.db.scalars(_GET, params).first()
+
+    def load_snapshot(self, tenant_id: str, agent_id: int) -> AgentSnapshot | None:
+        params = {"tenant_id": tenant_id, "agent_id": agent_id}
+        agent = self.db.scalars(_GET_WITH_TOOLS, params).first()
+        return AgentSnapshot.from_agent(agent) if agent else None
+
+    def get_snapshot(self, tenant_id: str, agent_id: int) -> AgentSnapshot | None:
+        """Read-through lookup of an immutable agent snapshot (agent + tools)."""
+        return agent_cache.get(
+            self.db,
+            tenant_id,
+            agent_id,
+            lambda: self.load_snapshot(tenant_id, agent_id),
         )
 
     def save(self) -> None:
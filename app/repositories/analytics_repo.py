@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.db.models import RunRollup
+
+GRANULARITIES = ("minute", "hour", "day")
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+_rollups = RunRollup.__table__
+
+# Core (not ORM) insert: the ORM would treat the parameters as bulk rows.
+_rollup_insert = insert(_rollups).values(
+    [
+        {
+            "tenant_id": bindparam("tenant_id"),
+            "granularity": g,
+            "bucket_start": bindparam(f"{g}_bucket"),
+            "agent_id": bindparam("agent_id"),
+            "model": bindparam("model"),
+            "run_count": 1,
+            "response_bytes_total": bindparam("response_bytes"),
+            "response_bytes_min": bindparam("response_bytes"),
+            "response_bytes_max": bindparam("response_bytes"),
+            "prompt_tokens_total": bindparam("prompt_tokens"),
+            "response_tokens_total": bindparam("response_tokens"),
+        }
+        for g in GRANULARITIES
+    ]
+)
+
+# One upsert that adds a run to its minute, hour and day buckets.
+ROLLUP_UPSERT = _rollup_insert.on_conflict_do_update(
+    index_elements=["tenant_id", "granularity", "bucket_start", "agent_id", "model"],
+    set_={
+        "run_count": _rollups.c.run_count + _rollup_insert.excluded.run_count,
+        "response_bytes_total": _rollups.c.response_bytes_total
+        + _rollup_insert.excluded.response_bytes_total,
+        "response_bytes_min": func.min(
+            _rollups.c.response_bytes_min, _rollup_insert.excluded.response_bytes_min
+        ),
+        "response_bytes_max": func.max(
+            _rollups.c.response_bytes_max, _rollup_insert.excluded.response_bytes_max
+        ),
+        "prompt_tokens_total": _rollups.c.prompt_tokens_total
+        + _rollup_insert.excluded.prompt_tokens_total,
+        "response_tokens_total": _rollups.c.response_tokens_total
+        + _rollup_insert.excluded.response_tokens_total,
+    },
+)
+
+
+def rollup_params(
+    tenant_id: str,
+    agent_id: int,
+    model: str,
+    created_at: datetime,
+    response_bytes: int,
+    prompt_tokens: int = 0,
+    response_tokens: int = 0,
+) -> dict:
+    return {
+        "tenant_id": tenant_id,
+        "agent_id": agent_id,
+        "model": model,
+        "response_bytes": response_bytes,
+        "prompt_tokens": prompt_tokens,
+        "response_tokens": response_tokens,
+        **{f"{g}_bucket": bucket_start(created_at, g) for g in GRANULARITIES},
+    }
+
+
+class AnalyticsRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def run_rollups(
+        self,
+        tenant_id: str,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        group_by: tuple[str, ...],
+        agent_id: int | None = None,
+        model: str | None = None,
+    ) -> list:
+        dims = [getattr(RunRollup, d) for d in group_by]
+        q = (
+            select(
+                RunRollup.bucket_start,
+                *dims,
+                func.sum(RunRollup.run_count).label("run_count"),
+                func.sum(RunRollup.response_bytes_total).label("response_bytes_total"),
+                func.min(RunRollup.response_bytes_min).label("response_bytes_min"),
+                func.max(RunRollup.response_bytes_max).label("response_bytes_max"),
+                func.sum(RunRollup.prompt_tokens_total).label("prompt_tokens"),
+                func.sum(RunRollup.response_tokens_total).label("response_tokens"),
+            )
+            .where(
+                RunRollup.tenant_id == tenant_id,
+                RunRollup.granularity == granularity,
+                RunRollup.bucket_start >= start,
+                RunRollup.bucket_start < end,
+            )
+            .group_by(RunRollup.bucket_start, *dims)
+            .order_by(RunRollup.bucket_start, *dims)
+        )
+
+        if agent_id is not None:
+            q = q.where(RunRollup.agent_id == agent_id)
+        if model is not None:
+            q = q.where(RunRollup.model == model)
+
+        return list(self.db.execute(q).all())
+
+    def token_totals(
+        self,
+        tenant_id: str,
+        start: datetime,
+        end: datetime,
+    ) -> list:
+        """Per-agent token totals from the day buckets, most tokens first."""
+        total = func.sum(
+            RunRollup.prompt_tokens_total + RunRollup.response_tokens_total
+        )
+        q = (
+            select(
+                RunRollup.agent_id,
+                func.sum(RunRollup.run_count).label("run_count"),
+                func.sum(RunRollup.prompt_tokens_total).label("prompt_tokens"),
+                func.sum(RunRollup.response_tokens_total).label("response_tokens"),
+            )
+            .where(
+                RunRollup.tenant_id == tenant_id,
+                RunRollup.granularity == "day",
+                RunRollup.bucket_start >= start,
+                RunRollup.bucket_start < end,
+            )
+            .group_by(RunRollup.agent_id)
+            .order_by(total.desc(), RunRollup.agent_id)
+        )
+        return list(self.db.execute(q).all())
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app.db import interning
+from app.db.models import AgentExecution, Conversation
+
+_GET = select(Conversation).where(
+    Conversation.tenant_id == bindparam("tenant_id"),
+    Conversation.id == bindparam("conversation_id"),
+)
+_WINDOW = (
+    select(AgentExecution.prompt, AgentExecution.response)
+    .where(
+        AgentExecution.conversation_id == bindparam("conversation_id"),
+        AgentExecution.turn > bindparam("after"),
+    )
+    .order_by(AgentExecution.turn)
+)
+_TURNS = (
+    select(AgentExecution)
+    .where(
+        AgentExecution.tenant_ref == interning.tenants.ref_of(bindparam("tenant_id")),
+        AgentExecution.conversation_id == bindparam("conversation_id"),
+        AgentExecution.turn > bindparam("after"),
+    )
+    .order_by(AgentExecution.turn)
+    .limit(bindparam("limit"))
+)
+_ADVANCE = (
+    update(Conversation)
+    .where(
+        Conversation.id == bindparam("conversation_id"),
+        Conversation.turn_count == bindparam("expected"),
+    )
+    .values(
+        turn_count=Conversation.turn_count + 1,
+        summary=bindparam("summary"),
+        summarized_turns=bindparam("summarized_turns"),
+    )
+    .execution_options(synchronize_session=False)
+)
+
+
+class ConversationsRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, tenant_id: str, agent_id: int, model: str) -> Conversation:
+        conversation = Conversation(tenant_id=tenant_id, agent_id=agent_id, model=model)
+        self.db.add(conversation)
+        self.db.commit()
+        self.db.refresh(conversation)
+        return conversation
+
+    def get(self, tenant_id: str, conversation_id: int) -> Conversation | None:
+        return self.db.scalar(
+            _GET, {"tenant_id": tenant_id, "conversation_id": conversation_id}
+        )
+
+    def window(self, conversation_id: int, after: int) -> list[tuple[str, str]]:
+        """(message, response) of the turns after `after`, oldest first."""
+        rows = self.db.execute(
+            _WINDOW, {"conversation_id": conversation_id, "after": after}
+        )
+        return [(r.prompt, r.response) for r in rows]
+
+    def advance(
+        self,
+        conversation_id: int,
+        expected: int,
+        summary: str,
+        summarized_turns: int,
+    ) -> bool:
+        """
+        Count one more turn, unless another turn got there first.
+
+        Not committed: the caller commits it together with the turn.
+        """
+        result = self.db.execute(
+            _ADVANCE,
+            {
+                "conversation_id": conversation_id,
+                "expected": expected,
+                "summary": summary,
+                "summarized_turns": summarized_turns,
+            },
+        )
+        return result.rowcount == 1
+
+    def turns(
+        self, tenant_id: str, conversation_id: int, after: int, limit: int
+    ) -> list[AgentExecution]:
+        return list(
+            self.db.scalars(
+                _TURNS,
+                {
+                    "tenant_id": tenant_id,
+                    "conversation_id": conversation_id,
+                    "after": after,
+                    "limit": limit,
+                },
+            )
+        )
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app import webhooks
+from app.db import interning
+from app.db.models import AgentExecution, ReplayJob, ReplayResult
+from app.repositories import webhooks_repo
+
+_GET = select(ReplayJob).where(
+    ReplayJob.tenant_id == bindparam("tenant_id"),
+    ReplayJob.id == bindparam("job_id"),
+)
+_WATERMARK = select(func.coalesce(func.max(AgentExecution.id), 0))
+_RESULTS = (
+    select(ReplayResult)
+    .where(
+        ReplayResult.tenant_id == bindparam("tenant_id"),
+        ReplayResult.job_id == bindparam("job_id"),
+        ReplayResult.id > bindparam("after"),
+    )
+    .order_by(ReplayResult.id)
+    .limit(bindparam("limit"))
+)
+
+
+def _source_filter(job: ReplayJob) -> list:
+    """Runs the job replays: single runs (not turns) with a stored task."""
+    clauses = [
+        AgentExecution.tenant_ref == interning.tenants.ref_of(job.tenant_id),
+        AgentExecution.id <= job.watermark,
+        AgentExecution.conversation_id.is_(None),
+        AgentExecution.task.is_not(None),
+        AgentExecution.status == "completed",
+    ]
+    if job.agent_id is not None:
+        clauses.append(AgentExecution.agent_id == job.agent_id)
+    if job.source_model is not None:
+        clauses.append(
+            AgentExecution.model_ref == interning.models.ref_of(job.source_model)
+        )
+    if job.created_from is not None:
+        clauses.append(AgentExecution.created_at >= job.created_from)
+    if job.created_to is not None:
+        clauses.append(AgentExecution.created_at < job.created_to)
+    return clauses
+
+
+def _replay_finished(job: ReplayJob) -> dict:
+    """Payload of the replay.finished webhook event (see app.webhooks)."""
+    return {
+        "id": job.id,
+        "status": job.status,
+        "target_model": job.target_model,
+        "total": job.total,
+        "processed": job.processed,
+        "failed": job.failed,
+        "error": job.error,
+        "finished_at": job.finished_at,
+    }
+
+
+class ReplaysRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(
+        self,
+        tenant_id: str,
+        target_model: str,
+        agent_id: int | None,
+        source_model: str | None,
+        created_from: datetime | None,
+        created_to: datetime | None,
+    ) -> ReplayJob:
+        job = ReplayJob(
+            tenant_id=tenant_id,
+            target_model=target_model,
+            agent_id=agent_id,
+            source_model=source_model,
+            created_from=created_from,
+            created_to=created_to,
+            watermark=self.db.scalar(_WATERMARK),
+        )
+        self.db.add(job)
+        self.db.flush()
+        job.total = self.db.scalar(
+            select(func.count()).select_from(AgentExecution).where(*_source_filter(job))
+        )
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def get(self, tenant_id: str, job_id: int) -> ReplayJob | None:
+        return self.db.scalar(_GET, {"tenant_id": tenant_id, "job_id": job_id})
+
+    def load_detached(self, tenant_id: str, job_id: int) -> ReplayJob | None:
+        """
+        The job as a detached object for the runner: it keeps its values
+        across the runner's many commits instead of reloading after each.
+        The methods below update it together with its row.
+        """
+        job = self.get(tenant_id, job_id)
+        if job is not None:
+            self.db.expunge(job)
+        self.db.rollback()
+        return job
+
+    def source_page(self, job: ReplayJob, limit: int) -> list:
+        """(id, agent_id, task) of the next `limit` runs after job.cursor."""
+        return self.db.execute(
+            select(AgentExecution.id, AgentExecution.agent_id, AgentExecution.task)
+            .where(*_source_filter(job), AgentExecution.id > job.cursor)
+            .order_by(AgentExecution.id)
+            .limit(limit)
+        ).all()
+
+    def set_status(self, job: ReplayJob, status: str, error: str | None = None) -> None:
+        values = {"status": status, "error": error}
+        if status == "running":
+            values["started_at"] = datetime.utcnow()
+        else:
+            values["finished_at"] = datetime.utcnow()
+        self._update(job, values)
+        for key, value in values.items():
+            setattr(job, key, value)
+        queued = 0
+        if status in ("completed", "failed"):
+            queued = webhooks_repo.enqueue(
+                self.db, job.tenant_id, "replay.finished", _replay_finished(job)
+            )
+        self.db.commit()
+        if queued:
+            webhooks.dispatcher.notify(job.tenant_id)
+
+    def save_batch(self, job: ReplayJob, cursor: int, results: Sequence[dict]) -> None:
+        """Store one batch of results and the job's progress in one transaction."""
+        if results:
+            self.db.execute(
+                insert(ReplayResult),
+                [{"tenant_id": job.tenant_id, "job_id": job.id, **r} for r in results],
+            )
+        failed = sum(1 for r in results if r["error"])
+        self._update(
+            job,
+            {
+                "cursor": cursor,
+                "processed": ReplayJob.processed + len(results),
+                "failed": ReplayJob.failed + failed,
+            },
+        )
+        self.db.commit()
+        job.cursor = cursor
+        job.processed += len(results)
+        job.failed += failed
+
+    def _update(self, job: ReplayJob, values: dict) -> None:
+        self.db.execute(
+            update(ReplayJob)
+            .where(ReplayJob.id == job.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    def results(
+        self, tenant_id: str, job_id: int, after: int, limit: int
+    ) -> list[ReplayResult]:
+        return list(
+            self.db.scalars(
+                _RESULTS,
+                {
+                    "tenant_id": tenant_id,
+                    "job_id": job_id,
+                    "after": after,
+                    "limit": limit,
+                },
+            )
+        )
@@ -1,5 +1,122 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Sequence
+
+from sqlalchemy import (
+    and_,
+    bindparam,
+    column,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    table,
+)
 from sqlalchemy.orm import Session
-from app.db.models import AgentExecution
+from app import run_feed, webhooks
+from app.db import interning
+from app.db.fts import FTS_TABLE
+from app.db.models import AgentExecution, ExecutionStep
+from app.repositories import webhooks_repo
+from app.repositories.analytics_repo import ROLLUP_UPSERT, rollup_params
+from app.tools import ToolResult
+
+_fts = table(FTS_TABLE, column("rowid"))
+_fts_ref = literal_column(FTS_TABLE)
+
+# Filters compare the integer column against an uncorrelated lookup of the
+# tenant's id, so the tenant_ref index is used as before.
+_for_agent = (
+    AgentExecution.tenant_ref == interning.tenants.ref_of(bindparam("tenant_id")),
+    AgentExecution.agent_id == bindparam("agent_id"),
+)
+_COUNT = select(func.count()).select_from(AgentExecution).where(*_for_agent)
+_PAGE = (
+    select(AgentExecution)
+    .where(*_for_agent)
+    .order_by(AgentExecution.created_at.desc())
+    .offset(bindparam("offset"))
+    .limit(bindparam("limit"))
+)
+
+# Columns GET /agents/{id}/runs can project; "snippet" is the start of the
+# response, cut in SQL so the full text is never read into Python.
+_LIST_COLUMNS = {
+    "id": AgentExecution.id,
+    "model": AgentExecution.model.label("model"),
+    "prompt": AgentExecution.prompt,
+    "response": AgentExecution.response,
+    "task": AgentExecution.task,
+    "snippet": func.substr(AgentExecution.response, 1, bindparam("snippet_len")).label(
+        "snippet"
+    ),
+    "prompt_tokens": AgentExecution.prompt_tokens,
+    "response_tokens": AgentExecution.response_tokens,
+    "status": AgentExecution.status,
+    "created_at": AgentExecution.created_at,
+}
+LIST_FIELDS = tuple(_LIST_COLUMNS)
+# ExecutionOut as it was before fields= existed.
+DEFAULT_LIST_FIELDS = tuple(f for f in LIST_FIELDS if f not in ("task", "snippet"))
+
+
+_CHANGES = (
+    select(*(_LIST_COLUMNS[f] for f in DEFAULT_LIST_FIELDS))
+    .where(*_for_agent, AgentExecution.id > bindparam("after"))
+    .order_by(AgentExecution.id)
+    .limit(bindparam("limit"))
+)
+
+
+@lru_cache(maxsize=256)
+def _projected_page(fields: tuple[str, ...]):
+    return (
+        select(*(_LIST_COLUMNS[f] for f in fields))
+        .where(*_for_agent)
+        .order_by(AgentExecution.created_at.desc())
+        .offset(bindparam("offset"))
+        .limit(bindparam("limit"))
+    )
+
+
+_rank = func.bm25(_fts_ref)
+_SEARCH = (
+    select(AgentExecution, _rank)
+    .join(_fts, _fts.c.rowid == AgentExecution.id)
+    .where(
+        _fts_ref.op("MATCH")(bindparam("match")),
+        AgentExecution.tenant_ref == interning.tenants.ref_of(bindparam("tenant_id")),
+    )
+    .order_by(_rank, AgentExecution.id)
+    .limit(bindparam("limit"))
+)
+_SEARCH_AFTER = _SEARCH.where(
+    or_(
+        _rank > bindparam("after_rank"),
+        and_(
+            _rank == bindparam("after_rank"), AgentExecution.id > bindparam("after_id")
+        ),
+    )
+)
+
+
+def _run_finished(execution: AgentExecution, model: str) -> dict:
+    """Payload of the run.finished webhook event (see app.webhooks)."""
+    return {
+        "id": execution.id,
+        "agent_id": execution.agent_id,
+        "model": model,
+        "status": execution.status,
+        "task": execution.task,
+        "response": execution.response,
+        "prompt_tokens": execution.prompt_tokens,
+        "response_tokens": execution.response_tokens,
+        "created_at": execution.created_at,
+    }
 
 
 class RunsRepository:
@@ -13,19 +130,256 @@ class RunsRepository:
         model: str,
         prompt: str,
         response: str,
+        prompt_tokens: int = 0,
+        response_tokens: int = 0,
+        steps: Sequence[ToolResult] = (),
+        conversation_id: int | None = None,
+        turn: int | None = None,
+        task: str | None = None,
     ) -> AgentExecution:
         execution = AgentExecution(
-            tenant_id=tenant_id,
+            tenant_ref=interning.tenants.ref(self.db, tenant_id),
             agent_id=agent_id,
-            model=model,
+            model_ref=interning.models.ref(self.db, model),
             prompt=prompt,
+            task=task,
             response=response,
+            prompt_tokens=prompt_tokens,
+            response_tokens=response_tokens,
+            status="completed",
+            conversation_id=conversation_id,
+            turn=turn,
+            created_at=datetime.utcnow(),
         )
         self.db.add(execution)
+        if steps:
+            # One executemany instead of an INSERT per ORM object.
+            self.db.flush()
+            self.db.execute(
+                insert(ExecutionStep),
+                [
+                    {
+                        "tenant_id": tenant_id,
+                        "execution_id": execution.id,
+                        "step": r.step,
+                        "position": position,
+                        "tool_id": r.call.tool_id,
+                        "tool_name": r.call.name,
+                        "arguments": json.dumps(r.call.arguments, sort_keys=True),
+                        "output": r.output,
+                        "error": r.error,
+                        "cached": r.cached,
+                        "duration_ms": r.duration_ms,
+                    }
+                    for position, r in enumerate(steps)
+                ],
+            )
+        # Analytics rollups are updated in the same transaction as the run.
+        self.db.execute(
+            ROLLUP_UPSERT,
+            rollup_params(
+                tenant_id=tenant_id,
+                agent_id=agent_id,
+                model=model,
+                created_at=execution.created_at,
+                response_bytes=len(response.encode("utf-8")),
+                prompt_tokens=prompt_tokens,
+                response_tokens=response_tokens,
+            ),
+        )
+        # Webhooks report runs, not conversation turns.
+        queued = 0
+        if conversation_id is None:
+            self.db.flush()
+            queued = webhooks_repo.enqueue(
+                self.db, tenant_id, "run.finished", _run_finished(execution, model)
+            )
         self.db.commit()
+        if queued:
+            webhooks.dispatcher.notify(tenant_id)
         self.db.refresh(execution)
+        run_feed.feed.publish(
+            tenant_id,
+            agent_id,
+            {f: getattr(execution, f) for f in DEFAULT_LIST_FIELDS},
+        )
         return execution
 
+    def create_many(
+        self, tenant_id: str, agent_id: int, runs: Sequence[dict]
+    ) -> list[int]:
+        """
+        Store finished runs of one agent together, in one transaction: one
+        INSERT each for the runs, their tool steps, the analytics rollups
+        and the webhook events.
+
+        Each item has create()'s model, prompt, task, response, token and
+        steps arguments plus a status; only completed runs are counted in
+        the rollups, as with record_abandoned. Returns the new ids in the
+        order of `runs`.
+        """
+        if not runs:
+            return []
+        tenant_ref = interning.tenants.ref(self.db, tenant_id)
+        now = datetime.utcnow()
+        ids = self.db.scalars(
+            insert(AgentExecution).returning(
+                AgentExecution.id, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "tenant_ref": tenant_ref,
+                    "agent_id": agent_id,
+                    "model_ref": interning.models.ref(self.db, r["model"]),
+                    "prompt": r["prompt"],
+                    "task": r["task"],
+                    "response": r["response"],
+                    "prompt_tokens": r["prompt_tokens"],
+                    "response_tokens": r["response_tokens"],
+                    "status": r["status"],
+                    "created_at": now,
+                }
+                for r in runs
+            ],
+        ).all()
+
+        steps = [
+            {
+                "tenant_id": tenant_id,
+                "execution_id": execution_id,
+                "step": s.step,
+                "position": position,
+                "tool_id": s.call.tool_id,
+                "tool_name": s.call.name,
+                "arguments": json.dumps(s.call.arguments, sort_keys=True),
+                "output": s.output,
+                "error": s.error,
+                "cached": s.cached,
+                "duration_ms": s.duration_ms,
+            }
+            for execution_id, r in zip(ids, runs)
+            for position, s in enumerate(r.get("steps", ()))
+        ]
+        if steps:
+            self.db.execute(insert(ExecutionStep), steps)
+        rollups = [
+            rollup_params(
+                tenant_id=tenant_id,
+                agent_id=agent_id,
+                model=r["model"],
+                created_at=now,
+                response_bytes=len(r["response"].encode("utf-8")),
+                prompt_tokens=r["prompt_tokens"],
+                response_tokens=r["response_tokens"],
+            )
+            for r in runs
+            if r["status"] == "completed"
+        ]
+        if rollups:
+            self.db.connection().execute(ROLLUP_UPSERT, rollups)
+
+        stored = [
+            {
+                "id": execution_id,
+                "model": r["model"],
+                "prompt": r["prompt"],
+                "response": r["response"],
+                "prompt_tokens": r["prompt_tokens"],
+                "response_tokens": r["response_tokens"],
+                "status": r["status"],
+                "created_at": now,
+            }
+            for execution_id, r in zip(ids, runs)
+        ]
+        # The same payload as _run_finished.
+        queued = webhooks_repo.enqueue_many(
+            self.db,
+            tenant_id,
+            "run.finished",
+            [
+                {
+                    "id": run["id"],
+                    "agent_id": agent_id,
+                    "model": run["model"],
+                    "status": run["status"],
+                    "task": r["task"],
+                    "response": run["response"],
+                    "prompt_tokens": run["prompt_tokens"],
+                    "response_tokens": run["response_tokens"],
+                    "created_at": now,
+                }
+                for run, r in zip(stored, runs)
+            ],
+        )
+        self.db.commit()
+        if queued:
+            webhooks.dispatcher.notify(tenant_id)
+        for run in stored:
+            run_feed.feed.publish(tenant_id, agent_id, run)
+        return list(ids)
+
+    def release(self) -> None:
+        """
+        End the current read-only transaction so its connection goes back
+        to the (small) writer pool; the next statement opens a new one.
+        """
+        self.db.rollback()
+
+    def record_abandoned(
+        self,
+        tenant_id: str,
+        agent_id: int,
+        model: str,
+        prompt: str,
+        status: str,
+        prompt_tokens: int = 0,
+        task: str | None = None,
+        conversation_id: int | None = None,
+    ) -> None:
+        """
+        Record a run that timed out, was cancelled or failed before completing.
+
+        Discards whatever the failed attempt left in the session. Abandoned
+        runs have no response and are not counted in analytics rollups. An
+        abandoned conversation turn keeps its conversation_id but gets no
+        turn number, so it is not part of the transcript or the next prompt.
+        """
+        self.db.rollback()
+        execution = AgentExecution(
+            tenant_ref=interning.tenants.ref(self.db, tenant_id),
+            agent_id=agent_id,
+            model_ref=interning.models.ref(self.db, model),
+            prompt=prompt,
+            task=task,
+            response="",
+            prompt_tokens=prompt_tokens,
+            response_tokens=0,
+            status=status,
+            conversation_id=conversation_id,
+            created_at=datetime.utcnow(),
+        )
+        self.db.add(execution)
+        self.db.flush()
+        queued = 0
+        if conversation_id is None:
+            queued = webhooks_repo.enqueue(
+                self.db, tenant_id, "run.finished", _run_finished(execution, model)
+            )
+        event = {
+            "id": execution.id,
+            "model": model,
+            "prompt": prompt,
+            "response": "",
+            "prompt_tokens": prompt_tokens,
+            "response_tokens": 0,
+            "status": status,
+            "created_at": execution.created_at,
+        }
+        self.db.commit()
+        if queued:
+            webhooks.dispatcher.notify(tenant_id)
+        run_feed.feed.publish(tenant_id, agent_id, event)
+
     def list(
         self,
         tenant_id: str,
@@ -33,15 +387,74 @@ class RunsRepository:
         limit: int,
         offset: int,
     ) -> tuple[int, list[AgentExecution]]:
-        q = (
-            self.db.query(AgentExecution)
-            .filter(
-                AgentExecution.tenant_id == tenant_id,
-                AgentExecution.agent_id == agent_id,
-            )
-            .order_by(AgentExecution.created_at.desc())
+        params = {"tenant_id": tenant_id, "agent_id": agent_id}
+        total = self.db.scalar(_COUNT, params)
+        items = list(
+            self.db.scalars(_PAGE, {**params, "limit": limit, "offset": offset})
         )
-
-        total = q.count()
-        items = q.offset(offset).limit(limit).all()
         return total, items
+
+    def list_fields(
+        self,
+        tenant_id: str,
+        agent_id: int,
+        limit: int,
+        offset: int,
+        fields: tuple[str, ...],
+        snippet_len: int = 0,
+    ) -> tuple[int, list[dict]]:
+        """
+        Like list, but selects only `fields` (names from LIST_FIELDS) and
+        returns plain dicts; other columns are never loaded.
+        """
+        params = {"tenant_id": tenant_id, "agent_id": agent_id}
+        total = self.db.scalar(_COUNT, params)
+        rows = self.db.execute(
+            _projected_page(fields),
+            {
+                **params,
+                "limit": limit,
+                "offset": offset,
+                "snippet_len": snippet_len,
+            },
+        )
+        return total, [dict(r) for r in rows.mappings()]
+
+    def changes(
+        self, tenant_id: str, agent_id: int, after: int, limit: int
+    ) -> list[dict]:
+        """
+        The agent's runs with id > after, oldest first, as DEFAULT_LIST_FIELDS
+        dicts: what a change-feed subscriber missed since `after`.
+        """
+        rows = self.db.execute(
+            _CHANGES,
+            {
+                "tenant_id": tenant_id,
+                "agent_id": agent_id,
+                "after": after,
+                "limit": limit,
+            },
+        )
+        return [dict(r) for r in rows.mappings()]
+
+    def search(
+        self,
+        tenant_id: str,
+        match: str,
+        limit: int,
+        after: tuple[float, int] | None = None,
+    ) -> list[tuple[AgentExecution, float]]:
+        """
+        Full-text search over prompt and response, best match first.
+
+        Results are keyset-paginated on (bm25 rank, id); `after` is the last
+        (rank, id) pair of the previous page.
+        """
+        params = {"tenant_id": tenant_id, "match": match, "limit": limit}
+        if after is None:
+            rows = self.db.execute(_SEARCH, params)
+        else:
+            params.update(after_rank=after[0], after_id=after[1])
+            rows = self.db.execute(_SEARCH_AFTER, params)
+        return [(e, r) for e, r in rows.all()]
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Integer, bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models import AgentSchedule
+from app.db.types import EpochMicros
+
+MICROS = 1_000_000
+
+_LIST = (
+    select(AgentSchedule)
+    .where(
+        AgentSchedule.tenant_id == bindparam("tenant_id"),
+        AgentSchedule.agent_id == bindparam("agent_id"),
+    )
+    .order_by(AgentSchedule.id)
+)
+_GET = select(AgentSchedule).where(
+    AgentSchedule.tenant_id == bindparam("tenant_id"),
+    AgentSchedule.agent_id == bindparam("agent_id"),
+    AgentSchedule.id == bindparam("schedule_id"),
+)
+_COUNT = (
+    select(func.count())
+    .select_from(AgentSchedule)
+    .where(
+        AgentSchedule.tenant_id == bindparam("tenant_id"),
+        AgentSchedule.agent_id == bindparam("agent_id"),
+    )
+)
+
+# The first fire time after `now_us` (epoch microseconds): the next multiple
+# of the interval, plus the offset. A schedule that missed several fire
+# times (e.g. while the app was down) fires once and then skips to the
+# next one, instead of catching up on all of them.
+_now_us = bindparam("now_us", type_=Integer)
+_interval_us = AgentSchedule.interval_seconds * MICROS
+_offset_us = AgentSchedule.offset_seconds * MICROS
+_NEXT_FIRE = ((_now_us - _offset_us) // _interval_us + 1) * _interval_us + _offset_us
+
+# Takes the tenant's most overdue schedules and moves them to their next
+# fire time in one statement, so two schedulers never fire the same one.
+# The due lookup is a range scan of the next_fire_at index.
+_CLAIM = (
+    update(AgentSchedule)
+    .where(
+        AgentSchedule.id.in_(
+            select(AgentSchedule.id)
+            .where(
+                AgentSchedule.next_fire_at <= bindparam("now", type_=EpochMicros),
+                AgentSchedule.tenant_id == bindparam("for_tenant"),
+            )
+            .order_by(AgentSchedule.next_fire_at)
+            .limit(bindparam("limit"))
+            .scalar_subquery()
+        )
+    )
+    .values(
+        next_fire_at=_NEXT_FIRE, last_fired_at=bindparam("fired", type_=EpochMicros)
+    )
+    .returning(
+        AgentSchedule.id,
+        AgentSchedule.agent_id,
+        AgentSchedule.task,
+        AgentSchedule.model,
+    )
+    .execution_options(synchronize_session=False)
+)
+
+
+def next_fire(interval_seconds: int, offset_seconds: int, now: datetime) -> datetime:
+    """Python version of _NEXT_FIRE, for new schedules."""
+    now_us = EpochMicros().process_bind_param(now, None)
+    interval_us, offset_us = interval_seconds * MICROS, offset_seconds * MICROS
+    next_us = ((now_us - offset_us) // interval_us + 1) * interval_us + offset_us
+    return EpochMicros().process_result_value(next_us, None)
+
+
+class SchedulesRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(
+        self,
+        tenant_id: str,
+        agent_id: int,
+        task: str,
+        model: str,
+        interval_seconds: int,
+        offset_for: Callable[[int], int],
+    ) -> AgentSchedule:
+        """
+        `offset_for(schedule_id)` is the new schedule's offset; the id is
+        only known once the row is inserted.
+        """
+        schedule = AgentSchedule(
+            tenant_id=tenant_id,
+            agent_id=agent_id,
+            task=task,
+            model=model,
+            interval_seconds=interval_seconds,
+            next_fire_at=datetime.utcnow(),
+        )
+        self.db.add(schedule)
+        self.db.flush()
+        schedule.offset_seconds = offset_for(schedule.id)
+        schedule.next_fire_at = next_fire(
+            interval_seconds, schedule.offset_seconds, schedule.created_at
+        )
+        self.db.commit()
+        self.db.refresh(schedule)
+        return schedule
+
+    def count(self, tenant_id: str, agent_id: int) -> int:
+        return self.db.scalar(_COUNT, {"tenant_id": tenant_id, "agent_id": agent_id})
+
+    def list(self, tenant_id: str, agent_id: int) -> list[AgentSchedule]:
+        return list(
+            self.db.scalars(_LIST, {"tenant_id": tenant_id, "agent_id": agent_id})
+        )
+
+    def get(
+        self, tenant_id: str, agent_id: int, schedule_id: int
+    ) -> AgentSchedule | None:
+        return self.db.scalars(
+            _GET,
+            {"tenant_id": tenant_id, "agent_id": agent_id, "schedule_id": schedule_id},
+        ).first()
+
+    def delete(self, schedule: AgentSchedule) -> None:
+        self.db.delete(schedule)
+        self.db.commit()
+
+    def claim(self, tenant_id: str, now: datetime, limit: int) -> list:
+        """
+        Claim up to `limit` of the tenant's due schedules, most overdue
+        first; they are already moved on to their next fire time.
+        """
+        rows = self.db.execute(
+            _CLAIM,
+            {
+                "for_tenant": tenant_id,
+                "now": now,
+                "now_us": EpochMicros().process_bind_param(now, None),
+                "fired": now,
+                "limit": limit,
+            },
+        ).all()
+        self.db.commit()
+        return rows
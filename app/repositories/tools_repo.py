@@ -1,8 +1,21 @@
 from __future__ import annotations
 
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from app.db.models import Tool
 
+_LIST = (
+    select(Tool).where(Tool.tenant_id == bindparam("tenant_id")).order_by(Tool.id.asc())
+)
+_GET = select(Tool).where(
+    Tool.tenant_id == bindparam("tenant_id"),
+    Tool.id == bindparam("tool_id"),
+)
+_GET_MANY = select(Tool).where(
+    Tool.tenant_id == bindparam("tenant_id"),
+    Tool.id.in_(bindparam("tool_ids", expanding=True)),
+)
+
 
 class ToolsRepository:
     def __init__(self, db: Session):
@@ -20,19 +33,11 @@ class ToolsRepository:
         return tool
 
     def list_tools(self, tenant_id: str) -> list[Tool]:
-        return (
-            self.db.query(Tool)
-            .filter(Tool.tenant_id == tenant_id)
-            .order_by(Tool.id.asc())
-            .all()
-        )
+        return list(self.db.scalars(_LIST, {"tenant_id": tenant_id}))
 
     def get(self, tenant_id: str, tool_id: int) -> Tool | None:
-        return (
-            self.db.query(Tool)
-            .filter(Tool.tenant_id == tenant_id, Tool.id == tool_id)
-            .first()
-        )
+        params = {"tenant_id": tenant_id, "tool_id": tool_id}
+        return self.db.scalars(_GET, params).first()
 
     def save(self) -> None:
         self.db.commit()
@@ -42,11 +47,5 @@ class ToolsRepository:
         self.db.commit()
 
     def get_many(self, tenant_id: str, tool_ids: list[int]):
-        return (
-            self.db.query(Tool)
-            .filter(
-                Tool.tenant_id == tenant_id,
-                Tool.id.in_(tool_ids),
-            )
-            .all()
-        )
+        params = {"tenant_id": tenant_id, "tool_ids": list(tool_ids)}
+        return list(self.db.scalars(_GET_MANY, params))
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import and_, bindparam, or_, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.db.models import TenantUsage
+
+_usage = TenantUsage.__table__
+
+# Adds a worker's counts to the stored totals, so concurrent flushes from
+# several workers all count.
+_insert = insert(_usage)
+_ADD = _insert.on_conflict_do_update(
+    index_elements=["tenant_id", "period", "period_start"],
+    set_={
+        "runs": _usage.c.runs + _insert.excluded.runs,
+        "tokens": _usage.c.tokens + _insert.excluded.tokens,
+    },
+)
+_CURRENT = select(_usage.c.period, _usage.c.runs, _usage.c.tokens).where(
+    _usage.c.tenant_id == bindparam("tenant_id"),
+    or_(
+        and_(
+            _usage.c.period == "day",
+            _usage.c.period_start == bindparam("day_start"),
+        ),
+        and_(
+            _usage.c.period == "month",
+            _usage.c.period_start == bindparam("month_start"),
+        ),
+    ),
+)
+
+
+class UsageRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add(self, rows: Sequence[dict]) -> None:
+        """
+        Add dicts of tenant_id, period, period_start, runs and tokens to the
+        stored totals, in one transaction.
+        """
+        if rows:
+            # Core executemany; the ORM would treat the rows as bulk inserts.
+            self.db.connection().execute(_ADD, list(rows))
+        self.db.commit()
+
+    def current(
+        self, tenant_id: str, starts: dict[str, datetime]
+    ) -> dict[str, tuple[int, int]]:
+        """{period: (runs, tokens)} stored for the periods starting at `starts`."""
+        rows = self.db.execute(
+            _CURRENT,
+            {
+                "tenant_id": tenant_id,
+                "day_start": starts["day"],
+                "month_start": starts["month"],
+            },
+        )
+        return {r.period: (r.runs, r.tokens) for r in rows}
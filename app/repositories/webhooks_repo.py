@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import (
+    DateTime,
+    String,
+    Text,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from app.db.models import Webhook, WebhookDelivery
+
+_LIST = (
+    select(Webhook)
+    .where(Webhook.tenant_id == bindparam("tenant_id"))
+    .order_by(Webhook.id)
+)
+_GET = select(Webhook).where(
+    Webhook.tenant_id == bindparam("tenant_id"),
+    Webhook.id == bindparam("webhook_id"),
+)
+_COUNT = (
+    select(func.count())
+    .select_from(Webhook)
+    .where(Webhook.tenant_id == bindparam("tenant_id"))
+)
+_ENDPOINTS = select(Webhook.id, Webhook.url, Webhook.secret).where(
+    Webhook.tenant_id == bindparam("tenant_id"),
+    Webhook.id.in_(bindparam("webhook_ids", expanding=True)),
+)
+
+# One outbox row per webhook of the tenant, in a single statement; inserts
+# nothing for tenants without webhooks. Core table: the ORM cannot INSERT
+# ... SELECT.
+_deliveries = WebhookDelivery.__table__
+_ENQUEUE = insert(_deliveries).from_select(
+    [
+        _deliveries.c.tenant_id,
+        _deliveries.c.webhook_id,
+        _deliveries.c.event,
+        _deliveries.c.payload,
+        _deliveries.c.status,
+        _deliveries.c.attempts,
+        _deliveries.c.next_attempt_at,
+        _deliveries.c.created_at,
+    ],
+    select(
+        Webhook.tenant_id,
+        Webhook.id,
+        bindparam("event_type", type_=String),
+        bindparam("payload_json", type_=Text),
+        literal("pending"),
+        literal(0),
+        bindparam("now", type_=DateTime),
+        bindparam("now", type_=DateTime),
+    ).where(Webhook.tenant_id == bindparam("for_tenant")),
+)
+
+# Parameters of INSERT and UPDATE statements cannot share a column's name.
+_due = (
+    WebhookDelivery.tenant_id == bindparam("for_tenant"),
+    WebhookDelivery.status == "pending",
+    WebhookDelivery.next_attempt_at <= bindparam("now"),
+)
+# Takes the oldest due rows by moving them out of the due window for the
+# length of a lease, in one statement, so two dispatchers never claim the
+# same row. A dispatcher that dies mid-send leaves them to be retried once
+# the lease runs out.
+_CLAIM = (
+    update(WebhookDelivery)
+    .where(
+        WebhookDelivery.id.in_(
+            select(WebhookDelivery.id)
+            .where(*_due)
+            .order_by(WebhookDelivery.id)
+            .limit(bindparam("limit"))
+            .scalar_subquery()
+        )
+    )
+    .values(next_attempt_at=bindparam("lease_until"))
+    .returning(
+        WebhookDelivery.id,
+        WebhookDelivery.webhook_id,
+        WebhookDelivery.event,
+        WebhookDelivery.payload,
+        WebhookDelivery.attempts,
+        WebhookDelivery.created_at,
+    )
+    .execution_options(synchronize_session=False)
+)
+_RECORD = (
+    update(WebhookDelivery)
+    .where(WebhookDelivery.id == bindparam("delivery_id"))
+    .values(
+        status=bindparam("outcome"),
+        attempts=WebhookDelivery.attempts + 1,
+        next_attempt_at=bindparam("retry_at"),
+        last_error=bindparam("error"),
+        delivered_at=bindparam("delivered"),
+    )
+)
+_DELIVERIES = (
+    select(WebhookDelivery)
+    .where(
+        WebhookDelivery.tenant_id == bindparam("tenant_id"),
+        WebhookDelivery.webhook_id == bindparam("webhook_id"),
+        WebhookDelivery.id > bindparam("after"),
+    )
+    .order_by(WebhookDelivery.id)
+    .limit(bindparam("limit"))
+)
+_PRUNE = (
+    delete(WebhookDelivery)
+    .where(
+        WebhookDelivery.tenant_id == bindparam("tenant_id"),
+        WebhookDelivery.status != "pending",
+        WebhookDelivery.created_at < bindparam("before"),
+    )
+    .execution_options(synchronize_session=False)
+)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def enqueue(db: Session, tenant_id: str, event: str, data: dict) -> int:
+    """
+    Queue `event` for every webhook of the tenant, in the caller's
+    transaction. Returns the number of deliveries queued.
+    """
+    result = db.execute(
+        _ENQUEUE,
+        {
+            "for_tenant": tenant_id,
+            "event_type": event,
+            "payload_json": json.dumps(data, default=_encode),
+            "now": datetime.utcnow(),
+        },
+    )
+    return result.rowcount
+
+
+def enqueue_many(db: Session, tenant_id: str, event: str, items: list[dict]) -> int:
+    """Like enqueue, for several events of one type in one executemany."""
+    if not items:
+        return 0
+    now = datetime.utcnow()
+    result = db.connection().execute(
+        _ENQUEUE,
+        [
+            {
+                "for_tenant": tenant_id,
+                "event_type": event,
+                "payload_json": json.dumps(data, default=_encode),
+                "now": now,
+            }
+            for data in items
+        ],
+    )
+    return result.rowcount
+
+
+class WebhooksRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, tenant_id: str, url: str, secret: str) -> Webhook:
+        webhook = Webhook(tenant_id=tenant_id, url=url, secret=secret)
+        self.db.add(webhook)
+        self.db.commit()
+        self.db.refresh(webhook)
+        return webhook
+
+    def count(self, tenant_id: str) -> int:
+        return self.db.scalar(_COUNT, {"tenant_id": tenant_id})
+
+    def list(self, tenant_id: str) -> list[Webhook]:
+        return list(self.db.scalars(_LIST, {"tenant_id": tenant_id}))
+
+    def get(self, tenant_id: str, webhook_id: int) -> Webhook | None:
+        return self.db.scalar(_GET, {"tenant_id": tenant_id, "webhook_id": webhook_id})
+
+    def delete(self, webhook: Webhook) -> None:
+        """Delete the webhook; its pending deliveries go with it."""
+        self.db.delete(webhook)
+        self.db.commit()
+
+    def deliveries(
+        self, tenant_id: str, webhook_id: int, after: int, limit: int
+    ) -> list[WebhookDelivery]:
+        return list(
+            self.db.scalars(
+                _DELIVERIES,
+                {
+                    "tenant_id": tenant_id,
+                    "webhook_id": webhook_id,
+                    "after": after,
+                    "limit": limit,
+                },
+            )
+        )
+
+    def claim(
+        self, tenant_id: str, now: datetime, lease_until: datetime, limit: int
+    ) -> list:
+        """Claim up to `limit` due deliveries of the tenant, oldest first."""
+        rows = self.db.execute(
+            _CLAIM,
+            {
+                "for_tenant": tenant_id,
+                "now": now,
+                "lease_until": lease_until,
+                "limit": limit,
+            },
+        ).all()
+        self.db.commit()
+        return sorted(rows, key=lambda r: r.id)
+
+    def endpoints(
+        self, tenant_id: str, webhook_ids: Sequence[int]
+    ) -> dict[int, tuple[str, str]]:
+        """{webhook id: (url, secret)}; deleted webhooks are missing."""
+        rows = self.db.execute(
+            _ENDPOINTS, {"tenant_id": tenant_id, "webhook_ids": list(webhook_ids)}
+        )
+        return {r.id: (r.url, r.secret) for r in rows}
+
+    def record(self, outcomes: Sequence[dict]) -> None:
+        """
+        Store the outcome of one attempt per delivery: dicts with
+        delivery_id, outcome (the new status), retry_at, error and
+        delivered (a timestamp or None).
+        """
+        if outcomes:
+            # Core executemany; the ORM would treat a list of parameter
+            # sets as a bulk update by primary key.
+            self.db.connection().execute(_RECORD, list(outcomes))
+        self.db.commit()
+
+    def prune(self, tenant_id: str, before: datetime) -> int:
+        """Delete delivered and failed deliveries created before `before`."""
+        result = self.db.execute(_PRUNE, {"tenant_id": tenant_id, "before": before})
+        self.db.commit()
+        return result.rowcount
@@ -0,0 +1,106 @@
+"""
+In-process change feed of new runs.
+
+RunsRepository publishes every run it stores, after the commit, to the
+subscribers of that tenant's agent: the SSE stream and long-poll routes in
+app.api.routers.runs. Each subscriber has a bounded asyncio queue filled
+from the publishing worker thread with call_soon_threadsafe, so a publish
+never blocks on a slow client. A subscriber whose queue is full is marked
+overflowed and its stream ends; the client reconnects with the last id it
+saw and catches up from the database.
+
+The feed only sees runs stored by this process. With several workers, a
+subscriber also gets the other workers' runs on its next catch-up
+(reconnect or long poll), not live.
+"""
+
+import asyncio
+import os
+import threading
+from collections import defaultdict
+
+# Events buffered per subscriber before it is cut off to catch up.
+QUEUE_SIZE = int(os.getenv("RUN_FEED_QUEUE_SIZE", "256"))
+
+# Open subscriptions per process; more are refused with 503.
+MAX_SUBSCRIBERS = int(os.getenv("RUN_FEED_MAX_SUBSCRIBERS", "1000"))
+
+
+class Subscription:
+    def __init__(self, key: tuple[str, int], loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.loop = loop
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def _deliver(self, event: dict) -> None:
+        # Runs on the subscriber's event loop.
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The reader is behind (so not waiting); it sees the flag once
+            # it has worked through the queue.
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> dict | None:
+        """The next event, or None on timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self) -> list[dict]:
+        events = []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+
+class RunFeed:
+    def __init__(self, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers: dict[tuple[str, int], set[Subscription]] = defaultdict(set)
+        self._count = 0
+        self.published = 0
+
+    def subscribe(self, tenant_id: str, agent_id: int) -> Subscription | None:
+        """Subscribe from the running event loop; None when at capacity."""
+        sub = Subscription((tenant_id, agent_id), asyncio.get_running_loop())
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            self._subscribers[sub.key].add(sub)
+            self._count += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.key)
+            if subs is None or sub not in subs:
+                return
+            subs.discard(sub)
+            self._count -= 1
+            if not subs:
+                del self._subscribers[sub.key]
+
+    def publish(self, tenant_id: str, agent_id: int, event: dict) -> None:
+        """Hand a stored run to its subscribers; safe from any thread."""
+        with self._lock:
+            self.published += 1
+            subs = list(self._subscribers.get((tenant_id, agent_id), ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._deliver, event)
+            except RuntimeError:
+                # The loop is closed; the subscription is gone with it.
+                self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"subscribers": self._count, "published": self.published}
+
+
+feed = RunFeed()
@@ -0,0 +1,236 @@
+"""
+Weighted fair scheduling of LLM provider calls.
+
+Every provider call takes a slot. Slots are bounded globally, per tenant
+and per model; when none is free the call waits in its tenant's FIFO
+queue and slots are handed out by weighted fair queuing (start-time fair
+queuing with unit cost per call): each tenant's calls get virtual finish
+tags spaced by 1 / weight, and among the tenants whose next call fits
+under the caps the one with the lowest tag goes next. A tenant that
+floods the endpoint only queues behind itself, so a small tenant's wait
+is bounded by about one call duration per competing tenant.
+
+Dispatch only looks at the head of each tenant's queue, so its cost grows
+with the number of waiting tenants, not the number of waiting calls. A
+call waits at most QUEUE_TIMEOUT_SECONDS (or until its request deadline)
+and then fails with OverloadedError.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, TypeVar
+
+from app import deadlines
+from app.core.errors import OverloadedError
+
+T = TypeVar("T")
+
+ENABLED = os.getenv("FAIR_SCHEDULING", "1") == "1"
+
+MAX_CONCURRENT_CALLS = int(os.getenv("LLM_MAX_CONCURRENT_CALLS", "16"))
+TENANT_CONCURRENCY = int(os.getenv("LLM_TENANT_CONCURRENCY", "4"))
+MODEL_CONCURRENCY = int(os.getenv("LLM_MODEL_CONCURRENCY", "8"))
+
+# Waiting calls block their worker thread, so the thread pool is sized well
+# above MAX_CONCURRENT_CALLS (see main.lifespan): a flooding tenant's queued
+# calls must not use up the threads other tenants' requests need.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "200"))
+
+# Wait-time percentiles are computed over this many recent calls per tenant.
+WAIT_SAMPLES = 1000
+
+# Longest a call waits for a slot before giving up with OverloadedError.
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+
+# How often a queued call re-checks its request deadline.
+DEADLINE_POLL_SECONDS = 0.05
+
+
+def parse_weights(spec: str) -> dict[str, float]:
+    """Parse "tenant_a=2,tenant_b=0.5" into {tenant: weight}."""
+    weights = {}
+    for item in filter(None, (p.strip() for p in spec.split(","))):
+        tenant_id, _, weight = item.partition("=")
+        weights[tenant_id.strip()] = float(weight)
+    return weights
+
+
+TENANT_WEIGHTS = parse_weights(os.getenv("LLM_TENANT_WEIGHTS", ""))
+
+
+class _Waiter:
+    __slots__ = ("model", "start", "finish", "seq", "enqueued_at", "granted")
+
+    def __init__(self, model: str, start: float, finish: float, seq: int):
+        self.model = model
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.granted = threading.Event()
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class FairScheduler:
+    def __init__(
+        self,
+        capacity: int = MAX_CONCURRENT_CALLS,
+        tenant_limit: int = TENANT_CONCURRENCY,
+        model_limit: int = MODEL_CONCURRENCY,
+        weights: dict[str, float] | None = None,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.capacity = capacity
+        self.tenant_limit = tenant_limit
+        self.model_limit = model_limit
+        self.weights = TENANT_WEIGHTS if weights is None else weights
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: dict[str, float] = {}
+        self._queues: dict[str, deque[_Waiter]] = {}  # FIFO per tenant
+        self._queued = 0
+        self._running = 0
+        self._by_tenant: dict[str, int] = defaultdict(int)
+        self._by_model: dict[str, int] = defaultdict(int)
+        self._waits: dict[str, deque] = defaultdict(lambda: deque(maxlen=WAIT_SAMPLES))
+        self._granted: dict[str, int] = defaultdict(int)
+        self._abandoned: dict[str, int] = defaultdict(int)
+
+    def run(self, tenant_id: str, model: str, fn: Callable[[], T]) -> T:
+        self.acquire(tenant_id, model)
+        try:
+            return fn()
+        finally:
+            self.release(tenant_id, model)
+
+    def acquire(self, tenant_id: str, model: str) -> None:
+        """
+        Wait for a slot. Gives up with the deadline's error when the request
+        deadline passes, or with OverloadedError after queue_timeout.
+        """
+        with self._lock:
+            weight = self.weights.get(tenant_id, 1.0)
+            start = max(self._virtual_time, self._last_finish.get(tenant_id, 0.0))
+            finish = start + 1.0 / weight
+            self._last_finish[tenant_id] = finish
+
+            waiter = _Waiter(model, start, finish, next(self._seq))
+            self._queues.setdefault(tenant_id, deque()).append(waiter)
+            self._queued += 1
+            self._dispatch()
+
+        deadline = deadlines.current()
+        give_up_at = waiter.enqueued_at + self.queue_timeout
+        while not waiter.granted.wait(DEADLINE_POLL_SECONDS):
+            expired = deadline is not None and deadline.done()
+            if not expired and time.monotonic() < give_up_at:
+                continue
+
+            with self._lock:
+                if waiter.granted.is_set():
+                    self._free(tenant_id, model)
+                else:
+                    queue = self._queues[tenant_id]
+                    queue.remove(waiter)
+                    self._queued -= 1
+                    if not queue:
+                        del self._queues[tenant_id]
+                    # The new head may fit where this call did not.
+                    self._dispatch()
+                self._abandoned[tenant_id] += 1
+
+            if expired:
+                raise deadline.error()
+            raise OverloadedError(
+                "No LLM capacity available, retry later",
+                retry_after=max(1, round(self.queue_timeout)),
+            )
+
+    def release(self, tenant_id: str, model: str) -> None:
+        with self._lock:
+            self._free(tenant_id, model)
+
+    def _free(self, tenant_id: str, model: str) -> None:
+        # Caller holds self._lock.
+        self._running -= 1
+        self._by_tenant[tenant_id] -= 1
+        self._by_model[model] -= 1
+        self._dispatch()
+
+    def _next(self) -> str | None:
+        # Caller holds self._lock. The tenant whose queue head has the
+        # lowest finish tag among heads that fit under the caps.
+        best, best_key = None, None
+        for tenant_id, queue in self._queues.items():
+            head = queue[0]
+            if (
+                self._by_tenant[tenant_id] >= self.tenant_limit
+                or self._by_model[head.model] >= self.model_limit
+            ):
+                continue
+            key = (head.finish, head.seq)
+            if best_key is None or key < best_key:
+                best, best_key = tenant_id, key
+        return best
+
+    def _dispatch(self) -> None:
+        # Caller holds self._lock.
+        while self._running < self.capacity:
+            tenant_id = self._next()
+            if tenant_id is None:
+                return
+
+            queue = self._queues[tenant_id]
+            waiter = queue.popleft()
+            if not queue:
+                del self._queues[tenant_id]
+            self._queued -= 1
+
+            self._virtual_time = max(self._virtual_time, waiter.start)
+            self._running += 1
+            self._by_tenant[tenant_id] += 1
+            self._by_model[waiter.model] += 1
+            self._granted[tenant_id] += 1
+            self._waits[tenant_id].append(time.monotonic() - waiter.enqueued_at)
+            waiter.granted.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = {t: len(q) for t, q in self._queues.items()}
+
+            tenants = {}
+            for tenant_id in sorted(
+                set(self._granted) | set(queued) | set(self._abandoned)
+            ):
+                waits = sorted(self._waits[tenant_id])
+                tenants[tenant_id] = {
+                    "running": self._by_tenant[tenant_id],
+                    "queued": queued.get(tenant_id, 0),
+                    "calls": self._granted[tenant_id],
+                    "abandoned": self._abandoned[tenant_id],
+                    "wait_p50_ms": round(_percentile(waits, 0.50) * 1000, 2),
+                    "wait_p99_ms": round(_percentile(waits, 0.99) * 1000, 2),
+                    "wait_max_ms": round((waits[-1] if waits else 0.0) * 1000, 2),
+                }
+
+            return {
+                "running": self._running,
+                "queued": self._queued,
+                "capacity": self.capacity,
+                "models": {m: n for m, n in self._by_model.items() if n},
+                "tenants": tenants,
+            }
+
+
+llm_scheduler = FairScheduler()
@@ -0,0 +1,186 @@
+"""
+Scheduled recurring runs.
+
+A schedule runs an agent on a task every interval_seconds. Fire times are
+spread out with deterministic jitter: each schedule fires at a fixed
+offset past every multiple of its interval since the epoch, taken from a
+hash of the tenant and schedule id and less than
+min(interval, MAX_JITTER_SECONDS). Hourly schedules therefore do not all
+fire at the top of the hour, yet each one keeps a steady period.
+
+The scheduler thread started with the app looks for due schedules every
+POLL_SECONDS, one tenant at a time, with a range scan of the next_fire_at
+index:
+
+- A claim moves the due schedules on to their next fire time in the same
+  statement, so two workers never fire the same schedule. A schedule that
+  missed fire times while the app was down fires once, not once per
+  missed time.
+- Each tenant has at most TENANT_CONCURRENCY scheduled runs in flight;
+  further due schedules wait for the next pass, most overdue first.
+- Claimed schedules are grouped per agent, and each group is one
+  RunsService.run_batch: one agent load and one batched insert. Model
+  calls of all groups share WORKERS threads and go through the fair LLM
+  scheduler like live traffic.
+
+Firing is at most once: runs lost to a crash after their claim are not
+retried, the schedule just fires again at its next time.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterable
+
+from app import deps, scheduler, singleflight, tools
+from app.core.errors import OverloadedError
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.runs_repo import RunsRepository
+from app.repositories.schedules_repo import SchedulesRepository
+from app.services.runs_service import RunsService
+
+logger = logging.getLogger(__name__)
+
+# Model calls in flight at once in this process, across all schedules.
+WORKERS = int(os.getenv("SCHEDULE_WORKERS", "8"))
+
+# Scheduled runs in flight at once per tenant.
+TENANT_CONCURRENCY = int(
+    os.getenv("SCHEDULE_TENANT_CONCURRENCY", str(scheduler.TENANT_CONCURRENCY))
+)
+
+# Fire times are spread over up to this many seconds past the interval.
+MAX_JITTER_SECONDS = int(os.getenv("SCHEDULE_MAX_JITTER_SECONDS", "300"))
+
+POLL_SECONDS = float(os.getenv("SCHEDULE_POLL_SECONDS", "1"))
+
+
+def jitter(tenant_id: str, schedule_id: int, interval_seconds: int) -> int:
+    """The schedule's offset in seconds; the same on every worker and restart."""
+    window = max(1, min(interval_seconds, MAX_JITTER_SECONDS))
+    digest = hashlib.sha256(f"{tenant_id}:{schedule_id}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % window
+
+
+class ScheduleRunner:
+    def __init__(
+        self,
+        tenants: Callable[[], Iterable[str]] = lambda: deps.API_KEYS.values(),
+        workers: int = WORKERS,
+        tenant_limit: int = TENANT_CONCURRENCY,
+    ):
+        self.tenants = tenants
+        self.tenant_limit = tenant_limit
+        # Groups wait for their model calls, so they get their own threads.
+        self._groups = ThreadPoolExecutor(workers, thread_name_prefix="schedule")
+        self._calls = ThreadPoolExecutor(workers, thread_name_prefix="schedule-call")
+        self._lock = threading.Lock()
+        self._in_flight: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._fired = 0
+        self._stored = 0
+        self._skipped = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="schedule-runner", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop looking for due schedules; runs in flight still finish."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(POLL_SECONDS):
+            for tenant_id in self.tenants():
+                try:
+                    self.dispatch(tenant_id)
+                except Exception:
+                    logger.exception("Schedule dispatch failed for %s", tenant_id)
+
+    def dispatch(self, tenant_id: str, wait: bool = False) -> int:
+        """
+        Claim the tenant's due schedules, as many as it has free run slots,
+        and start their runs. Returns the number of schedules claimed; with
+        `wait`, returns once their runs are stored.
+        """
+        with self._lock:
+            free = self.tenant_limit - self._in_flight[tenant_id]
+        if free <= 0:
+            return 0
+        try:
+            db = deps.write_session(tenant_id)
+        except OverloadedError:
+            return 0  # being moved to another shard; next pass
+        with db:
+            now = datetime.utcnow()
+            claimed = SchedulesRepository(db).claim(tenant_id, now, free)
+        if not claimed:
+            return 0
+
+        by_agent = defaultdict(list)
+        for row in claimed:
+            by_agent[row.agent_id].append((row.model, row.task))
+        with self._lock:
+            self._in_flight[tenant_id] += len(claimed)
+            self._fired += len(claimed)
+        futures: list[Future] = [
+            self._groups.submit(self._run_group, tenant_id, agent_id, runs)
+            for agent_id, runs in by_agent.items()
+        ]
+        if wait:
+            for future in futures:
+                future.result()
+        return len(claimed)
+
+    def _run_group(self, tenant_id: str, agent_id: int, runs: list) -> None:
+        stored = 0
+        try:
+            with deps.write_session(tenant_id) as db:
+                service = RunsService(
+                    RunsRepository(db),
+                    AgentsRepository(db),
+                    llm_coalescer=(
+                        singleflight.llm_calls if singleflight.ENABLED else None
+                    ),
+                    llm_scheduler=(
+                        scheduler.llm_scheduler if scheduler.ENABLED else None
+                    ),
+                    tool_executor=tools.executor if tools.ENABLED else None,
+                )
+                stored = len(service.run_batch(tenant_id, agent_id, runs, self._calls))
+        except Exception:
+            logger.exception("Scheduled runs of agent %s failed", agent_id)
+        finally:
+            with self._lock:
+                self._in_flight[tenant_id] -= len(runs)
+                if not self._in_flight[tenant_id]:
+                    del self._in_flight[tenant_id]
+                self._stored += stored
+                self._skipped += len(runs) - stored
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "in_flight": sum(self._in_flight.values()),
+                "fired": self._fired,
+                "stored": self._stored,
+                "skipped": self._skipped,
+            }
+
+
+runner = ScheduleRunner()
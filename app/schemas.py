@@ -54,6 +54,19 @@ class RunAgentRequest(BaseModel):
     model: str = Field(min_length=1)
 
 
+class ExecutionStepOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    step: int
+    tool_id: int
+    tool_name: str
+    arguments: dict
+    output: str
+    error: bool
+    cached: bool
+    duration_ms: int
+
+
 class RunAgentResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -61,17 +74,28 @@ class RunAgentResponse(BaseModel):
     model: str
     prompt: str
     response: str
+    prompt_tokens: int
+    response_tokens: int
+    status: str
     created_at: datetime
+    steps: list[ExecutionStepOut] = Field(default_factory=list)
 
 
 class ExecutionOut(BaseModel):
+    """A run in a listing; only the fields asked for with fields= are set."""
+
     model_config = ConfigDict(from_attributes=True)
 
     id: int
-    model: str
-    prompt: str
-    response: str
-    created_at: datetime
+    model: str | None = None
+    prompt: str | None = None
+    response: str | None = None
+    task: str | None = None
+    snippet: str | None = None
+    prompt_tokens: int | None = None
+    response_tokens: int | None = None
+    status: str | None = None
+    created_at: datetime | None = None
 
 
 class ExecutionListOut(BaseModel):
@@ -81,3 +105,225 @@ class ExecutionListOut(BaseModel):
     limit: int
     offset: int
     items: list[ExecutionOut]
+
+
+class ExecutionChangesOut(BaseModel):
+    items: list[ExecutionOut]
+    # Pass as `after` to the next poll.
+    last_id: int
+
+
+class ExecutionSearchHit(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    agent_id: int
+    model: str
+    prompt: str
+    response: str
+    prompt_tokens: int
+    response_tokens: int
+    status: str
+    created_at: datetime
+
+
+class ExecutionSearchOut(BaseModel):
+    items: list[ExecutionSearchHit]
+    next_cursor: str | None = None
+
+
+class ConversationCreate(BaseModel):
+    model: str = Field(min_length=1)
+
+
+class ConversationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    agent_id: int
+    model: str
+    turn_count: int
+    summary: str
+    created_at: datetime
+
+
+class TurnCreate(BaseModel):
+    message: str = Field(min_length=1)
+
+
+class TurnOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    conversation_id: int
+    turn: int
+    message: str
+    response: str
+    prompt_tokens: int
+    response_tokens: int
+    status: str
+    created_at: datetime
+    steps: list[ExecutionStepOut] = Field(default_factory=list)
+
+
+class TurnListOut(BaseModel):
+    items: list[TurnOut]
+    next_after: int | None = None
+
+
+class ResponseSizeStats(BaseModel):
+    total: int
+    avg: float
+    min: int
+    max: int
+
+
+class TokenCounts(BaseModel):
+    prompt: int
+    response: int
+    total: int
+
+
+class RunStatsBucket(BaseModel):
+    bucket_start: datetime
+    agent_id: int | None = None
+    model: str | None = None
+    run_count: int
+    response_bytes: ResponseSizeStats
+    tokens: TokenCounts
+
+
+class RunStatsOut(BaseModel):
+    granularity: str
+    start: datetime
+    end: datetime
+    buckets: list[RunStatsBucket]
+
+
+class AgentTokenUsage(BaseModel):
+    agent_id: int
+    run_count: int
+    tokens: TokenCounts
+
+
+class TokenUsageOut(BaseModel):
+    start: datetime
+    end: datetime
+    tokens: TokenCounts
+    agents: list[AgentTokenUsage]
+
+
+class ReplayCreate(BaseModel):
+    target_model: str = Field(min_length=1)
+    # Filters on the runs to replay; omitted ones match everything.
+    agent_id: int | None = None
+    source_model: str | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+
+
+class ReplayJobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    status: str
+    target_model: str
+    agent_id: int | None
+    source_model: str | None
+    created_from: datetime | None
+    created_to: datetime | None
+    total: int
+    processed: int
+    failed: int
+    runs_per_second: float
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+class ReplayResultOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    execution_id: int
+    response: str
+    error: bool
+    prompt_tokens: int
+    response_tokens: int
+    duration_ms: int
+
+
+class ReplayResultListOut(BaseModel):
+    items: list[ReplayResultOut]
+    next_after: int | None = None
+
+
+class WebhookCreate(BaseModel):
+    url: str = Field(min_length=1, max_length=2000)
+
+
+class WebhookOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    url: str
+    created_at: datetime
+
+
+class WebhookCreatedOut(WebhookOut):
+    # Only returned here; used to check the X-Webhook-Signature header.
+    secret: str
+
+
+class WebhookDeliveryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    event: str
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_error: str | None
+    created_at: datetime
+    delivered_at: datetime | None
+
+
+class WebhookDeliveryListOut(BaseModel):
+    items: list[WebhookDeliveryOut]
+    next_after: int | None = None
+
+
+class ScheduleCreate(BaseModel):
+    task: str = Field(min_length=1)
+    model: str = Field(min_length=1)
+    interval_seconds: int
+
+
+class ScheduleOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    agent_id: int
+    task: str
+    model: str
+    interval_seconds: int
+    # Jitter: the schedule fires this long after each multiple of the interval.
+    offset_seconds: int
+    next_fire_at: datetime
+    last_fired_at: datetime | None
+    created_at: datetime
+
+
+class UsagePeriodOut(BaseModel):
+    period_start: datetime
+    resets_at: datetime
+    runs: int
+    # None: no limit.
+    runs_limit: int | None
+    tokens: int
+    tokens_limit: int | None
+
+
+class UsageOut(BaseModel):
+    day: UsagePeriodOut
+    month: UsagePeriodOut
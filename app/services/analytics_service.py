@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+
+from app.core.errors import BadRequestError
+from app.repositories.analytics_repo import (
+    GRANULARITIES,
+    AnalyticsRepository,
+    bucket_start,
+)
+
+_BUCKET = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+_DEFAULT_BUCKETS = {"minute": 60, "hour": 24, "day": 30}
+MAX_BUCKETS = 1000
+
+TOKEN_USAGE_DEFAULT_DAYS = 30
+MAX_TOKEN_USAGE_AGENTS = 100
+
+_DIMENSIONS = ("agent_id", "model")
+
+
+def naive_utc(value: datetime | None) -> datetime | None:
+    # Timestamps are stored as naive UTC; convert offset-aware bounds to match.
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class AnalyticsService:
+    def __init__(self, repo: AnalyticsRepository):
+        self.repo = repo
+
+    def run_stats(
+        self,
+        tenant_id: str,
+        granularity: str,
+        start: datetime | None,
+        end: datetime | None,
+        group_by: str,
+        agent_id: int | None,
+        model: str | None,
+    ):
+        if granularity not in GRANULARITIES:
+            raise BadRequestError(
+                f"granularity must be one of {', '.join(GRANULARITIES)}"
+            )
+
+        dims = tuple(d.strip() for d in group_by.split(",") if d.strip())
+        dims = tuple({"agent": "agent_id"}.get(d, d) for d in dims)
+        if any(d not in _DIMENSIONS for d in dims):
+            raise BadRequestError("group_by accepts: agent, model")
+
+        step = _BUCKET[granularity]
+        start, end = naive_utc(start), naive_utc(end)
+        end = end or datetime.utcnow()
+        start = start or end - step * _DEFAULT_BUCKETS[granularity]
+        if start >= end:
+            raise BadRequestError("start must be before end")
+        if (end - start) / step > MAX_BUCKETS:
+            raise BadRequestError(f"Range covers more than {MAX_BUCKETS} buckets")
+
+        rows = self.repo.run_rollups(
+            tenant_id=tenant_id,
+            granularity=granularity,
+            start=start,
+            end=end,
+            group_by=dims,
+            agent_id=agent_id,
+            model=model,
+        )
+        return start, end, dims, rows
+
+    def token_usage(
+        self,
+        tenant_id: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int,
+    ):
+        """Tenant token totals plus the `limit` agents that used the most."""
+        if not 1 <= limit <= MAX_TOKEN_USAGE_AGENTS:
+            raise BadRequestError(
+                f"limit must be between 1 and {MAX_TOKEN_USAGE_AGENTS}"
+            )
+
+        start, end = naive_utc(start), naive_utc(end)
+        end = end or datetime.utcnow()
+        start = bucket_start(
+            start or end - timedelta(days=TOKEN_USAGE_DEFAULT_DAYS), "day"
+        )
+        if start >= end:
+            raise BadRequestError("start must be before end")
+
+        rows = self.repo.token_totals(tenant_id=tenant_id, start=start, end=end)
+        prompt = sum(r.prompt_tokens for r in rows)
+        response = sum(r.response_tokens for r in rows)
+        return start, end, prompt, response, rows[:limit]
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from app import model_registry
+from app.core.errors import BadRequestError, NotFoundError, RateLimitError
+from app.rate_limit import check_rate_limit
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.replays_repo import ReplaysRepository
+from app.services.analytics_service import naive_utc
+
+MAX_RESULTS_LIMIT = 100
+
+
+def throughput(job, now: datetime | None = None) -> float:
+    """Replayed runs per second since the job started."""
+    if job.started_at is None:
+        return 0.0
+    end = job.finished_at or now or datetime.utcnow()
+    elapsed = (end - job.started_at).total_seconds()
+    return job.processed / elapsed if elapsed > 0 else 0.0
+
+
+class ReplaysService:
+    def __init__(self, replays_repo: ReplaysRepository, agents_repo: AgentsRepository):
+        self.replays_repo = replays_repo
+        self.agents_repo = agents_repo
+
+    def create_job(
+        self,
+        tenant_id: str,
+        target_model: str,
+        agent_id: int | None = None,
+        source_model: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ):
+        try:
+            check_rate_limit(tenant_id)
+        except RuntimeError as e:
+            raise RateLimitError(str(e))
+
+        if target_model not in model_registry.registry:
+            raise BadRequestError("Unsupported model")
+        if agent_id is not None and not self.agents_repo.get_snapshot(
+            tenant_id, agent_id
+        ):
+            raise BadRequestError("Agent not found")
+        created_from, created_to = naive_utc(created_from), naive_utc(created_to)
+        if created_from and created_to and created_from >= created_to:
+            raise BadRequestError("created_from must be before created_to")
+
+        return self.replays_repo.create(
+            tenant_id, target_model, agent_id, source_model, created_from, created_to
+        )
+
+    def get_job(self, tenant_id: str, job_id: int):
+        job = self.replays_repo.get(tenant_id, job_id)
+        if not job:
+            raise NotFoundError("Replay job not found")
+        return job
+
+    def list_results(self, tenant_id: str, job_id: int, after: int, limit: int):
+        if not 1 <= limit <= MAX_RESULTS_LIMIT:
+            raise BadRequestError(f"limit must be between 1 and {MAX_RESULTS_LIMIT}")
+        return self.replays_repo.results(tenant_id, job_id, after, limit)
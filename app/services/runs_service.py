@@ -1,8 +1,117 @@
-from app.llm import SUPPORTED_MODELS, mock_llm_complete
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import Executor
+from typing import Sequence
+
+from app.llm import (
+    estimate_tokens,
+    mock_llm_complete,
+    mock_llm_summarize,
+    mock_llm_tool_calls,
+)
+from app.prompts import build_prompt, conversation_history, fit_task
 from app.rate_limit import check_rate_limit
-from app.repositories.runs_repo import RunsRepository
+from app.repositories.runs_repo import (
+    DEFAULT_LIST_FIELDS,
+    LIST_FIELDS,
+    RunsRepository,
+)
 from app.repositories.agents_repo import AgentsRepository
-from app.core.errors import BadRequestError
+from app.repositories.conversations_repo import ConversationsRepository
+from app import deadlines, model_registry, quotas
+from app.context_cache import (
+    SUMMARY_MAX_TOKENS,
+    WINDOW_TURNS,
+    ConversationContext,
+    context_cache,
+    render_turn,
+)
+from app.core.errors import (
+    BadRequestError,
+    ConflictError,
+    DeadlineExceededError,
+    NotFoundError,
+    ProviderError,
+    QuotaExceededError,
+    RateLimitError,
+    RequestCancelledError,
+)
+from app.scheduler import FairScheduler
+from app.singleflight import SingleFlight
+from app.tools import MAX_STEPS, ToolCall, ToolExecutor, ToolResult
+
+logger = logging.getLogger(__name__)
+
+MAX_SEARCH_LIMIT = 100
+
+# Runs returned per change-feed catch-up query.
+CHANGES_PAGE_SIZE = 100
+
+# Length of the response snippet in run listings (fields=snippet).
+DEFAULT_SNIPPET_LEN = 200
+MAX_SNIPPET_LEN = 2000
+
+# What to do with a task that does not fit the model's prompt budget:
+# "truncate" it, or "reject" the run with 400.
+CONTEXT_OVERFLOW = os.getenv("CONTEXT_OVERFLOW", "truncate")
+
+# Execution status recorded for runs that did not complete.
+_ABANDONED_STATUS = {
+    DeadlineExceededError: "timed_out",
+    RequestCancelledError: "cancelled",
+    ProviderError: "failed",
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...]:
+    """`fields=a,b` as a tuple in LIST_FIELDS order; id is always included."""
+    if fields is None:
+        requested = set(DEFAULT_LIST_FIELDS)
+    else:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested.difference(LIST_FIELDS)
+        if unknown:
+            raise BadRequestError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(f for f in LIST_FIELDS if f in requested)
+
+
+def _match_expression(q: str) -> str:
+    # Quote every word so user input can never be parsed as FTS5 syntax;
+    # adjacent quoted terms are ANDed together.
+    words = _WORD.findall(q)
+    if not words:
+        raise BadRequestError("Search query must contain at least one word")
+    return " ".join(f'"{w}"' for w in words)
+
+
+def _encode_cursor(rank: float, execution_id: int) -> str:
+    # bm25 depends on index-wide statistics, so a cursor taken before rows
+    # were added or deleted may skip or repeat rows at the page boundary.
+    raw = json.dumps([rank, execution_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, execution_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return float(rank), int(execution_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequestError("Invalid cursor")
+
+
+def _check_rate_limit(tenant_id: str) -> None:
+    try:
+        check_rate_limit(tenant_id)
+    except RuntimeError as e:
+        raise RateLimitError(str(e))
 
 
 class RunsService:
@@ -10,9 +119,17 @@ class RunsService:
         self,
         runs_repo: RunsRepository,
         agents_repo: AgentsRepository,
+        llm_coalescer: SingleFlight | None = None,
+        llm_scheduler: FairScheduler | None = None,
+        tool_executor: ToolExecutor | None = None,
+        conversations_repo: ConversationsRepository | None = None,
     ):
         self.runs_repo = runs_repo
         self.agents_repo = agents_repo
+        self.llm_coalescer = llm_coalescer
+        self.llm_scheduler = llm_scheduler
+        self.tool_executor = tool_executor
+        self.conversations_repo = conversations_repo
 
     def run(
         self,
@@ -21,53 +138,397 @@ class RunsService:
         model: str,
         task: str,
     ):
-        try:
-            check_rate_limit(tenant_id)
-        except RuntimeError as e:
-            from app.core.errors import RateLimitError
+        _check_rate_limit(tenant_id)
 
-            raise RateLimitError(str(e))
-
-        if model not in SUPPORTED_MODELS:
+        if model not in model_registry.registry:
             raise BadRequestError("Unsupported model")
 
-        agent = self.agents_repo.get(tenant_id, agent_id)
+        agent = self.agents_repo.get_snapshot(tenant_id, agent_id)
         if not agent:
             raise BadRequestError("Agent not found")
 
-        tool_names = (
-            ", ".join(sorted(t.name for t in agent.tools)) if agent.tools else "none"
+        # Checked before the provider call, so oversized input costs nothing.
+        prompt = build_prompt(
+            agent, fit_task(model, agent, task, overflow=CONTEXT_OVERFLOW)
         )
 
-        prompt = (
-            f"Agent Name: {agent.name}\n"
-            f"Role: {agent.role}\n"
-            f"Description: {agent.description}\n"
-            f"Tools: {tool_names}\n\n"
-            f"Task: {task}\n"
-            f"Instructions: Respond as the agent, using tools when relevant.\n"
+        # Counted from here on, also if the run does not complete; in memory,
+        # see app.quotas.
+        quotas.tracker.reserve(tenant_id)
+
+        # Don't hold a writer connection through the provider call; create()
+        # starts a fresh transaction.
+        self.runs_repo.release()
+
+        try:
+            deadlines.check()
+            response, steps, prompt_tokens = self._run_tools(
+                tenant_id, model, prompt, agent
+            )
+            deadlines.check()
+
+            execution = self.runs_repo.create(
+                tenant_id=tenant_id,
+                agent_id=agent.id,
+                model=model,
+                prompt=prompt,
+                task=task,
+                response=response,
+                prompt_tokens=prompt_tokens,
+                response_tokens=estimate_tokens(model, response),
+                steps=steps,
+            )
+        except (DeadlineExceededError, RequestCancelledError, ProviderError) as e:
+            prompt_tokens = estimate_tokens(model, prompt)
+            with deadlines.detached():
+                self.runs_repo.record_abandoned(
+                    tenant_id=tenant_id,
+                    agent_id=agent.id,
+                    model=model,
+                    prompt=prompt,
+                    task=task,
+                    prompt_tokens=prompt_tokens,
+                    status=_ABANDONED_STATUS[type(e)],
+                )
+            quotas.tracker.charge(tenant_id, prompt_tokens)
+            raise
+        except BaseException:
+            quotas.tracker.release(tenant_id)
+            raise
+
+        quotas.tracker.charge(
+            tenant_id, execution.prompt_tokens + execution.response_tokens
         )
+        return execution
+
+    def run_batch(
+        self,
+        tenant_id: str,
+        agent_id: int,
+        runs: Sequence[tuple[str, str]],
+        executor: Executor | None = None,
+    ) -> list[int]:
+        """
+        Run several (model, task) pairs of one agent that are not requests,
+        e.g. scheduled runs that came due together (see app.schedules): the
+        agent is loaded once and the finished runs are stored with one
+        RunsRepository.create_many. Model calls run on `executor` if given.
 
-        response = mock_llm_complete(model, prompt)
+        There is no rate limit or deadline, but each run counts against the
+        tenant's quotas; runs over quota, for a model that is no longer
+        served or that fail unexpectedly are skipped. Provider errors are
+        stored as failed runs, as in run(). Returns the ids of the stored runs.
+        """
+        agent = self.agents_repo.get_snapshot(tenant_id, agent_id)
+        if not agent:
+            return []
+        self.runs_repo.release()
 
-        return self.runs_repo.create(
-            tenant_id=tenant_id,
-            agent_id=agent.id,
-            model=model,
-            prompt=prompt,
-            response=response,
+        def execute(run: tuple[str, str]):
+            return self._run_unattended(tenant_id, agent, *run)
+
+        if executor:
+            results = executor.map(execute, runs)
+        else:
+            results = map(execute, runs)
+        return self.runs_repo.create_many(
+            tenant_id, agent.id, [r for r in results if r is not None]
         )
 
+    def _run_unattended(self, tenant_id: str, agent, model: str, task: str):
+        if model not in model_registry.registry:
+            return None
+        # Nobody is there to act on a 400, so oversized tasks are truncated.
+        prompt = build_prompt(agent, fit_task(model, agent, task))
+        try:
+            quotas.tracker.reserve(tenant_id)
+        except QuotaExceededError:
+            return None
+
+        run = {"model": model, "prompt": prompt, "task": task}
+        try:
+            response, steps, prompt_tokens = self._run_tools(
+                tenant_id, model, prompt, agent
+            )
+        except ProviderError:
+            prompt_tokens = estimate_tokens(model, prompt)
+            quotas.tracker.charge(tenant_id, prompt_tokens)
+            return {
+                **run,
+                "status": "failed",
+                "response": "",
+                "prompt_tokens": prompt_tokens,
+                "response_tokens": 0,
+            }
+        except Exception:
+            quotas.tracker.release(tenant_id)
+            logger.exception("Unattended run of agent %s failed", agent.id)
+            return None
+
+        response_tokens = estimate_tokens(model, response)
+        quotas.tracker.charge(tenant_id, prompt_tokens + response_tokens)
+        return {
+            **run,
+            "status": "completed",
+            "response": response,
+            "prompt_tokens": prompt_tokens,
+            "response_tokens": response_tokens,
+            "steps": steps,
+        }
+
+    def start_conversation(self, tenant_id: str, agent_id: int, model: str):
+        if model not in model_registry.registry:
+            raise BadRequestError("Unsupported model")
+        if not self.agents_repo.get_snapshot(tenant_id, agent_id):
+            raise BadRequestError("Agent not found")
+        return self.conversations_repo.create(tenant_id, agent_id, model)
+
+    def get_conversation(self, tenant_id: str, conversation_id: int):
+        conversation = self.conversations_repo.get(tenant_id, conversation_id)
+        if not conversation:
+            raise NotFoundError("Conversation not found")
+        return conversation
+
+    def converse(self, tenant_id: str, conversation_id: int, message: str):
+        """
+        Add one turn to a conversation.
+
+        The prompt is the agent header, the summary of older turns, the last
+        WINDOW_TURNS turns and the new message, so its size and build cost
+        do not grow with the conversation. The window comes from the
+        context cache when it is current and is read from the database
+        otherwise. Only the new message and reply are stored.
+        """
+        _check_rate_limit(tenant_id)
+
+        conversation = self.get_conversation(tenant_id, conversation_id)
+        model, turn_count = conversation.model, conversation.turn_count
+
+        agent = self.agents_repo.get_snapshot(tenant_id, conversation.agent_id)
+        if not agent:
+            raise NotFoundError("Conversation not found")
+
+        context = context_cache.get(tenant_id, conversation_id, turn_count)
+        if context is None:
+            window = self.conversations_repo.window(
+                conversation_id, conversation.summarized_turns
+            )
+            context = ConversationContext(
+                turn_count=turn_count,
+                summary=conversation.summary,
+                summarized_turns=conversation.summarized_turns,
+                window=tuple(render_turn(m, r) for m, r in window),
+            )
+
+        # Counted like a run, see run().
+        quotas.tracker.reserve(tenant_id)
+
+        self.runs_repo.release()
+
+        # Recorded as abandoned like in run(), also if the deadline passes
+        # while older turns are being summarized.
+        prompt = None
+        try:
+            deadlines.check()
+            while len(context.window) >= WINDOW_TURNS:
+                context = self._fold_oldest_turn(tenant_id, model, context)
+
+            history = conversation_history(context)
+            message = fit_task(model, agent, message, history, CONTEXT_OVERFLOW)
+            prompt = build_prompt(agent, message, history)
+
+            response, steps, prompt_tokens = self._run_tools(
+                tenant_id, model, prompt, agent
+            )
+            deadlines.check()
+
+            if not self.conversations_repo.advance(
+                conversation_id, turn_count, context.summary, context.summarized_turns
+            ):
+                self.runs_repo.release()
+                context_cache.invalidate(tenant_id, conversation_id)
+                raise ConflictError("Conversation was continued concurrently, retry")
+
+            execution = self.runs_repo.create(
+                tenant_id=tenant_id,
+                agent_id=agent.id,
+                model=model,
+                prompt=message,
+                response=response,
+                prompt_tokens=prompt_tokens,
+                response_tokens=estimate_tokens(model, response),
+                steps=steps,
+                conversation_id=conversation_id,
+                turn=turn_count + 1,
+            )
+        except (DeadlineExceededError, RequestCancelledError, ProviderError) as e:
+            prompt_tokens = estimate_tokens(model, prompt) if prompt else 0
+            with deadlines.detached():
+                self.runs_repo.record_abandoned(
+                    tenant_id=tenant_id,
+                    agent_id=agent.id,
+                    model=model,
+                    prompt=message,
+                    prompt_tokens=prompt_tokens,
+                    status=_ABANDONED_STATUS[type(e)],
+                    conversation_id=conversation_id,
+                )
+            quotas.tracker.charge(tenant_id, prompt_tokens)
+            raise
+        except BaseException:
+            quotas.tracker.release(tenant_id)
+            raise
+
+        quotas.tracker.charge(
+            tenant_id, execution.prompt_tokens + execution.response_tokens
+        )
+        context_cache.put(tenant_id, conversation_id, context.append(message, response))
+        return execution
+
+    def _fold_oldest_turn(
+        self, tenant_id: str, model: str, context: ConversationContext
+    ) -> ConversationContext:
+        oldest, *rest = context.window
+        summary = self._schedule(
+            tenant_id,
+            model,
+            lambda: mock_llm_summarize(
+                model, context.summary, oldest, SUMMARY_MAX_TOKENS
+            ),
+        )
+        return ConversationContext(
+            turn_count=context.turn_count,
+            summary=summary,
+            summarized_turns=context.summarized_turns + 1,
+            window=tuple(rest),
+        )
+
+    def list_turns(self, tenant_id: str, conversation_id: int, after: int, limit: int):
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise BadRequestError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+        return self.conversations_repo.turns(tenant_id, conversation_id, after, limit)
+
+    def _run_tools(
+        self, tenant_id: str, model: str, prompt: str, agent
+    ) -> tuple[str, list[ToolResult], int]:
+        """
+        Let the model call the agent's tools, then get its final answer.
+
+        Each step's calls run concurrently; their outputs are appended to
+        the prompt of the next model turn. Agents without runnable tools
+        go straight to the final completion. Also returns the prompt tokens
+        sent over all model turns.
+        """
+        available = []
+        if self.tool_executor is not None:
+            available = self.tool_executor.available(agent.tool_ids, agent.tool_names)
+        tool_ids = {name: tool_id for tool_id, name in available}
+        names = list(tool_ids)
+
+        results: list[ToolResult] = []
+        observations: list[str] = []
+        prompt_tokens = 0
+        for step in range(MAX_STEPS if available else 0):
+            prompt_tokens += estimate_tokens(model, prompt) + sum(
+                estimate_tokens(model, o) for o in observations
+            )
+            requested = self._schedule(
+                tenant_id,
+                model,
+                lambda: mock_llm_tool_calls(model, prompt, names, observations),
+            )
+            calls = [
+                ToolCall(tool_ids[name], name, arguments)
+                for name, arguments in requested
+                if name in tool_ids
+            ]
+            if not calls:
+                break
+
+            step_results = self.tool_executor.execute(step, calls)
+            results.extend(step_results)
+            observations.extend(
+                f"{r.call.name}({json.dumps(r.call.arguments, sort_keys=True)})"
+                f" -> {r.output}"
+                for r in step_results
+            )
+            deadlines.check()
+
+        if observations:
+            prompt += "Observations:\n" + "\n".join(observations) + "\n"
+        prompt_tokens += estimate_tokens(model, prompt)
+        return self._complete(tenant_id, model, prompt), results, prompt_tokens
+
+    def _schedule(self, tenant_id: str, model: str, fn):
+        if self.llm_scheduler is None:
+            return fn()
+        return self.llm_scheduler.run(tenant_id, model, fn)
+
+    def _complete(self, tenant_id: str, model: str, prompt: str) -> str:
+        def call() -> str:
+            return self._schedule(
+                tenant_id, model, lambda: mock_llm_complete(model, prompt)
+            )
+
+        if self.llm_coalescer is None:
+            return call()
+
+        # Each caller still gets its own execution row; only the provider
+        # call is shared between identical in-flight requests (and only the
+        # leader takes a scheduler slot).
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return self.llm_coalescer.do((tenant_id, model, digest), call)
+
     def list_runs(
         self,
         tenant_id: str,
         agent_id: int,
         limit: int,
         offset: int,
+        fields: str | None = None,
+        snippet_len: int = DEFAULT_SNIPPET_LEN,
     ):
-        return self.runs_repo.list(
+        if not 1 <= snippet_len <= MAX_SNIPPET_LEN:
+            raise BadRequestError(
+                f"snippet_len must be between 1 and {MAX_SNIPPET_LEN}"
+            )
+        return self.runs_repo.list_fields(
             tenant_id=tenant_id,
             agent_id=agent_id,
             limit=limit,
             offset=offset,
+            fields=_parse_fields(fields),
+            snippet_len=snippet_len,
+        )
+
+    def run_changes(self, tenant_id: str, agent_id: int, after: int):
+        """The agent's runs stored after run `after`, oldest first."""
+        if after < 0:
+            raise BadRequestError("after must not be negative")
+        return self.runs_repo.changes(tenant_id, agent_id, after, CHANGES_PAGE_SIZE)
+
+    def search_runs(
+        self,
+        tenant_id: str,
+        q: str,
+        limit: int,
+        cursor: str | None,
+    ):
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise BadRequestError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+
+        after = _decode_cursor(cursor) if cursor else None
+        rows = self.runs_repo.search(
+            tenant_id=tenant_id,
+            match=_match_expression(q),
+            limit=limit + 1,
+            after=after,
         )
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last, rank = rows[-1]
+            next_cursor = _encode_cursor(rank, last.id)
+
+        return [e for e, _ in rows], next_cursor
@@ -0,0 +1,52 @@
+from app import model_registry, schedules
+from app.core.errors import BadRequestError, NotFoundError
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.schedules_repo import SchedulesRepository
+
+MIN_INTERVAL_SECONDS = 60
+MAX_INTERVAL_SECONDS = 30 * 24 * 3600
+MAX_SCHEDULES_PER_AGENT = 20
+
+
+class SchedulesService:
+    def __init__(self, repo: SchedulesRepository, agents_repo: AgentsRepository):
+        self.repo = repo
+        self.agents_repo = agents_repo
+
+    def _check_agent(self, tenant_id: str, agent_id: int) -> None:
+        if not self.agents_repo.get_snapshot(tenant_id, agent_id):
+            raise NotFoundError("Agent not found")
+
+    def create(self, tenant_id: str, agent_id: int, payload):
+        self._check_agent(tenant_id, agent_id)
+        if payload.model not in model_registry.registry:
+            raise BadRequestError("Unsupported model")
+        if not MIN_INTERVAL_SECONDS <= payload.interval_seconds <= MAX_INTERVAL_SECONDS:
+            raise BadRequestError(
+                f"interval_seconds must be between {MIN_INTERVAL_SECONDS}"
+                f" and {MAX_INTERVAL_SECONDS}"
+            )
+        if self.repo.count(tenant_id, agent_id) >= MAX_SCHEDULES_PER_AGENT:
+            raise BadRequestError(
+                f"At most {MAX_SCHEDULES_PER_AGENT} schedules per agent"
+            )
+        return self.repo.create(
+            tenant_id,
+            agent_id,
+            payload.task,
+            payload.model,
+            payload.interval_seconds,
+            lambda schedule_id: schedules.jitter(
+                tenant_id, schedule_id, payload.interval_seconds
+            ),
+        )
+
+    def list(self, tenant_id: str, agent_id: int):
+        self._check_agent(tenant_id, agent_id)
+        return self.repo.list(tenant_id, agent_id)
+
+    def delete(self, tenant_id: str, agent_id: int, schedule_id: int) -> None:
+        schedule = self.repo.get(tenant_id, agent_id, schedule_id)
+        if not schedule:
+            raise NotFoundError("Schedule not found")
+        self.repo.delete(schedule)
@@ -1,4 +1,5 @@
 from sqlalchemy.exc import IntegrityError
+from app import tools
 from app.core.errors import NotFoundError, ConflictError
 from app.repositories.tools_repo import ToolsRepository
 
@@ -37,8 +38,10 @@ class ToolsService:
         except IntegrityError:
             raise ConflictError("Tool name already exists for this tenant")
 
+        tools.result_cache.invalidate(tool.id)
         return tool
 
     def delete(self, tenant_id: str, tool_id: int) -> None:
         tool = self.get(tenant_id, tool_id)
         self.repo.delete(tool)
+        tools.result_cache.invalidate(tool_id)
@@ -0,0 +1,43 @@
+import secrets
+
+import httpx
+
+from app import webhooks
+from app.core.errors import BadRequestError, NotFoundError
+from app.repositories.webhooks_repo import WebhooksRepository
+
+MAX_WEBHOOKS_PER_TENANT = 10
+MAX_DELIVERIES_LIMIT = 100
+
+
+class WebhooksService:
+    def __init__(self, repo: WebhooksRepository):
+        self.repo = repo
+
+    def create(self, tenant_id: str, url: str):
+        try:
+            parsed = httpx.URL(url)
+        except httpx.InvalidURL:
+            raise BadRequestError("Invalid webhook URL")
+        if parsed.scheme not in ("http", "https") or not parsed.host:
+            raise BadRequestError("Webhook URL must be an absolute http(s) URL")
+        webhooks.resolve(parsed)
+        if self.repo.count(tenant_id) >= MAX_WEBHOOKS_PER_TENANT:
+            raise BadRequestError(
+                f"At most {MAX_WEBHOOKS_PER_TENANT} webhooks per tenant"
+            )
+        return self.repo.create(tenant_id, url, secrets.token_hex(32))
+
+    def list(self, tenant_id: str):
+        return self.repo.list(tenant_id)
+
+    def delete(self, tenant_id: str, webhook_id: int) -> None:
+        webhook = self.repo.get(tenant_id, webhook_id)
+        if not webhook:
+            raise NotFoundError("Webhook not found")
+        self.repo.delete(webhook)
+
+    def list_deliveries(self, tenant_id: str, webhook_id: int, after: int, limit: int):
+        if not 1 <= limit <= MAX_DELIVERIES_LIMIT:
+            raise BadRequestError(f"limit must be between 1 and {MAX_DELIVERIES_LIMIT}")
+        return self.repo.deliveries(tenant_id, webhook_id, after, limit)
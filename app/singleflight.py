@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, wait
+from typing import Callable, Hashable, TypeVar
+
+import anyio
+
+from app import deadlines
+
+T = TypeVar("T")
+
+# Opt-in: identical concurrent LLM calls share one provider call.
+ENABLED = os.getenv("COALESCE_LLM_CALLS", "0") == "1"
+
+# How often a waiting follower re-checks its request deadline.
+DEADLINE_POLL_SECONDS = 0.05
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait for the leader's result instead of
+    running it again. Sync callers block on a concurrent Future, async
+    callers await the same Future, so both can share one flight. A sync
+    follower stops waiting with its own deadline's error once its request
+    deadline passes or it is cancelled; the leader keeps going.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, Future] = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            self._calls += 1
+            fut = self._flights.get(key)
+            if fut is not None:
+                self._coalesced += 1
+                return fut, False
+            fut = Future()
+            self._flights[key] = fut
+            return fut, True
+
+    def _lead(self, key: Hashable, fut: Future, fn: Callable[[], T]) -> T:
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        fut, leader = self._join(key)
+        if leader:
+            return self._lead(key, fut, fn)
+        return self._follow(fut)
+
+    @staticmethod
+    def _follow(fut: Future) -> T:
+        deadline = deadlines.current()
+        if deadline is not None:
+            while not fut.done():
+                deadline.check()
+                wait([fut], timeout=min(DEADLINE_POLL_SECONDS, deadline.remaining()))
+        return fut.result()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], T]) -> T:
+        fut, leader = self._join(key)
+        if leader:
+            return await anyio.to_thread.run_sync(self._lead, key, fut, fn)
+        return await asyncio.wrap_future(fut)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._flights),
+            }
+
+
+llm_calls = SingleFlight()
@@ -0,0 +1,252 @@
+"""
+Tool execution for agent runs.
+
+Tools are stored per tenant as names; what a name does is looked up in a
+ToolRegistry, so deployments can plug in their own implementations. The
+local stand-ins below are only registered with LOCAL_TOOLS=1 (tests and
+benchmarks), and tool calls are off unless AGENT_TOOLS=1. A run asks the model for tool calls,
+executes all calls of one step concurrently (at most TOOL_PARALLELISM at
+a time per process) and feeds the results back, until the model answers
+or MAX_STEPS is reached.
+
+Results are memoized per (tool_id, name, arguments) for
+RESULT_TTL_SECONDS, so repeated calls across runs (or within one) skip the
+tool entirely. Failed calls are not cached. A renamed tool maps to another
+implementation, so the name is part of the key; updating or deleting a
+tool also drops its entries in this process.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from app import deadlines
+
+ENABLED = os.getenv("AGENT_TOOLS", "0") == "1"
+
+# Register the local stand-in tools (search, summarizer, word_count).
+LOCAL_TOOLS = os.getenv("LOCAL_TOOLS", "0") == "1"
+
+# Model round-trips per run that may request tools; the last one answers.
+MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "4"))
+
+# Tool calls running at once in this process, across all runs.
+TOOL_PARALLELISM = int(os.getenv("TOOL_PARALLELISM", "8"))
+
+RESULT_TTL_SECONDS = float(os.getenv("TOOL_RESULT_TTL_SECONDS", "300"))
+RESULT_CACHE_MAX_ENTRIES = 10_000
+
+# Simulated I/O time of the local tools (used by the benchmark).
+LOCAL_TOOL_LATENCY_SECONDS = float(os.getenv("LOCAL_TOOL_LATENCY_SECONDS", "0"))
+
+ToolFn = Callable[..., str]
+
+
+@dataclass(frozen=True, slots=True)
+class ToolCall:
+    tool_id: int
+    name: str
+    arguments: dict
+
+    @property
+    def key(self) -> tuple[int, str, str]:
+        return self.tool_id, self.name, json.dumps(self.arguments, sort_keys=True)
+
+
+@dataclass(frozen=True, slots=True)
+class ToolResult:
+    call: ToolCall
+    step: int
+    output: str
+    error: bool
+    cached: bool
+    duration_ms: int
+
+
+class ToolRegistry:
+    """Maps tool names to implementations; `fn(**arguments) -> str`."""
+
+    def __init__(self):
+        self._tools: dict[str, ToolFn] = {}
+
+    def register(self, name: str, fn: ToolFn | None = None):
+        if fn is None:
+            return lambda f: self.register(name, f)
+        self._tools[name] = fn
+        return fn
+
+    def unregister(self, name: str) -> None:
+        self._tools.pop(name, None)
+
+    def get(self, name: str) -> ToolFn | None:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+
+class ToolResultCache:
+    """LRU of tool outputs keyed by ToolCall.key."""
+
+    def __init__(
+        self,
+        ttl: float = RESULT_TTL_SECONDS,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, output: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tool_id: int) -> None:
+        """Drop every cached output of the tool."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == tool_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class ToolExecutor:
+    def __init__(
+        self,
+        registry: ToolRegistry,
+        cache: ToolResultCache | None = None,
+        parallelism: int = TOOL_PARALLELISM,
+    ):
+        self.registry = registry
+        self.cache = cache
+        self.parallelism = parallelism
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.parallelism, thread_name_prefix="tool"
+                )
+            return self._pool
+
+    def available(self, tool_ids, tool_names) -> list[tuple[int, str]]:
+        """The agent's tools that have an implementation."""
+        return [(i, n) for i, n in zip(tool_ids, tool_names) if n in self.registry]
+
+    def execute(self, step: int, calls: list[ToolCall]) -> list[ToolResult]:
+        """Run one step's calls concurrently; results come back in call order."""
+        if len(calls) <= 1 or self.parallelism <= 1:
+            return [self._call(step, c) for c in calls]
+        # Each call runs in a copy of the caller's context, so the request
+        # deadline (and query accounting) follow it into the pool.
+        futures = [
+            self._executor().submit(
+                contextvars.copy_context().run, self._call, step, call
+            )
+            for call in calls
+        ]
+        return [f.result() for f in futures]
+
+    def _call(self, step: int, call: ToolCall) -> ToolResult:
+        deadlines.check()
+        started = time.perf_counter()
+
+        if self.cache is not None:
+            output = self.cache.get(call.key)
+            if output is not None:
+                return ToolResult(call, step, output, False, True, 0)
+
+        fn = self.registry.get(call.name)
+        try:
+            if fn is None:
+                raise LookupError(f"Tool {call.name!r} is not available")
+            output, error = str(fn(**call.arguments)), False
+        except Exception as e:
+            output, error = f"{type(e).__name__}: {e}", True
+
+        if self.cache is not None and not error:
+            self.cache.put(call.key, output)
+        duration_ms = round((time.perf_counter() - started) * 1000)
+        return ToolResult(call, step, output, error, False, duration_ms)
+
+    def stats(self) -> dict:
+        return {
+            "parallelism": self.parallelism,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+# Local implementations: deterministic stand-ins for real integrations.
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("::".join(parts).encode("utf-8")).hexdigest()[:8]
+
+
+def search(query: str) -> str:
+    time.sleep(LOCAL_TOOL_LATENCY_SECONDS)
+    return "; ".join(f"result {i}: {_digest('search', query, str(i))}" for i in (1, 2))
+
+
+def summarizer(query: str) -> str:
+    time.sleep(LOCAL_TOOL_LATENCY_SECONDS)
+    words = query.split()
+    return " ".join(words[:12]) + (" ..." if len(words) > 12 else "")
+
+
+def word_count(query: str) -> str:
+    time.sleep(LOCAL_TOOL_LATENCY_SECONDS)
+    return str(len(query.split()))
+
+
+def register_local_tools(registry: ToolRegistry) -> None:
+    registry.register("search", search)
+    registry.register("summarizer", summarizer)
+    registry.register("word_count", word_count)
+
+
+registry = ToolRegistry()
+if LOCAL_TOOLS:
+    register_local_tools(registry)
+
+result_cache = ToolResultCache()
+executor = ToolExecutor(registry, result_cache)
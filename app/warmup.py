@@ -0,0 +1,127 @@
+"""
+Start-up warm-up so the first request on a replica is as fast as the rest.
+
+Configures mappers, executes every hot repository statement once inside a
+transaction that is rolled back (which fills the engine's compiled-SQL
+cache), opens a few pooled connections ahead of traffic and pushes one
+unauthenticated request through each hot route so FastAPI finishes its
+lazy per-route set-up before real traffic arrives.
+"""
+
+import logging
+import os
+import time
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, configure_mappers
+
+from app.db import interning
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.runs_repo import DEFAULT_LIST_FIELDS, RunsRepository
+from app.repositories.tools_repo import ToolsRepository
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("DB_WARMUP", "1") == "1"
+POOL_WARM_CONNECTIONS = 4
+
+_TENANT = "__warmup__"
+
+# Requests without an API key are rejected by get_tenant_id before any
+# service code runs, so these never touch tenant data.
+HOT_ROUTES = (
+    ("GET", "/agents"),
+    ("GET", "/agents/0"),
+    ("POST", "/agents/0/run"),
+    ("GET", "/agents/0/runs"),
+    ("GET", "/tools"),
+    ("GET", "/tools/0"),
+)
+
+
+def _compile_hot_statements(engine: Engine) -> None:
+    with engine.connect() as conn:
+        tx = conn.begin()
+        # Repository commits leave the outer transaction alone, and it is
+        # rolled back at the end. (Savepoints are not used: with pysqlite a
+        # SAVEPOINT outside an explicit BEGIN commits on release.)
+        db = Session(bind=conn, join_transaction_mode="rollback_only")
+        try:
+            tools = ToolsRepository(db)
+            agents = AgentsRepository(db)
+            runs = RunsRepository(db)
+
+            tools.get_many(_TENANT, [0])
+            tools.get(_TENANT, 0)
+            agent = agents.create(_TENANT, _TENANT, "warmup", "warmup", [])
+            agents.get(_TENANT, agent.id)
+            agents.load_snapshot(_TENANT, agent.id)
+            runs.create(_TENANT, agent.id, "warmup", "warmup", "warmup")
+            runs.list_fields(_TENANT, agent.id, 20, 0, DEFAULT_LIST_FIELDS)
+        finally:
+            db.close()
+            tx.rollback()
+            # The warm-up's dictionary rows were rolled back with it.
+            interning.forget(engine)
+
+
+def _warm_pool(engine: Engine) -> None:
+    size = getattr(engine.pool, "size", lambda: 1)()
+    conns = [engine.connect() for _ in range(min(size, POOL_WARM_CONNECTIONS))]
+    for conn in conns:
+        conn.close()
+
+
+def warm_up(engine: Engine, read_engine: Engine | None = None) -> None:
+    if not ENABLED:
+        return
+
+    started = time.perf_counter()
+    configure_mappers()
+
+    try:
+        _compile_hot_statements(engine)
+        _warm_pool(engine)
+        if read_engine is not None:
+            _warm_pool(read_engine)
+    except SQLAlchemyError:
+        # e.g. migrations not applied yet; the app still starts.
+        logger.warning("Database warm-up skipped", exc_info=True)
+        return
+
+    logger.info("Warm-up finished in %.1f ms", (time.perf_counter() - started) * 1000)
+
+
+async def _request(app, method: str, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"warmup"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("warmup", 80),
+    }
+
+    messages = iter([{"type": "http.request", "body": b"{}", "more_body": False}])
+
+    async def receive():
+        return next(messages, {"type": "http.disconnect"})
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def warm_routes(app) -> None:
+    if not ENABLED:
+        return
+    for method, path in HOT_ROUTES:
+        await _request(app, method, path)
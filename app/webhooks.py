@@ -0,0 +1,361 @@
+"""
+Completion webhooks.
+
+Finished runs ("run.finished", conversation turns excluded) and replay
+jobs ("replay.finished") are written to the webhook_deliveries outbox in
+the same transaction as the run or job, one row per webhook of the tenant
+(app.repositories.webhooks_repo.enqueue). The dispatcher thread started
+with the app sends them:
+
+- It is woken by the commit that queued a delivery and otherwise looks for
+  due retries every POLL_SECONDS, one tenant at a time, so one tenant's
+  backlog cannot hold up another's deliveries by more than one claim.
+- Due deliveries to the same webhook go out together, up to BATCH_SIZE
+  per request, from WORKERS threads sharing one pooled HTTP client.
+- Every request is signed: the X-Webhook-Signature header is
+  "t=<unix time>,v1=<hex HMAC-SHA256 of '<t>.<body>' with the secret>".
+- Webhooks only reach public addresses: the host is resolved when the
+  webhook is registered and again for every request, and the request goes
+  to the address that was checked, so a host cannot be re-pointed at an
+  internal service (loopback, private, link-local, ...) in between.
+- A batch that does not get a 2xx is retried after a random delay of up
+  to RETRY_BASE_SECONDS * 2**(attempt - 1), capped at RETRY_MAX_SECONDS
+  ("full jitter", so failed batches do not all come back at once), and
+  marked failed after MAX_ATTEMPTS.
+
+Delivery is at least once: a dispatcher that dies after sending but before
+recording the outcome sends the batch again when its claim lease runs out.
+Receivers should ignore delivery ids they have already seen.
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+
+import httpx
+
+from app import deps
+from app.core.errors import BadRequestError, OverloadedError
+from app.repositories.webhooks_repo import WebhooksRepository
+
+logger = logging.getLogger(__name__)
+
+# Requests in flight at once (and pooled connections kept open).
+WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+
+# Deliveries per request to one webhook.
+BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "50"))
+
+TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "5"))
+
+MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+RETRY_BASE_SECONDS = float(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", "2"))
+RETRY_MAX_SECONDS = float(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", "600"))
+
+# How often due retries are looked for when nothing new was queued.
+POLL_SECONDS = float(os.getenv("WEBHOOK_POLL_SECONDS", "1"))
+
+# Delivered and failed deliveries are kept this long for GET .../deliveries.
+RETENTION_DAYS = float(os.getenv("WEBHOOK_RETENTION_DAYS", "7"))
+
+# Deliveries claimed per tenant per pass, and how long a claim keeps other
+# dispatchers away; longer than sending them all can take.
+CLAIM_LIMIT = BATCH_SIZE * WORKERS
+LEASE_SECONDS = max(60.0, TIMEOUT_SECONDS * 4)
+
+PRUNE_INTERVAL_SECONDS = 3600
+
+# Also deliver to non-public addresses, e.g. a receiver on localhost during
+# development. Never in production: webhook URLs are chosen by tenants.
+ALLOW_PRIVATE = os.getenv("WEBHOOK_ALLOW_PRIVATE", "0") == "1"
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """The X-Webhook-Signature value for `body` sent at `timestamp`."""
+    mac = hmac.new(
+        secret.encode("utf-8"), f"{timestamp}.".encode("ascii") + body, hashlib.sha256
+    )
+    return f"t={timestamp},v1={mac.hexdigest()}"
+
+
+def verify(
+    secret: str,
+    header: str,
+    body: bytes,
+    tolerance_seconds: float = 300,
+    now: float | None = None,
+) -> bool:
+    """
+    Check a signature the way a receiver should: the HMAC must match and
+    the timestamp must be recent, so a captured request cannot be replayed
+    later.
+    """
+    try:
+        fields = dict(part.split("=", 1) for part in header.split(","))
+        timestamp = int(fields["t"])
+    except (KeyError, ValueError):
+        return False
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > tolerance_seconds:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), header)
+
+
+def resolve(url: httpx.URL) -> str:
+    """
+    The address to send to for the URL's host, once every address the host
+    resolves to has been checked to be public. Raises BadRequestError
+    otherwise.
+    """
+    host = url.raw_host.decode("ascii")
+    try:
+        infos = socket.getaddrinfo(host, url.port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise BadRequestError(f"Webhook host {host} cannot be resolved")
+    # Scoped IPv6 addresses come back as "fe80::1%eth0".
+    addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    if not ALLOW_PRIVATE:
+        for address in addresses:
+            if not address.is_global:
+                raise BadRequestError(
+                    f"Webhook host {host} resolves to non-public address {address}"
+                )
+    return str(addresses[0])
+
+
+def retry_delay(attempt: int, rng: random.Random) -> float:
+    """Seconds to wait after failed attempt number `attempt` (from 1)."""
+    cap = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return rng.uniform(0, cap)
+
+
+class WebhookDispatcher:
+    def __init__(
+        self,
+        tenants: Callable[[], Iterable[str]] = lambda: deps.API_KEYS.values(),
+        workers: int = WORKERS,
+        batch_size: int = BATCH_SIZE,
+        transport: httpx.BaseTransport | None = None,
+        seed: int | None = None,
+    ):
+        self.tenants = tenants
+        self.batch_size = batch_size
+        self._client = httpx.Client(
+            timeout=TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=workers, max_keepalive_connections=workers
+            ),
+            transport=transport,
+        )
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="webhook")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._notified: set[str] = set()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._requests = 0
+        self._delivered = 0
+        self._retried = 0
+        self._failed = 0
+
+    def notify(self, tenant_id: str) -> None:
+        """Deliveries were queued for the tenant; send them now."""
+        with self._lock:
+            self._notified.add(tenant_id)
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._loop, name="webhook-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after the current pass; undelivered rows stay queued."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        last_poll = last_prune = 0.0
+        while not self._stopping:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                tenants, self._notified = self._notified, set()
+            now = time.monotonic()
+            if now - last_poll >= POLL_SECONDS:
+                tenants.update(self.tenants())
+                last_poll = now
+            for tenant_id in tenants:
+                try:
+                    while self.dispatch(tenant_id) == CLAIM_LIMIT:
+                        pass
+                except Exception:
+                    logger.exception("Webhook dispatch failed for %s", tenant_id)
+            if now - last_prune >= PRUNE_INTERVAL_SECONDS:
+                last_prune = now
+                for tenant_id in self.tenants():
+                    try:
+                        self.prune(tenant_id)
+                    except Exception:
+                        logger.exception("Webhook prune failed for %s", tenant_id)
+
+    def dispatch(self, tenant_id: str) -> int:
+        """
+        One pass over the tenant's due deliveries: claim, send, record the
+        outcomes. Returns the number of deliveries attempted.
+        """
+        try:
+            db = deps.write_session(tenant_id)
+        except OverloadedError:
+            return 0  # being moved to another shard; next pass
+        with db:
+            repo = WebhooksRepository(db)
+            now = datetime.utcnow()
+            claimed = repo.claim(
+                tenant_id, now, now + timedelta(seconds=LEASE_SECONDS), CLAIM_LIMIT
+            )
+            if not claimed:
+                return 0
+
+            by_webhook = defaultdict(list)
+            for row in claimed:
+                by_webhook[row.webhook_id].append(row)
+            endpoints = repo.endpoints(tenant_id, list(by_webhook))
+            db.rollback()  # hold no connection while sending
+
+            batches = [
+                (endpoints[webhook_id], rows[i : i + self.batch_size])
+                for webhook_id, rows in by_webhook.items()
+                if webhook_id in endpoints
+                for i in range(0, len(rows), self.batch_size)
+            ]
+            errors = list(self._pool.map(lambda b: self._send(*b), batches))
+            repo.record(
+                [
+                    outcome
+                    for (_, rows), error in zip(batches, errors)
+                    for outcome in self._outcomes(rows, error)
+                ]
+            )
+        return len(claimed)
+
+    def _send(self, endpoint: tuple[str, str], rows: list) -> str | None:
+        """POST one batch; returns None on success, else what went wrong."""
+        url, secret = endpoint
+        body = json.dumps(
+            {
+                "deliveries": [
+                    {
+                        "id": row.id,
+                        "event": row.event,
+                        "attempt": row.attempts + 1,
+                        "created_at": row.created_at.isoformat(),
+                        "data": json.loads(row.payload),
+                    }
+                    for row in rows
+                ]
+            }
+        ).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            SIGNATURE_HEADER: sign(secret, int(time.time()), body),
+        }
+        url = httpx.URL(url)
+        try:
+            address = resolve(url)
+        except BadRequestError as e:
+            return str(e)
+        # Connect to the checked address; the Host header and TLS (SNI and
+        # certificate) still use the host name.
+        headers["Host"] = url.netloc.decode("ascii")
+        with self._lock:
+            self._requests += 1
+        try:
+            res = self._client.post(
+                url.copy_with(host=address),
+                content=body,
+                headers=headers,
+                extensions={"sni_hostname": url.raw_host.decode("ascii")},
+            )
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {e}"
+        if 200 <= res.status_code < 300:
+            return None
+        return f"HTTP {res.status_code}"
+
+    def _outcomes(self, rows: list, error: str | None) -> list[dict]:
+        now = datetime.utcnow()
+        # One delay for the whole batch, so it is retried together.
+        with self._lock:
+            retry_at = now + timedelta(
+                seconds=retry_delay(max(r.attempts for r in rows) + 1, self._rng)
+            )
+
+        outcomes = []
+        for row in rows:
+            if error is None:
+                outcome = {"outcome": "delivered", "retry_at": now, "delivered": now}
+            elif row.attempts + 1 >= MAX_ATTEMPTS:
+                outcome = {"outcome": "failed", "retry_at": now, "delivered": None}
+            else:
+                outcome = {
+                    "outcome": "pending",
+                    "retry_at": retry_at,
+                    "delivered": None,
+                }
+            outcomes.append({"delivery_id": row.id, "error": error, **outcome})
+
+        with self._lock:
+            for o in outcomes:
+                if o["outcome"] == "delivered":
+                    self._delivered += 1
+                elif o["outcome"] == "failed":
+                    self._failed += 1
+                else:
+                    self._retried += 1
+        return outcomes
+
+    def prune(self, tenant_id: str) -> None:
+        try:
+            db = deps.write_session(tenant_id)
+        except OverloadedError:
+            return
+        with db:
+            WebhooksRepository(db).prune(
+                tenant_id, datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "requests": self._requests,
+                "delivered": self._delivered,
+                "retried": self._retried,
+                "failed": self._failed,
+            }
+
+
+dispatcher = WebhookDispatcher()
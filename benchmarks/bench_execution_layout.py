@@ -0,0 +1,155 @@
+"""
+agent_executions before and after the compact layout migration.
+
+Builds a throwaway SQLite database at the revision before the migration,
+fills it with N runs (default 200k) over a few tenants and models, then
+measures table and index size (from dbstat) and GET /agents/{id}/runs
+query latency, applies the migration and measures again.
+
+    PYTHONPATH=. python -m benchmarks.bench_execution_layout --rows 200000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.shards import MIGRATIONS_DIR
+from app.repositories.runs_repo import _COUNT, _PAGE
+
+BEFORE = "952a4e973c9f"
+TENANTS = [f"tenant_{i:02d}" for i in range(20)]
+MODELS = ["gpt-4o", "gpt-4o-mini", "claude-3-5-sonnet"]
+PAGE_SIZE = 20
+
+_LEGACY_COUNT = text(
+    "SELECT count(*) FROM agent_executions"
+    " WHERE tenant_id = :tenant_id AND agent_id = :agent_id"
+)
+_LEGACY_PAGE = text(
+    "SELECT * FROM agent_executions"
+    " WHERE tenant_id = :tenant_id AND agent_id = :agent_id"
+    " ORDER BY created_at DESC LIMIT :limit OFFSET :offset"
+)
+
+
+def upgrade(engine: Engine, revision: str) -> float:
+    cfg = Config()
+    cfg.set_main_option("script_location", str(MIGRATIONS_DIR))
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        cfg.attributes["connection"] = conn
+        command.upgrade(cfg, revision)
+    return time.perf_counter() - started
+
+
+def populate(engine: Engine, rows: int, batch: int = 20_000) -> None:
+    rng = random.Random(42)
+    start = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO agents (tenant_id, name, role, description)"
+                " VALUES (:t, 'bench', 'r', 'd')"
+            ),
+            [{"t": t} for t in TENANTS],
+        )
+    for offset in range(0, rows, batch):
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO agent_executions"
+                    " (tenant_id, agent_id, model, prompt, response, created_at)"
+                    " VALUES (:tenant_id, :agent_id, :model, :prompt, 'ok', :created_at)"
+                ),
+                [
+                    {
+                        "tenant_id": TENANTS[i % len(TENANTS)],
+                        "agent_id": i % len(TENANTS) + 1,
+                        "model": rng.choice(MODELS),
+                        "prompt": f"Task: {i}",
+                        "created_at": str(start + timedelta(seconds=i)),
+                    }
+                    for i in range(offset, min(offset + batch, rows))
+                ],
+            )
+
+
+def sizes(conn: Connection, rows: int) -> tuple[float, int, int]:
+    """(payload bytes per row, table bytes, index bytes) of agent_executions."""
+    indexes = [
+        name
+        for (name,) in conn.execute(
+            text(
+                "SELECT name FROM sqlite_master"
+                " WHERE type = 'index' AND tbl_name = 'agent_executions'"
+            )
+        )
+    ]
+    stats = {
+        name: (pages, payload)
+        for name, pages, payload in conn.execute(
+            text("SELECT name, SUM(pgsize), SUM(payload) FROM dbstat GROUP BY name")
+        )
+    }
+    table_pages, payload = stats["agent_executions"]
+    return payload / rows, table_pages, sum(stats[i][0] for i in indexes)
+
+
+def list_latency(conn: Connection, count, page, repeats: int) -> tuple[float, float]:
+    samples = []
+    for r in range(repeats):
+        params = {
+            "tenant_id": TENANTS[r % len(TENANTS)],
+            "agent_id": r % len(TENANTS) + 1,
+        }
+        started = time.perf_counter()
+        conn.execute(count, params).scalar()
+        conn.execute(page, {**params, "limit": PAGE_SIZE, "offset": 0}).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def report(name: str, engine: Engine, rows: int, count, page, repeats: int) -> None:
+    with engine.connect() as conn:
+        per_row, table_bytes, index_bytes = sizes(conn, rows)
+        p50, p95 = list_latency(conn, count, page, repeats)
+    print(
+        f"{name:<8}{per_row:>10.1f}{table_bytes / 1e6:>11.1f}"
+        f"{index_bytes / 1e6:>11.1f}{p50:>10.2f}{p95:>10.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        upgrade(engine, BEFORE)
+        populate(engine, args.rows)
+
+        print(f"rows={args.rows}")
+        print(
+            f"{'layout':<8}{'row B':>10}{'table MB':>11}{'index MB':>11}"
+            f"{'p50 ms':>10}{'p95 ms':>10}"
+        )
+        report("before", engine, args.rows, _LEGACY_COUNT, _LEGACY_PAGE, args.repeats)
+        elapsed = upgrade(engine, "head")
+        report("after", engine, args.rows, _COUNT, _PAGE, args.repeats)
+        print(f"migration took {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
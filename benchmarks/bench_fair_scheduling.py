@@ -0,0 +1,85 @@
+"""
+Latency of a small tenant while another tenant floods LLM calls.
+
+A "big" tenant keeps many callers busy while a "small" tenant issues one
+call at a time. Each call sleeps for --call-ms to stand in for a provider
+call. Compares a plain capacity limit (FIFO semaphore) with FairScheduler
+and prints the small tenant's wait percentiles.
+
+    PYTHONPATH=. python -m benchmarks.bench_fair_scheduling
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from app.scheduler import FairScheduler
+
+
+class FifoLimit:
+    def __init__(self, capacity: int):
+        self._sem = threading.BoundedSemaphore(capacity)
+
+    def run(self, tenant_id, model, fn):
+        with self._sem:
+            return fn()
+
+
+def simulate(limiter, args) -> list[float]:
+    stop = threading.Event()
+    call = lambda: time.sleep(args.call_ms / 1000)  # noqa: E731
+    small_latencies = []
+
+    def big():
+        while not stop.is_set():
+            limiter.run("big", "gpt-4o", call)
+
+    def small():
+        while not stop.is_set():
+            started = time.perf_counter()
+            limiter.run("small", "gpt-4o", call)
+            small_latencies.append(time.perf_counter() - started)
+            time.sleep(args.call_ms / 1000)
+
+    threads = [threading.Thread(target=big) for _ in range(args.big_callers)]
+    threads.append(threading.Thread(target=small))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return small_latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    ms = sorted(x * 1000 for x in latencies)
+    p = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))]  # noqa: E731
+    print(
+        f"{name:<6} small tenant calls={len(ms):>4}"
+        f"  p50={statistics.median(ms):7.1f} ms"
+        f"  p99={p(0.99):7.1f} ms  max={ms[-1]:7.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--big-callers", type=int, default=64)
+    parser.add_argument("--call-ms", type=float, default=20)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    report("fifo", simulate(FifoLimit(args.capacity), args))
+    report(
+        "fair",
+        simulate(
+            FairScheduler(capacity=args.capacity, tenant_limit=args.capacity - 1),
+            args,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
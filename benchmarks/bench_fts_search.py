@@ -0,0 +1,125 @@
+"""
+Query latency of GET /runs/search at scale.
+
+Builds a throwaway SQLite database with N executions (default 1M) spread
+over a few tenants, then times RunsRepository.search for common, rare and
+multi-word queries, first page and a deep page via cursor.
+
+    PYTHONPATH=. python -m benchmarks.bench_fts_search --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.db.fts  # noqa: F401  (FTS table + triggers on create_all)
+from app.db import interning
+from app.db.database import Base
+from app.db.models import Agent, AgentExecution
+from app.repositories.runs_repo import RunsRepository
+from app.services.runs_service import _match_expression
+
+TENANTS = ["tenant_a", "tenant_b", "tenant_c", "tenant_d"]
+VOCAB = [f"w{i}" for i in range(5000)]
+COMMON = ["invoice", "summary", "report", "email", "meeting"]
+
+
+def _text(rng: random.Random) -> str:
+    words = rng.choices(VOCAB, k=20) + rng.choices(COMMON, k=2)
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def populate(engine, rows: int, batch: int = 20_000) -> float:
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Agent),
+            [
+                {"tenant_id": t, "name": "bench", "role": "r", "description": "d"}
+                for t in TENANTS
+            ],
+        )
+        tenant_refs = [interning.tenants.ensure(conn, t) for t in TENANTS]
+        model_ref = interning.models.ensure(conn, "gpt-4o")
+
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    for offset in range(0, rows, batch):
+        n = min(batch, rows - offset)
+        with engine.begin() as conn:
+            conn.execute(
+                insert(AgentExecution),
+                [
+                    {
+                        "tenant_ref": tenant_refs[(offset + i) % len(TENANTS)],
+                        "agent_id": (offset + i) % len(TENANTS) + 1,
+                        "model_ref": model_ref,
+                        "prompt": f"Task: {_text(rng)}",
+                        "response": _text(rng),
+                        "created_at": now,
+                    }
+                    for i in range(n)
+                ],
+            )
+    return time.perf_counter() - started
+
+
+def time_query(Session, q: str, pages: int, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        with Session() as db:
+            repo = RunsRepository(db)
+            after = None
+            started = time.perf_counter()
+            for _ in range(pages):
+                rows = repo.search("tenant_a", _match_expression(q), 21, after)
+                if len(rows) < 21:
+                    break
+                after = (rows[19][1], rows[19][0].id)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        elapsed = populate(engine, args.rows)
+        size_mb = os.path.getsize(path) / 1e6
+        print(
+            f"rows={args.rows} insert={elapsed:.1f}s"
+            f" ({args.rows / elapsed:,.0f} rows/s) db={size_mb:.0f}MB"
+        )
+        print(f"{'query':<24}{'pages':>6}{'p50 ms':>10}{'p95 ms':>10}")
+
+        cases = [
+            ("invoice", 1),
+            ("invoice", 10),
+            ("w17", 1),
+            ("invoice report", 1),
+            ("w17 w4242", 1),
+        ]
+        for q, pages in cases:
+            samples = sorted(time_query(Session, q, pages, args.repeats))
+            p95 = samples[int(len(samples) * 0.95) - 1]
+            print(f"{q:<24}{pages:>6}{statistics.median(samples):>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
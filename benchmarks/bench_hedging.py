@@ -0,0 +1,91 @@
+"""
+Tail latency of model calls with several backends, with and without
+adaptive routing and hedging.
+
+Each model call goes through a ModelRegistry of --backends mock providers.
+All share the --latency profile (a MOCK_LLM_LATENCY profile, see
+app.mock_provider), but one is --slow-factor times slower, standing in
+for a degraded region. --callers threads make calls back to back. Compares
+a single backend, routing without hedging, and routing with hedging, and
+prints latency percentiles and the share of extra provider calls.
+
+    PYTHONPATH=. python -m benchmarks.bench_hedging
+"""
+
+import argparse
+import threading
+import time
+
+from app.mock_provider import LatencyProfile, MockProvider
+from app.model_registry import Backend, ModelRegistry
+
+MODEL = "gpt-4o"
+
+
+def make_registry(args, backends: int, hedging: bool) -> ModelRegistry:
+    members = []
+    for i in range(backends):
+        low, alpha = args.latency.params
+        factor = args.slow_factor if i == 0 else 1
+        latency = LatencyProfile(args.latency.kind, (low * factor, alpha))
+        provider = MockProvider(latency={None: latency}, seed=args.seed + i)
+        members.append(Backend(f"{MODEL}-{i}", provider))
+    return ModelRegistry({MODEL: members}, hedging=hedging, seed=args.seed)
+
+
+def measure(registry: ModelRegistry, args) -> list[float]:
+    latencies = []
+    lock = threading.Lock()
+    call = lambda provider, cancel: provider.call(MODEL, cancel)  # noqa: E731
+
+    def caller():
+        for _ in range(args.calls // args.callers):
+            started = time.perf_counter()
+            registry.call(MODEL, call)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=caller) for _ in range(args.callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def report(name: str, registry: ModelRegistry, latencies: list[float]) -> None:
+    ms = sorted(x * 1000 for x in latencies)
+    p = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))]  # noqa: E731
+    provider_calls = sum(b.provider.stats()["calls"] for b in registry.backends(MODEL))
+    print(
+        f"{name:<16} calls={len(ms):>5}"
+        f" p50={p(0.50):7.1f}ms p95={p(0.95):7.1f}ms p99={p(0.99):7.1f}ms"
+        f" max={ms[-1]:7.1f}ms extra_calls={provider_calls / len(ms) - 1:6.1%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--latency", type=LatencyProfile.parse, default="lognormal:20:0.6"
+    )
+    parser.add_argument("--backends", type=int, default=3)
+    parser.add_argument("--slow-factor", type=float, default=4.0)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--callers", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.latency.kind == "fixed":
+        parser.error("--latency needs a two-parameter profile")
+
+    for name, backends, hedging in (
+        ("slow backend", 1, False),
+        ("routed", args.backends, False),
+        ("routed+hedged", args.backends, True),
+    ):
+        registry = make_registry(args, backends, hedging)
+        report(name, registry, measure(registry, args))
+
+
+if __name__ == "__main__":
+    main()
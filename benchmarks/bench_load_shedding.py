@@ -0,0 +1,148 @@
+"""
+Goodput of POST /agents/{id}/run under 2x overload, with and without
+load shedding.
+
+Runs the app in-process against a temporary database. The mock provider
+answers with --latency (a MOCK_LLM_LATENCY profile, see
+app.mock_provider) and fails --error-rate of the calls; the scheduler
+allows --capacity concurrent calls, so the service handles about
+capacity / mean latency requests per second. Requests arrive open-loop at --overload times that
+rate; a client gives up after --timeout-ms. Goodput counts responses that
+arrived in time; shed requests are answered immediately with 503.
+
+    PYTHONPATH=. python -m benchmarks.bench_load_shedding
+    PYTHONPATH=. python -m benchmarks.bench_load_shedding --latency long_tail:30:2
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+import httpx
+from anyio import to_thread
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.db.fts  # noqa: F401
+import app.db.models  # noqa: F401
+from app import admission, deps, model_registry, rate_limit, scheduler
+from app.admission import AdmissionController
+from app.db.database import Base, enable_sqlite_foreign_keys
+from app.main import app
+from app.mock_provider import LatencyProfile, MockProvider
+from app.model_registry import Backend, ModelRegistry
+from app.scheduler import FairScheduler
+
+HEADERS = {"X-API-Key": "key_tenant_a"}
+
+
+async def run_load(args, agent_id: int) -> dict:
+    rate = args.capacity / args.latency.mean * args.overload
+    counts = {"ok": 0, "late": 0, "shed": 0, "error": 0}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def one(i: int):
+            request = asyncio.ensure_future(
+                c.post(
+                    f"/agents/{agent_id}/run",
+                    json={"task": f"task {i}", "model": "gpt-4o"},
+                    headers=HEADERS,
+                )
+            )
+            # The client gives up, but (as with a real server) the request
+            # keeps running to completion.
+            done, _ = await asyncio.wait([request], timeout=args.timeout_ms / 1000)
+            res = await request
+            if not done:
+                counts["late"] += 1
+            elif res.status_code == 200:
+                counts["ok"] += 1
+            elif res.status_code == 503:
+                counts["shed"] += 1
+            else:
+                counts["error"] += 1
+
+        started = time.perf_counter()
+        tasks = []
+        for i in range(int(rate * args.seconds)):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i)))
+        await asyncio.gather(*tasks)
+
+    counts["offered_rps"] = round(rate)
+    counts["goodput_rps"] = round(counts["ok"] / args.seconds, 1)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--latency", type=LatencyProfile.parse, default="fixed:50")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--overload", type=float, default=2.0)
+    parser.add_argument("--timeout-ms", type=float, default=1000)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False}
+        )
+        event.listen(engine, "connect", enable_sqlite_foreign_keys)
+        Base.metadata.create_all(engine)
+        factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        deps.SessionLocal = deps.ReadSessionLocal = factory
+
+        rate_limit.MAX_REQUESTS = 10**9
+        scheduler.llm_scheduler = FairScheduler(
+            capacity=args.capacity, tenant_limit=args.capacity
+        )
+        provider = MockProvider(
+            latency={None: args.latency},
+            error_rate={None: args.error_rate},
+            seed=args.seed,
+        )
+        model_registry.registry = ModelRegistry(
+            {"gpt-4o": [Backend("gpt-4o-0", provider)]}
+        )
+
+        async def bench():
+            to_thread.current_default_thread_limiter().total_tokens = (
+                scheduler.THREADPOOL_SIZE
+            )
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://bench"
+            ) as c:
+                agent = (
+                    await c.post(
+                        "/agents",
+                        json={
+                            "name": "a",
+                            "role": "r",
+                            "description": "d",
+                            "tool_ids": [],
+                        },
+                        headers=HEADERS,
+                    )
+                ).json()
+
+            for shedding in (False, True):
+                admission.ENABLED = shedding
+                admission.runs = AdmissionController(
+                    "runs", max_in_flight=4 * args.capacity, latency_target=0.5
+                )
+                result = await run_load(args, agent["id"])
+                print(f"shedding={'on ' if shedding else 'off'} {result}")
+
+        asyncio.run(bench())
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
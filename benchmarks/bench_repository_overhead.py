@@ -0,0 +1,114 @@
+"""
+Per-call Python overhead of the repository hot paths.
+
+Compares the previous `db.query(...)` style, which rebuilds the filter
+expressions on every call, with the module-level `select()` statements the
+repositories now execute with bound parameters. Uses in-memory SQLite so
+the numbers are dominated by Python-side statement handling.
+
+    PYTHONPATH=. python -m benchmarks.bench_repository_overhead
+"""
+
+import argparse
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.db.fts  # noqa: F401
+from app.db import interning
+from app.db.database import Base
+from app.db.models import Agent, AgentExecution, Tool
+from app.repositories.agents_repo import AgentsRepository
+from app.repositories.runs_repo import RunsRepository
+from app.repositories.tools_repo import ToolsRepository
+
+TENANT = "tenant_a"
+
+
+def legacy_agent_get(db, agent_id):
+    return (
+        db.query(Agent).filter(Agent.tenant_id == TENANT, Agent.id == agent_id).first()
+    )
+
+
+def legacy_tools_get_many(db, tool_ids):
+    return db.query(Tool).filter(Tool.tenant_id == TENANT, Tool.id.in_(tool_ids)).all()
+
+
+def legacy_runs_list(db, agent_id):
+    q = (
+        db.query(AgentExecution)
+        .filter(
+            AgentExecution.tenant_ref == interning.tenants.ref_of(TENANT),
+            AgentExecution.agent_id == agent_id,
+        )
+        .order_by(AgentExecution.created_at.desc())
+    )
+    return q.count(), q.offset(0).limit(20).all()
+
+
+def populate(db: Session) -> tuple[int, list[int]]:
+    tools = [ToolsRepository(db).create(TENANT, f"tool{i}", "d") for i in range(10)]
+    agent = AgentsRepository(db).create(TENANT, "bench", "r", "d", tools)
+    runs = RunsRepository(db)
+    for i in range(200):
+        runs.create(TENANT, agent.id, "gpt-4o", f"prompt {i}", f"response {i}")
+    return agent.id, [t.id for t in tools[:5]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        agent_id, tool_ids = populate(db)
+        agents, tools, runs = (
+            AgentsRepository(db),
+            ToolsRepository(db),
+            RunsRepository(db),
+        )
+
+        cases = [
+            (
+                "AgentsRepository.get",
+                lambda: legacy_agent_get(db, agent_id),
+                lambda: agents.get(TENANT, agent_id),
+            ),
+            (
+                "ToolsRepository.get_many",
+                lambda: legacy_tools_get_many(db, tool_ids),
+                lambda: tools.get_many(TENANT, tool_ids),
+            ),
+            (
+                "RunsRepository.list",
+                lambda: legacy_runs_list(db, agent_id),
+                lambda: runs.list(TENANT, agent_id, limit=20, offset=0),
+            ),
+        ]
+
+        print(f"{'operation':<28}{'legacy us':>12}{'cached us':>12}{'change':>10}")
+        for name, legacy, cached in cases:
+            # warm both paths so compilation is not part of the measurement
+            legacy()
+            cached()
+            legacy_us = (
+                min(timeit.repeat(legacy, number=args.number, repeat=5))
+                / args.number
+                * 1e6
+            )
+            cached_us = (
+                min(timeit.repeat(cached, number=args.number, repeat=5))
+                / args.number
+                * 1e6
+            )
+            change = (cached_us - legacy_us) / legacy_us * 100
+            print(f"{name:<28}{legacy_us:>12.1f}{cached_us:>12.1f}{change:>9.0f}%")
+
+
+if __name__ == "__main__":
+    main()
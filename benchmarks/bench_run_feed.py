@@ -0,0 +1,197 @@
+"""
+Database load and delivery latency of polling vs the run change feed.
+
+--tabs clients watch one agent while a writer stores --rate runs per
+second, for --seconds. "poll" clients call GET /agents/{id}/runs?limit=20
+every --poll-ms, "long-poll" clients GET /agents/{id}/runs/changes and
+"sse" clients hold GET /agents/{id}/runs/stream open. Prints SELECTs per
+second issued for the watchers and how long after it was stored each run
+reached them.
+
+Serves the app with uvicorn in a background thread, against a temporary
+database.
+
+    PYTHONPATH=. python -m benchmarks.bench_run_feed
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+import uvicorn
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.db.fts  # noqa: F401
+import app.db.models  # noqa: F401
+from app import deps, rate_limit
+from app.db.database import Base, enable_sqlite_foreign_keys
+from app.main import app
+
+HEADERS = {"X-API-Key": "key_tenant_a"}
+
+# SELECTs of one POST /run (agent snapshot, dictionaries), not the watchers'.
+RUN_SELECTS = 3
+
+
+def _stored_at(item: dict) -> float:
+    created = datetime.fromisoformat(item["created_at"])
+    return created.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def watch_by_polling(c, agent_id, stop, since, latencies, args):
+    seen = set()
+    while not stop.is_set():
+        res = await c.get(f"/agents/{agent_id}/runs?limit=20", headers=HEADERS)
+        now = time.time()
+        for item in res.json()["items"]:
+            if item["id"] not in seen and item["id"] > since:
+                seen.add(item["id"])
+                latencies.append(now - _stored_at(item))
+        await asyncio.sleep(args.poll_ms / 1000)
+
+
+async def watch_feed(c, agent_id, stop, since, latencies, args):
+    after = since
+    while not stop.is_set():
+        res = await c.get(
+            f"/agents/{agent_id}/runs/changes",
+            params={"after": after, "wait": 25},
+            headers=HEADERS,
+        )
+        now = time.time()
+        body = res.json()
+        latencies.extend(now - _stored_at(item) for item in body["items"])
+        after = body["last_id"]
+
+
+async def watch_stream(c, agent_id, stop, since, latencies, args):
+    async with c.stream(
+        "GET",
+        f"/agents/{agent_id}/runs/stream",
+        params={"after": since},
+        headers=HEADERS,
+    ) as res:
+        async for line in res.aiter_lines():
+            if line.startswith("data: "):
+                latencies.append(time.time() - _stored_at(json.loads(line[6:])))
+            if stop.is_set():
+                return
+
+
+WATCHERS = {"poll": watch_by_polling, "long-poll": watch_feed, "sse": watch_stream}
+
+
+async def scenario(mode, c, agent_id, selects, args) -> str:
+    since = (
+        await c.get(
+            f"/agents/{agent_id}/runs/changes",
+            params={"after": 0, "wait": 0},
+            headers=HEADERS,
+        )
+    ).json()["last_id"]
+    stop = asyncio.Event()
+    latencies: list[float] = []
+    watch = WATCHERS[mode]
+    watchers = [
+        asyncio.create_task(watch(c, agent_id, stop, since, latencies, args))
+        for _ in range(args.tabs)
+    ]
+
+    await asyncio.sleep(0.5)
+    runs = int(args.rate * args.seconds)
+    selects[0] = 0
+    started = time.perf_counter()
+    for i in range(runs):
+        await asyncio.sleep(max(0.0, started + i / args.rate - time.perf_counter()))
+        res = await c.post(
+            f"/agents/{agent_id}/run",
+            json={"task": f"{mode} {i}", "model": "gpt-4o"},
+            headers=HEADERS,
+        )
+        assert res.status_code == 200
+    await asyncio.sleep(args.poll_ms / 1000)
+    elapsed = time.perf_counter() - started
+    watcher_selects = selects[0] - runs * RUN_SELECTS
+
+    stop.set()
+    for watcher in watchers:
+        watcher.cancel()
+    await asyncio.gather(*watchers, return_exceptions=True)
+    ms = sorted(max(0.0, x) * 1000 for x in latencies) or [0.0]
+    p = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))]  # noqa: E731
+    return (
+        f"{mode:<9} tabs={args.tabs} delivered={len(latencies)}/{runs * args.tabs}"
+        f" selects/s={watcher_selects / elapsed:7.1f}"
+        f" delivery p50={p(0.5):6.1f}ms p95={p(0.95):6.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tabs", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=0.5)
+    parser.add_argument("--poll-ms", type=float, default=1000)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False}
+        )
+        event.listen(engine, "connect", enable_sqlite_foreign_keys)
+        Base.metadata.create_all(engine)
+        deps.SessionLocal = deps.ReadSessionLocal = sessionmaker(
+            bind=engine, autocommit=False, autoflush=False
+        )
+        rate_limit.MAX_REQUESTS = 10**9
+
+        selects = [0]
+
+        def count(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects[0] += 1
+
+        event.listen(engine, "before_cursor_execute", count)
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(
+            uvicorn.Config(app, port=port, log_level="warning", lifespan="off")
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        async def bench():
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}",
+                timeout=30,
+                limits=httpx.Limits(max_connections=None),
+            ) as c:
+                agent_id = (
+                    await c.post(
+                        "/agents",
+                        json={"name": "a", "role": "r", "description": "d"},
+                        headers=HEADERS,
+                    )
+                ).json()["id"]
+                for mode in WATCHERS:
+                    print(await scenario(mode, c, agent_id, selects, args))
+
+        asyncio.run(bench())
+        server.should_exit = True
+        thread.join()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
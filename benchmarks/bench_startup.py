@@ -0,0 +1,141 @@
+"""
+Cold-start profile of the API.
+
+1. `python -X importtime -c "import app.main"`: total import time and the
+   slowest modules by self time.
+2. Spawns uvicorn against a fresh database and reports the time from
+   process start to the first healthy /health response, plus the latency
+   of the first request to hot endpoints compared to the median of the
+   following ones, with and without the start-up warm-up.
+
+    PYTHONPATH=. python -m benchmarks.bench_startup
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+import app.db.fts  # noqa: F401
+import app.db.models  # noqa: F401
+from app.db.database import Base
+
+HEADERS = {"X-API-Key": "key_tenant_a"}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(top: int) -> None:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    ).stderr
+
+    rows = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+
+    total = next(c for _, c, n in rows if n == "app.main")
+    own = sum(s for s, _, n in rows if n.startswith("app."))
+    print(f"import app.main: {total / 1000:.1f} ms total, {own / 1000:.1f} ms in app.*")
+    print(f"  {'self ms':>8} {'cum ms':>8}  module")
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {self_us / 1000:>8.1f} {cumulative_us / 1000:>8.1f}  {name}")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_profile(warmup: bool, requests: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        Base.metadata.create_all(create_engine(url))
+
+        port = _free_port()
+        env = {
+            **os.environ,
+            "DATABASE_URL": url,
+            "DB_WARMUP": "1" if warmup else "0",
+            "PYTHONPATH": ROOT,
+        }
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            env=env,
+            cwd=tmp,
+        )
+        try:
+            base = f"http://127.0.0.1:{port}"
+            with httpx.Client(base_url=base) as client:
+                while True:
+                    try:
+                        if client.get("/health").status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        time.sleep(0.005)
+                healthy = time.perf_counter() - started
+
+                results = {}
+                for name, call in (
+                    ("GET /tools", lambda: client.get("/tools", headers=HEADERS)),
+                    (
+                        "GET /agents/1/runs",
+                        lambda: client.get("/agents/1/runs", headers=HEADERS),
+                    ),
+                ):
+                    samples = []
+                    for _ in range(requests):
+                        t = time.perf_counter()
+                        call()
+                        samples.append((time.perf_counter() - t) * 1000)
+                    results[name] = (samples[0], statistics.median(samples[1:]))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    label = "warm-up on " if warmup else "warm-up off"
+    print(f"{label}: first healthy response after {healthy * 1000:.0f} ms")
+    for name, (first, median) in results.items():
+        print(
+            f"  {name:<22} first {first:6.2f} ms"
+            f"   median of next {requests - 1}: {median:5.2f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    import_profile(args.top)
+    for warmup in (False, True):
+        serve_profile(warmup, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Serial versus parallel tool execution, with and without result caching.
+
+Every run makes one step of --tools calls to local tools that sleep for
+--tool-ms to stand in for network I/O. Prints the per-run latency for
+serial execution, parallel execution, and parallel execution with the
+result cache warm (every run repeats the same arguments).
+
+    PYTHONPATH=. python -m benchmarks.bench_tool_execution
+"""
+
+import argparse
+import statistics
+import time
+
+from app import tools
+from app.tools import ToolCall, ToolExecutor, ToolRegistry, ToolResultCache
+
+
+def simulate(executor: ToolExecutor, args) -> list[float]:
+    names = ["search", "summarizer", "word_count"]
+    calls = [
+        ToolCall(i, names[i % len(names)], {"query": f"query {i}"})
+        for i in range(args.tools)
+    ]
+    latencies = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        executor.execute(0, calls)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    ms = sorted(x * 1000 for x in latencies)
+    print(
+        f"{name:<15} runs={len(ms):>4}"
+        f"  p50={statistics.median(ms):7.1f} ms  max={ms[-1]:7.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tools", type=int, default=6)
+    parser.add_argument("--tool-ms", type=float, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--parallelism", type=int, default=8)
+    args = parser.parse_args()
+
+    tools.LOCAL_TOOL_LATENCY_SECONDS = args.tool_ms / 1000
+    registry = ToolRegistry()
+    tools.register_local_tools(registry)
+
+    report("serial", simulate(ToolExecutor(registry, parallelism=1), args))
+    report(
+        "parallel",
+        simulate(ToolExecutor(registry, parallelism=args.parallelism), args),
+    )
+    report(
+        "parallel+cache",
+        simulate(ToolExecutor(registry, ToolResultCache(), args.parallelism), args),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""compact agent executions
+
+Intern tenant ids and model names into dictionary tables and store
+created_at as integer epoch microseconds.
+
+Revision ID: 5b0e93c1d7a4
+Revises: 952a4e973c9f
+Create Date: 2026-10-19 14:12:07.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e93c1d7a4'
+down_revision: Union[str, Sequence[str], None] = '952a4e973c9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_SHARED_COLUMNS = (
+    "id, agent_id, prompt, response, created_at, status, prompt_tokens, "
+    "response_tokens, conversation_id, turn"
+)
+
+# The stored DateTime text is 'YYYY-MM-DD HH:MM:SS.ffffff' (UTC).
+_TO_MICROS = (
+    "CAST(strftime('%s', substr(e.created_at, 1, 19)) AS INTEGER) * 1000000"
+    " + CAST(substr(e.created_at, 21, 6) AS INTEGER)"
+)
+_FROM_MICROS = (
+    "strftime('%Y-%m-%d %H:%M:%S', e.created_at / 1000000, 'unixepoch')"
+    " || printf('.%06d', e.created_at % 1000000)"
+)
+
+
+# As 952a4e973c9f added it: an inline REFERENCES, which (unlike a table-level
+# FOREIGN KEY) lets that revision's downgrade drop the column again.
+_ADD_CONVERSATION_ID = (
+    'ALTER TABLE agent_executions ADD COLUMN conversation_id INTEGER '
+    'REFERENCES conversations (id)'
+)
+
+
+def _rebuild(columns, copy_sql: str, add_columns: Sequence[str] = ()) -> None:
+    """
+    Replace agent_executions with a new table of `columns` plus the ADD
+    COLUMN statements `add_columns`, filled by `copy_sql` from
+    agent_executions_old.
+
+    legacy_alter_table keeps the rename from rewriting the REFERENCES of
+    execution_steps, so they point at the new table once it exists. That
+    only holds with foreign keys off, which also keeps dropping the old
+    table from cascading into execution_steps.
+    """
+    conn = op.get_bind()
+    if conn.exec_driver_sql('PRAGMA foreign_keys').scalar():
+        raise RuntimeError('run this migration with PRAGMA foreign_keys=OFF')
+    triggers = [
+        sql for (sql,) in conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master "
+            "WHERE type = 'trigger' AND tbl_name = 'agent_executions'"
+        )
+    ]
+    # Index names stay with the renamed table; free them for the new one.
+    for kind, name in conn.exec_driver_sql(
+        "SELECT type, name FROM sqlite_master "
+        "WHERE type IN ('trigger', 'index') AND tbl_name = 'agent_executions' "
+        "AND sql IS NOT NULL"
+    ).all():
+        op.execute(f'DROP {kind.upper()} {name}')
+
+    op.execute('PRAGMA legacy_alter_table = ON')
+    op.execute('ALTER TABLE agent_executions RENAME TO agent_executions_old')
+    op.execute('PRAGMA legacy_alter_table = OFF')
+
+    op.create_table('agent_executions', *columns)
+    for sql in add_columns:
+        op.execute(sql)
+    op.execute(copy_sql)
+    op.execute('DROP TABLE agent_executions_old')
+
+    for sql in triggers:
+        op.execute(sql)
+
+
+def _common_columns(conversation_fk: bool = True):
+    """
+    Columns kept in both directions. Without conversation_fk,
+    conversation_id is left out, to be added by _ADD_CONVERSATION_ID.
+    """
+    return (
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('agent_id', sa.Integer(), nullable=False),
+        sa.Column('prompt', sa.Text(), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        *(
+            (sa.Column('conversation_id', sa.Integer(), nullable=True),)
+            if conversation_fk else ()
+        ),
+        sa.Column('turn', sa.Integer(), nullable=True),
+        sa.Column('prompt_tokens', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('response_tokens', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('status', sa.String(length=16), server_default='completed', nullable=False),
+        sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ondelete='CASCADE'),
+        *(
+            (sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id']),)
+            if conversation_fk else ()
+        ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tenant_names',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('model_names',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.execute(
+        'INSERT INTO tenant_names (name) '
+        'SELECT DISTINCT tenant_id FROM agent_executions ORDER BY tenant_id'
+    )
+    op.execute(
+        'INSERT INTO model_names (name) '
+        'SELECT DISTINCT model FROM agent_executions ORDER BY model'
+    )
+
+    _rebuild(
+        (
+            *_common_columns(),
+            sa.Column('tenant_ref', sa.Integer(), nullable=False),
+            sa.Column('model_ref', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['tenant_ref'], ['tenant_names.id']),
+            sa.ForeignKeyConstraint(['model_ref'], ['model_names.id']),
+        ),
+        f'INSERT INTO agent_executions ({_SHARED_COLUMNS}, tenant_ref, model_ref) '
+        f'SELECT e.id, e.agent_id, e.prompt, e.response, {_TO_MICROS}, e.status, '
+        'e.prompt_tokens, e.response_tokens, e.conversation_id, e.turn, t.id, m.id '
+        'FROM agent_executions_old e '
+        'JOIN tenant_names t ON t.name = e.tenant_id '
+        'JOIN model_names m ON m.name = e.model',
+    )
+    op.create_index(op.f('ix_agent_executions_agent_id'), 'agent_executions', ['agent_id'], unique=False)
+    op.create_index(op.f('ix_agent_executions_tenant_ref'), 'agent_executions', ['tenant_ref'], unique=False)
+    op.create_index('ix_agent_executions_conversation_turn', 'agent_executions', ['conversation_id', 'turn'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild(
+        (
+            *_common_columns(conversation_fk=False),
+            sa.Column('tenant_id', sa.String(length=64), nullable=False),
+            sa.Column('model', sa.String(length=50), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        ),
+        f'INSERT INTO agent_executions ({_SHARED_COLUMNS}, tenant_id, model) '
+        f'SELECT e.id, e.agent_id, e.prompt, e.response, {_FROM_MICROS}, e.status, '
+        'e.prompt_tokens, e.response_tokens, e.conversation_id, e.turn, t.name, m.name '
+        'FROM agent_executions_old e '
+        'JOIN tenant_names t ON t.id = e.tenant_ref '
+        'JOIN model_names m ON m.id = e.model_ref',
+        add_columns=(_ADD_CONVERSATION_ID,),
+    )
+    op.create_index(op.f('ix_agent_executions_agent_id'), 'agent_executions', ['agent_id'], unique=False)
+    op.create_index(op.f('ix_agent_executions_tenant_id'), 'agent_executions', ['tenant_id'], unique=False)
+    op.create_index('ix_agent_executions_conversation_turn', 'agent_executions', ['conversation_id', 'turn'], unique=True)
+    op.drop_table('model_names')
+    op.drop_table('tenant_names')
@@ -0,0 +1,95 @@
+"""create agent executions fts
+
+Revision ID: d7a19c3e5b42
+Revises: c41d8e2b7f90
+Create Date: 2026-10-19 11:40:02.618350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a19c3e5b42'
+down_revision: Union[str, Sequence[str], None] = 'c41d8e2b7f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Only rows already in the index may be removed from it (see app/db/fts.py).
+INDEXED = """
+    old.id > (SELECT watermark FROM search_index_backfill WHERE id = 1)
+    OR old.id <= (SELECT position FROM search_index_backfill WHERE id = 1)
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Only creates the (empty) index and its triggers, which is instant, so
+    writers are not blocked. Rows up to the recorded watermark are indexed
+    afterwards in short batches by scripts/backfill_search_index.py; newer
+    rows are indexed by the insert trigger created in the same transaction.
+    """
+    op.execute(
+        """
+        CREATE TABLE search_index_backfill (
+            id INTEGER NOT NULL PRIMARY KEY,
+            watermark INTEGER NOT NULL,
+            position INTEGER NOT NULL
+        )
+        """
+    )
+    op.execute(
+        "INSERT INTO search_index_backfill (id, watermark, position) "
+        "SELECT 1, COALESCE(MAX(id), 0), 0 FROM agent_executions"
+    )
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE agent_executions_fts USING fts5(
+            prompt, response,
+            content='agent_executions', content_rowid='id'
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER agent_executions_fts_ai AFTER INSERT ON agent_executions BEGIN
+            INSERT INTO agent_executions_fts(rowid, prompt, response)
+            VALUES (new.id, new.prompt, new.response);
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER agent_executions_fts_ad AFTER DELETE ON agent_executions
+        WHEN {INDEXED}
+        BEGIN
+            INSERT INTO agent_executions_fts(agent_executions_fts, rowid, prompt, response)
+            VALUES ('delete', old.id, old.prompt, old.response);
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER agent_executions_fts_au
+        AFTER UPDATE OF prompt, response ON agent_executions
+        WHEN {INDEXED}
+        BEGIN
+            INSERT INTO agent_executions_fts(agent_executions_fts, rowid, prompt, response)
+            VALUES ('delete', old.id, old.prompt, old.response);
+            INSERT INTO agent_executions_fts(rowid, prompt, response)
+            VALUES (new.id, new.prompt, new.response);
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER agent_executions_fts_au")
+    op.execute("DROP TRIGGER agent_executions_fts_ad")
+    op.execute("DROP TRIGGER agent_executions_fts_ai")
+    op.execute("DROP TABLE agent_executions_fts")
+    op.execute("DROP TABLE search_index_backfill")
@@ -0,0 +1,99 @@
+"""
+Aggregate agent_executions rows that predate the run_rollups write path.
+
+Each batch of ids is grouped and added to the rollups in one short
+transaction, and progress is stored in run_rollups_backfill, so the
+command can be interrupted and re-run safely.
+
+    PYTHONPATH=. python -m scripts.backfill_rollups --batch-size 50000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.db.database import engine as default_engine
+
+# Must match how SQLAlchemy stores DateTime values in SQLite so that
+# backfilled and live rows land in the same bucket. (agent_executions
+# stores created_at as epoch microseconds, run_rollups as DateTime text.)
+_BUCKET_FORMATS = {
+    "minute": "%Y-%m-%d %H:%M:00.000000",
+    "hour": "%Y-%m-%d %H:00:00.000000",
+    "day": "%Y-%m-%d 00:00:00.000000",
+}
+
+_STATE = text("SELECT watermark, position FROM run_rollups_backfill WHERE id = 1")
+_ADVANCE = text("UPDATE run_rollups_backfill SET position = :hi WHERE id = 1")
+_AGGREGATE = text("""
+    INSERT INTO run_rollups (
+        tenant_id, granularity, bucket_start, agent_id, model,
+        run_count, response_bytes_total, response_bytes_min, response_bytes_max,
+        prompt_tokens_total, response_tokens_total
+    )
+    SELECT
+        t.name, :granularity, strftime(:fmt, e.created_at / 1000000, 'unixepoch'),
+        e.agent_id, m.name,
+        COUNT(*),
+        SUM(length(CAST(e.response AS BLOB))),
+        MIN(length(CAST(e.response AS BLOB))),
+        MAX(length(CAST(e.response AS BLOB))),
+        SUM(e.prompt_tokens),
+        SUM(e.response_tokens)
+    FROM agent_executions e
+    JOIN tenant_names t ON t.id = e.tenant_ref
+    JOIN model_names m ON m.id = e.model_ref
+    WHERE e.id > :lo AND e.id <= :hi
+    GROUP BY e.tenant_ref, 3, e.agent_id, e.model_ref
+    ON CONFLICT (tenant_id, granularity, bucket_start, agent_id, model) DO UPDATE SET
+        run_count = run_count + excluded.run_count,
+        response_bytes_total = response_bytes_total + excluded.response_bytes_total,
+        response_bytes_min = min(response_bytes_min, excluded.response_bytes_min),
+        response_bytes_max = max(response_bytes_max, excluded.response_bytes_max),
+        prompt_tokens_total = prompt_tokens_total + excluded.prompt_tokens_total,
+        response_tokens_total = response_tokens_total + excluded.response_tokens_total
+    """)
+
+
+def backfill(engine: Engine, batch_size: int = 50_000, pause: float = 0.01) -> int:
+    """Aggregate pending rows; returns the number of ids covered."""
+    covered = 0
+
+    while True:
+        with engine.begin() as conn:
+            state = conn.execute(_STATE).first()
+            if state is None or state.position >= state.watermark:
+                return covered
+
+            hi = min(state.position + batch_size, state.watermark)
+            for granularity, fmt in _BUCKET_FORMATS.items():
+                conn.execute(
+                    _AGGREGATE,
+                    {
+                        "granularity": granularity,
+                        "fmt": fmt,
+                        "lo": state.position,
+                        "hi": hi,
+                    },
+                )
+            conn.execute(_ADVANCE, {"hi": hi})
+            covered += hi - state.position
+
+        time.sleep(pause)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--pause", type=float, default=0.01)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    covered = backfill(default_engine, args.batch_size, args.pause)
+    print(f"aggregated ids up to +{covered} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Index agent_executions rows that predate the FTS5 search index.
+
+Runs in short transactions (one batch each) so API writers are never held
+up for long, and is resumable: progress is stored in search_index_backfill.
+
+    PYTHONPATH=. python -m scripts.backfill_search_index --batch-size 5000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.db.database import engine as default_engine
+
+_STATE = text("SELECT watermark, position FROM search_index_backfill WHERE id = 1")
+_INDEX_BATCH = text(
+    "INSERT INTO agent_executions_fts(rowid, prompt, response) "
+    "SELECT id, prompt, response FROM agent_executions "
+    "WHERE id > :lo AND id <= :hi"
+)
+_ADVANCE = text("UPDATE search_index_backfill SET position = :hi WHERE id = 1")
+
+
+def backfill(engine: Engine, batch_size: int = 5000, pause: float = 0.01) -> int:
+    """Index pending rows; returns the number of rows indexed."""
+    indexed = 0
+
+    while True:
+        with engine.begin() as conn:
+            state = conn.execute(_STATE).first()
+            if state is None or state.position >= state.watermark:
+                return indexed
+
+            hi = min(state.position + batch_size, state.watermark)
+            indexed += conn.execute(
+                _INDEX_BATCH, {"lo": state.position, "hi": hi}
+            ).rowcount
+            conn.execute(_ADVANCE, {"hi": hi})
+
+        # Give queued writers a chance to take the lock between batches.
+        time.sleep(pause)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--pause", type=float, default=0.01)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    indexed = backfill(default_engine, args.batch_size, args.pause)
+    print(f"indexed {indexed} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Fill agent_executions.task for runs stored before the column existed.
+
+The task is recovered from the stored prompt (app.prompts.task_from_prompt).
+Runs whose prompt does not have the expected shape keep a NULL task and are
+skipped by replays. Works through id ranges in short transactions and only
+touches rows whose task is still NULL, so it can be interrupted and re-run.
+
+    PYTHONPATH=. python -m scripts.backfill_tasks --batch-size 5000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.db.database import engine as default_engine
+from app.prompts import task_from_prompt
+
+_MAX_ID = text("SELECT COALESCE(MAX(id), 0) FROM agent_executions")
+_PENDING = text(
+    "SELECT id, prompt FROM agent_executions "
+    "WHERE id > :lo AND id <= :hi AND task IS NULL AND conversation_id IS NULL"
+)
+_SET_TASK = text("UPDATE agent_executions SET task = :task WHERE id = :id")
+
+
+def backfill(engine: Engine, batch_size: int = 5000, pause: float = 0.01) -> int:
+    """Fill pending rows; returns the number of tasks recovered."""
+    recovered = 0
+    with engine.connect() as conn:
+        watermark = conn.execute(_MAX_ID).scalar()
+
+    for lo in range(0, watermark, batch_size):
+        with engine.begin() as conn:
+            rows = conn.execute(_PENDING, {"lo": lo, "hi": lo + batch_size})
+            updates = [
+                {"id": row.id, "task": task}
+                for row in rows
+                if (task := task_from_prompt(row.prompt)) is not None
+            ]
+            if updates:
+                conn.execute(_SET_TASK, updates)
+            recovered += len(updates)
+
+        # Give queued writers a chance to take the lock between batches.
+        time.sleep(pause)
+    return recovered
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--pause", type=float, default=0.01)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    recovered = backfill(default_engine, args.batch_size, args.pause)
+    print(f"recovered {recovered} tasks in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
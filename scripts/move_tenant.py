@@ -0,0 +1,270 @@
+"""
+Move a tenant to another shard while it keeps serving traffic.
+
+    python -m scripts.move_tenant tenant_a sqlite:///./shards/tenant_a-2.db
+
+(with TENANT_SHARDING=1, like the API workers.)
+
+1. Copy the tenant's rows to the target in short batches; the tenant keeps
+   reading and writing on its current shard.
+2. Freeze the tenant in the shard directory and wait until every worker
+   has seen it; writes get 503 with Retry-After meanwhile.
+3. Copy what changed during step 1 and point the directory at the target.
+
+Ids are kept, so the target must not already hold rows with the same ids
+(use a new database, or one dedicated to this tenant).
+"""
+
+import argparse
+import time
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.engine import Connection
+
+from app.db import interning, shards
+from app.db.models import (
+    Agent,
+    AgentExecution,
+    AgentSchedule,
+    CacheVersion,
+    Conversation,
+    ExecutionStep,
+    ReplayJob,
+    ReplayResult,
+    RunRollup,
+    TenantUsage,
+    Tool,
+    Webhook,
+    WebhookDelivery,
+    agent_tools,
+)
+
+_tools = Tool.__table__
+_agents = Agent.__table__
+_executions = AgentExecution.__table__
+_steps = ExecutionStep.__table__
+
+# Small tables, compared row by row; parents first.
+_SYNCED = (
+    _tools,
+    _agents,
+    agent_tools,
+    Conversation.__table__,
+    RunRollup.__table__,
+    CacheVersion.__table__,
+    ReplayJob.__table__,
+    ReplayResult.__table__,
+    Webhook.__table__,
+    WebhookDelivery.__table__,
+    TenantUsage.__table__,
+    AgentSchedule.__table__,
+)
+
+# Write sessions re-check the directory right before committing and refuse
+# once the tenant is frozen; this only has to cover commits that passed
+# that check just before the freeze, including SQLite's 5 s busy timeout.
+DRAIN_SECONDS = 6.0
+
+
+def _where_tenant(table, tenant_id: str):
+    if table is agent_tools:
+        agent_ids = select(_agents.c.id).where(_agents.c.tenant_id == tenant_id)
+        return agent_tools.c.agent_id.in_(agent_ids)
+    return table.c.tenant_id == tenant_id
+
+
+def _rows_by_key(conn: Connection, table, tenant_id: str) -> dict[tuple, dict]:
+    pk = [c.name for c in table.primary_key]
+    rows = conn.execute(select(table).where(_where_tenant(table, tenant_id)))
+    return {tuple(row[c] for c in pk): dict(row) for row in rows.mappings()}
+
+
+def _match(table, key: tuple):
+    return [c == v for c, v in zip(table.primary_key, key)]
+
+
+def _sync_small_tables(src: Connection, dst: Connection, tenant_id: str) -> None:
+    """Make the tenant's rows in the small tables on dst equal to src."""
+    snapshot = [
+        (
+            table,
+            _rows_by_key(src, table, tenant_id),
+            _rows_by_key(dst, table, tenant_id),
+        )
+        for table in _SYNCED
+    ]
+
+    # Deletes first (children first): deleting an agent cascades to its
+    # runs on the target exactly as it did on the source.
+    for table, source, target in reversed(snapshot):
+        for key in target.keys() - source.keys():
+            dst.execute(delete(table).where(*_match(table, key)))
+
+    for table, source, target in snapshot:
+        for key, row in source.items():
+            if key not in target:
+                dst.execute(insert(table).values(**row))
+            elif target[key] != row:
+                dst.execute(update(table).where(*_match(table, key)).values(**row))
+
+
+def _dictionary_refs(
+    src: Connection, dst: Connection, dictionary: interning.Dictionary, refs: set
+) -> dict[int, int]:
+    """Map the source shard's dictionary ids to the target's."""
+    names = src.execute(
+        select(dictionary.model.id, dictionary.model.name).where(
+            dictionary.model.id.in_(refs)
+        )
+    )
+    return {ref: dictionary.ensure(dst, name) for ref, name in names}
+
+
+def _copy_runs(src: Connection, dst: Connection, ids: list[int]) -> None:
+    """Copy runs by id together with their tool-call steps."""
+    runs = [
+        dict(r)
+        for r in src.execute(select(_executions).where(_executions.c.id.in_(ids)))
+        .mappings()
+        .all()
+    ]
+    if not runs:
+        return
+    # Tenant and model ids are per shard.
+    tenant_refs = _dictionary_refs(
+        src, dst, interning.tenants, {r["tenant_ref"] for r in runs}
+    )
+    model_refs = _dictionary_refs(
+        src, dst, interning.models, {r["model_ref"] for r in runs}
+    )
+    for r in runs:
+        r["tenant_ref"] = tenant_refs[r["tenant_ref"]]
+        r["model_ref"] = model_refs[r["model_ref"]]
+    dst.execute(insert(_executions), runs)
+
+    steps = src.execute(select(_steps).where(_steps.c.execution_id.in_(ids)))
+    rows = [dict(r) for r in steps.mappings()]
+    if rows:
+        dst.execute(insert(_steps), rows)
+
+
+def _copy_executions(
+    src_engine, dst_engine, ids: list[int], batch_size: int, pause: float
+) -> None:
+    for i in range(0, len(ids), batch_size):
+        with src_engine.connect() as src, dst_engine.begin() as dst:
+            _copy_runs(src, dst, ids[i : i + batch_size])
+        time.sleep(pause)
+
+
+def _execution_ids(
+    conn: Connection, tenant_id: str, upto: int | None = None
+) -> list[int]:
+    stmt = select(_executions.c.id).where(
+        _executions.c.tenant_ref == interning.tenants.ref_of(tenant_id)
+    )
+    if upto is not None:
+        stmt = stmt.where(_executions.c.id <= upto)
+    return list(conn.execute(stmt.order_by(_executions.c.id)).scalars())
+
+
+def move_tenant(
+    registry: shards.ShardRegistry,
+    tenant_id: str,
+    target_url: str,
+    batch_size: int = 5000,
+    pause: float = 0.01,
+    settle: float = shards.DIRECTORY_TTL_SECONDS + DRAIN_SECONDS,
+) -> int:
+    """Move one tenant; returns the number of runs copied."""
+    source_url, _ = registry.lookup(tenant_id)
+    if source_url == target_url:
+        return 0
+
+    src_engine = registry.engine(source_url)
+    dst_engine = registry.engine(target_url)
+
+    # 1. Online copy. Runs are only ever appended, so everything up to the
+    #    current max id can be copied in batches; newer agents show up in
+    #    the catch-up together with their runs.
+    with src_engine.connect() as src:
+        upto = src.execute(
+            select(func.max(_executions.c.id)).where(
+                _executions.c.tenant_ref == interning.tenants.ref_of(tenant_id)
+            )
+        ).scalar()
+        with dst_engine.begin() as dst:
+            _sync_small_tables(src, dst, tenant_id)
+            copied = set(_execution_ids(dst, tenant_id))
+        pending = [
+            i for i in _execution_ids(src, tenant_id, upto or 0) if i not in copied
+        ]
+    _copy_executions(src_engine, dst_engine, pending, batch_size, pause)
+
+    # 2. Freeze and let every worker notice.
+    registry.assign(tenant_id, source_url, frozen=True)
+    try:
+        time.sleep(settle)
+
+        # 3. Catch up and switch.
+        with src_engine.connect() as src, dst_engine.begin() as dst:
+            _sync_small_tables(src, dst, tenant_id)
+            source_ids = _execution_ids(src, tenant_id)
+            target_ids = set(_execution_ids(dst, tenant_id))
+            missing = [i for i in source_ids if i not in target_ids]
+            for i in range(0, len(missing), batch_size):
+                _copy_runs(src, dst, missing[i : i + batch_size])
+            extra = target_ids.difference(source_ids)
+            if extra:
+                dst.execute(delete(_executions).where(_executions.c.id.in_(extra)))
+    except BaseException:
+        registry.assign(tenant_id, source_url, frozen=False)
+        raise
+
+    registry.assign(tenant_id, target_url, frozen=False)
+    return len(pending) + len(missing)
+
+
+def purge(registry: shards.ShardRegistry, url: str, tenant_id: str) -> None:
+    """Delete a tenant's rows from a shard it no longer lives on."""
+    with registry.engine(url).begin() as conn:
+        # Agents cascade to agent_tools, conversations, runs, rollups and
+        # schedules.
+        conn.execute(delete(_agents).where(_agents.c.tenant_id == tenant_id))
+        conn.execute(delete(_tools).where(_tools.c.tenant_id == tenant_id))
+        # Replay jobs cascade to their results, webhooks to their deliveries.
+        for table in (
+            CacheVersion.__table__,
+            ReplayJob.__table__,
+            Webhook.__table__,
+            TenantUsage.__table__,
+        ):
+            conn.execute(delete(table).where(table.c.tenant_id == tenant_id))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("tenant_id")
+    parser.add_argument("target_url")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--pause", type=float, default=0.01)
+    parser.add_argument(
+        "--purge", action="store_true", help="delete the tenant from the old shard"
+    )
+    args = parser.parse_args()
+
+    source_url, _ = shards.registry.lookup(args.tenant_id)
+    started = time.perf_counter()
+    copied = move_tenant(
+        shards.registry, args.tenant_id, args.target_url, args.batch_size, args.pause
+    )
+    if args.purge and source_url != args.target_url:
+        purge(shards.registry, source_url, args.tenant_id)
+    print(
+        f"moved {args.tenant_id} ({copied} runs)"
+        f" in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
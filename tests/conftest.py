@@ -0,0 +1,72 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.db.models  # noqa: F401  (register tables on Base.metadata)
+from app import deps, rate_limit, tools
+from app.agent_cache import agent_cache
+from app.context_cache import context_cache
+from app.db import database
+from app.db.database import Base, enable_sqlite_foreign_keys, read_only_url
+from app.main import app
+
+TENANT_A = {"X-API-Key": "key_tenant_a"}
+TENANT_B = {"X-API-Key": "key_tenant_b"}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def local_tools():
+    # Off by default in the app; the tests run with the local tools.
+    tools.register_local_tools(tools.registry)
+    enabled, tools.ENABLED = tools.ENABLED, True
+    yield
+    tools.ENABLED = enabled
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # File-backed so threaded tests get real, independent connections.
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(engine, "connect", enable_sqlite_foreign_keys)
+    Base.metadata.create_all(engine)
+
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    engine.dispose()
+
+
+@pytest.fixture
+def read_session_factory(session_factory):
+    # Same file as session_factory, opened read-only like production reads.
+    engine = create_engine(
+        read_only_url(str(session_factory.kw["bind"].url)),
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(engine, "connect", enable_sqlite_foreign_keys)
+
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory, read_session_factory, monkeypatch):
+    monkeypatch.setattr(deps, "SessionLocal", session_factory)
+    monkeypatch.setattr(deps, "ReadSessionLocal", read_session_factory)
+    rate_limit._requests.clear()
+    agent_cache.clear()
+    database._last_write.clear()
+    tools.result_cache.clear()
+    context_cache.clear()
+
+    yield TestClient(app)
+
+    rate_limit._requests.clear()
+    agent_cache.clear()
+    database._last_write.clear()
+    tools.result_cache.clear()
+    context_cache.clear()
@@ -0,0 +1,75 @@
+import pytest
+
+from app import admission
+from app.admission import AdmissionController
+from app.core.errors import OverloadedError
+from tests.conftest import TENANT_A
+
+
+def test_rejects_when_in_flight_limit_reached():
+    ctl = AdmissionController("t", max_in_flight=2, latency_target=10)
+    started = [ctl.enter(), ctl.enter()]
+
+    with pytest.raises(OverloadedError) as exc:
+        ctl.enter()
+    assert exc.value.retry_after >= 1
+
+    ctl.exit(started[0])
+    ctl.enter()
+    assert ctl.stats()["admitted"] == 3
+    assert ctl.stats()["rejected"] == 1
+
+
+def test_rejects_on_high_latency_only_under_load():
+    ctl = AdmissionController("t", max_in_flight=4, latency_target=0.5)
+    ctl.exit(ctl.enter() - 3.0)  # one slow request: EWMA well above target
+
+    # Below half capacity: still admitted, so the estimate can recover.
+    first = ctl.enter()
+    second = ctl.enter()
+    with pytest.raises(OverloadedError):
+        ctl.enter()
+
+    ctl.exit(first)
+    ctl.exit(second)
+    assert ctl.stats()["in_flight"] == 0
+
+
+def test_run_endpoint_sheds_with_503(client, monkeypatch):
+    ctl = AdmissionController("runs", max_in_flight=1, latency_target=10)
+    monkeypatch.setattr(admission, "runs", ctl)
+    monkeypatch.setattr(admission, "ENABLED", True)
+
+    agent = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=TENANT_A,
+    ).json()
+    payload = {"task": "hello", "model": "gpt-4o"}
+
+    assert (
+        client.post(
+            f"/agents/{agent['id']}/run", json=payload, headers=TENANT_A
+        ).status_code
+        == 200
+    )
+    assert ctl.stats()["in_flight"] == 0
+
+    started = ctl.enter()  # another request is still running
+    res = client.post(f"/agents/{agent['id']}/run", json=payload, headers=TENANT_A)
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    ctl.exit(started)
+
+    metrics = client.get("/metrics", headers=TENANT_A).json()["admission"]["runs"]
+    assert metrics["admitted"] == 2
+    assert metrics["rejected"] == 1
+
+
+def test_unauthenticated_requests_take_no_slot(client, monkeypatch):
+    ctl = AdmissionController("lists", max_in_flight=1, latency_target=10)
+    monkeypatch.setattr(admission, "lists", ctl)
+    monkeypatch.setattr(admission, "ENABLED", True)
+
+    assert client.get("/runs/search", params={"q": "x"}).status_code == 401
+    assert ctl.stats()["admitted"] == 0
@@ -0,0 +1,94 @@
+from sqlalchemy import text
+
+from app import agent_cache as agent_cache_module
+from app.agent_cache import AgentCache, AgentSnapshot, agent_cache
+from tests.conftest import TENANT_A
+
+
+def _tool(client, name):
+    return client.post(
+        "/tools", json={"name": name, "description": "d"}, headers=TENANT_A
+    ).json()["id"]
+
+
+def _agent(client, tool_ids):
+    return client.post(
+        "/agents",
+        json={"name": "runner", "role": "r", "description": "d", "tool_ids": tool_ids},
+        headers=TENANT_A,
+    ).json()["id"]
+
+
+def _prompt(client, agent_id):
+    r = client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": "t", "model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+    return r.json()["prompt"]
+
+
+def test_repeated_reads_hit_cache(client):
+    agent_id = _agent(client, [])
+    for _ in range(3):
+        assert client.get(f"/agents/{agent_id}", headers=TENANT_A).status_code == 200
+    assert agent_cache.stats()["misses"] == 1
+    assert agent_cache.stats()["hits"] == 2
+
+
+def test_agent_update_invalidates(client):
+    agent_id = _agent(client, [])
+    client.get(f"/agents/{agent_id}", headers=TENANT_A)
+
+    client.put(f"/agents/{agent_id}", json={"role": "new"}, headers=TENANT_A)
+
+    assert client.get(f"/agents/{agent_id}", headers=TENANT_A).json()["role"] == "new"
+
+
+def test_tool_rename_and_delete_invalidate_agents_using_it(client):
+    search = _tool(client, "search")
+    calc = _tool(client, "calc")
+    agent_id = _agent(client, [search, calc])
+    assert "Tools: calc, search" in _prompt(client, agent_id)
+
+    client.put(f"/tools/{search}", json={"name": "web"}, headers=TENANT_A)
+    assert "Tools: calc, web" in _prompt(client, agent_id)
+
+    client.delete(f"/tools/{calc}", headers=TENANT_A)
+    assert client.get(f"/agents/{agent_id}", headers=TENANT_A).json()["tool_ids"] == [
+        search
+    ]
+
+
+def test_other_worker_changes_seen_after_version_bump(
+    client, session_factory, monkeypatch
+):
+    monkeypatch.setattr(agent_cache_module, "VERSION_CHECK_INTERVAL_SECONDS", 0)
+    agent_id = _agent(client, [])
+    client.get(f"/agents/{agent_id}", headers=TENANT_A)
+
+    # Simulate another worker: change the row and bump the version directly.
+    with session_factory() as db:
+        db.execute(
+            text("UPDATE agents SET role = 'remote' WHERE id = :id"), {"id": agent_id}
+        )
+        db.execute(agent_cache_module._BUMP_SQL, {"tenant_id": "tenant_a"})
+        db.commit()
+
+    assert (
+        client.get(f"/agents/{agent_id}", headers=TENANT_A).json()["role"] == "remote"
+    )
+
+
+def test_cache_is_size_bounded(session_factory):
+    cache = AgentCache(max_entries=2)
+    db = session_factory()
+
+    try:
+        for agent_id in range(3):
+            snapshot = AgentSnapshot(agent_id, "t", "n", "r", "d", (), ())
+            cache.get(db, "t", agent_id, lambda: snapshot)
+    finally:
+        db.close()
+
+    assert cache.stats()["size"] == 2
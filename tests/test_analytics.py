@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import rate_limit
+from scripts.backfill_rollups import backfill
+from tests.conftest import TENANT_A, TENANT_B
+
+
+def _agent(client, name, headers=TENANT_A):
+    return client.post(
+        "/agents",
+        json={"name": name, "role": "r", "description": "d"},
+        headers=headers,
+    ).json()["id"]
+
+
+def _run(client, agent_id, task="t", headers=TENANT_A):
+    r = client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": task, "model": "gpt-4o"},
+        headers=headers,
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def _stats(client, headers=TENANT_A, **params):
+    r = client.get("/analytics/runs", params=params, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()["buckets"]
+
+
+def test_counts_per_agent_and_model(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 100)
+    a = _agent(client, "a")
+    b = _agent(client, "b")
+    responses = [_run(client, a)["response"] for _ in range(3)] + [
+        _run(client, b)["response"]
+    ]
+    _run(client, _agent(client, "other", TENANT_B), headers=TENANT_B)
+
+    by_agent = _stats(client, granularity="hour", group_by="agent")
+    assert {(x["agent_id"], x["run_count"]) for x in by_agent} == {(a, 3), (b, 1)}
+
+    (total,) = _stats(client, granularity="day", group_by="model")
+    assert total["model"] == "gpt-4o"
+    assert total["run_count"] == 4
+    sizes = [len(r.encode("utf-8")) for r in responses]
+    assert total["response_bytes"]["total"] == sum(sizes)
+    assert total["response_bytes"]["min"] == min(sizes)
+    assert total["response_bytes"]["max"] == max(sizes)
+
+    assert sum(x["run_count"] for x in _stats(client, granularity="minute")) == 4
+
+
+def test_filters_and_validation(client):
+    a = _agent(client, "a")
+    _run(client, a)
+    assert _stats(client, agent_id=a + 1) == []
+    assert _stats(client, model="other") == []
+    assert (
+        client.get(
+            "/analytics/runs", params={"granularity": "week"}, headers=TENANT_A
+        ).status_code
+        == 400
+    )
+    assert (
+        client.get(
+            "/analytics/runs", params={"group_by": "tenant"}, headers=TENANT_A
+        ).status_code
+        == 400
+    )
+
+
+def test_offset_aware_bounds_are_converted_to_utc(client):
+    _run(client, _agent(client, "a"))
+    now = datetime.utcnow()
+
+    # The same instant, written in UTC and with a +02:00 offset.
+    utc = (now - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    local = (now + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S+02:00")
+
+    for start in (utc, local):
+        (bucket,) = _stats(client, granularity="hour", group_by="", start=start)
+        assert bucket["run_count"] == 1
+
+
+def test_backfill_matches_live_rollups(client, session_factory, monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 100)
+    a = _agent(client, "a")
+    b = _agent(client, "b")
+    for i in range(5):
+        _run(client, a if i % 2 else b, task="x" * (i + 1))
+
+    live = {g: _stats(client, granularity=g) for g in ("minute", "hour", "day")}
+
+    engine = session_factory.kw["bind"]
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM run_rollups"))
+        conn.execute(
+            text(
+                "INSERT INTO run_rollups_backfill (id, watermark, position) "
+                "VALUES (1, 5, 0)"
+            )
+        )
+
+    assert backfill(engine, batch_size=2, pause=0) == 5
+    assert {g: _stats(client, granularity=g) for g in live} == live
@@ -0,0 +1,135 @@
+import pytest
+
+from app import rate_limit
+from app.context_cache import context_cache
+from app.repositories.conversations_repo import ConversationsRepository
+from tests.conftest import TENANT_A, TENANT_B
+
+
+@pytest.fixture
+def conversation(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 1000)
+    monkeypatch.setattr("app.services.runs_service.WINDOW_TURNS", 3)
+    monkeypatch.setattr("app.services.runs_service.SUMMARY_MAX_TOKENS", 40)
+    agent_id = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d"},
+        headers=TENANT_A,
+    ).json()["id"]
+    res = client.post(
+        f"/agents/{agent_id}/conversations", json={"model": "gpt-4o"}, headers=TENANT_A
+    )
+    assert res.status_code == 201
+    return res.json()["id"]
+
+
+def _say(client, conversation_id, message, headers=TENANT_A):
+    return client.post(
+        f"/conversations/{conversation_id}/turns",
+        json={"message": message},
+        headers=headers,
+    )
+
+
+def test_turns_store_only_the_new_message(client, conversation):
+    first = _say(client, conversation, "hello there").json()
+    second = _say(client, conversation, "and again").json()
+
+    assert (first["turn"], second["turn"]) == (1, 2)
+    assert second["message"] == "and again"
+    assert first["response"] != second["response"]
+
+    page = client.get(f"/conversations/{conversation}/turns", headers=TENANT_A)
+    assert [t["message"] for t in page.json()["items"]] == ["hello there", "and again"]
+
+
+def test_prompt_size_stays_bounded_as_the_conversation_grows(client, conversation):
+    tokens = [
+        _say(client, conversation, f"message number {i} " * 5).json()["prompt_tokens"]
+        for i in range(12)
+    ]
+    # Once the window (3 turns) is full and the summary hits its cap (40
+    # tokens), the prompt stops growing.
+    assert max(tokens[6:]) - min(tokens[6:]) <= 8
+
+    state = client.get(f"/conversations/{conversation}", headers=TENANT_A).json()
+    assert state["turn_count"] == 12
+    assert "message number" in state["summary"]
+
+
+def test_window_is_read_from_the_database_only_on_cache_miss(
+    client, conversation, monkeypatch
+):
+    reads = []
+    window = ConversationsRepository.window
+    monkeypatch.setattr(
+        ConversationsRepository,
+        "window",
+        lambda self, *a: reads.append(a) or window(self, *a),
+    )
+
+    for i in range(3):
+        _say(client, conversation, f"m{i}")
+    assert len(reads) == 1  # the first turn; later turns extend the cache
+
+    context_cache.clear()
+    cold = _say(client, conversation, "m3").json()
+    assert len(reads) == 2
+
+    context_cache.clear()
+    assert _say(client, conversation, "m4").status_code == 200
+    assert cold["turn"] == 4
+
+
+def test_stale_turn_count_is_a_conflict(client, conversation, monkeypatch):
+    _say(client, conversation, "first")
+    monkeypatch.setattr(ConversationsRepository, "advance", lambda *a: False)
+
+    res = _say(client, conversation, "lost race")
+
+    assert res.status_code == 409
+    assert context_cache.stats()["size"] == 0
+
+
+def test_conversations_are_tenant_scoped(client, conversation):
+    assert _say(client, conversation, "hi", headers=TENANT_B).status_code == 404
+    assert (
+        client.get(f"/conversations/{conversation}", headers=TENANT_B).status_code
+        == 404
+    )
+    page = client.get(f"/conversations/{conversation}/turns", headers=TENANT_B)
+    assert page.json()["items"] == []
+
+
+def test_deleting_the_agent_removes_its_conversations(client, conversation):
+    _say(client, conversation, "hi")
+    agent_id = client.get(f"/conversations/{conversation}", headers=TENANT_A).json()[
+        "agent_id"
+    ]
+
+    assert client.delete(f"/agents/{agent_id}", headers=TENANT_A).status_code == 204
+    assert (
+        client.get(f"/conversations/{conversation}", headers=TENANT_A).status_code
+        == 404
+    )
+
+
+def test_timed_out_turn_is_recorded_outside_the_transcript(client, conversation):
+    _say(client, conversation, "hello there")
+
+    res = client.post(
+        f"/conversations/{conversation}/turns",
+        json={"message": "too slow"},
+        headers={**TENANT_A, "X-Request-Timeout": "0"},
+    )
+    assert res.status_code == 504
+
+    agent_id = client.get(f"/conversations/{conversation}", headers=TENANT_A).json()[
+        "agent_id"
+    ]
+    runs = client.get(f"/agents/{agent_id}/runs", headers=TENANT_A).json()["items"]
+    assert sorted(r["status"] for r in runs) == ["completed", "timed_out"]
+
+    assert _say(client, conversation, "and again").json()["turn"] == 2
+    page = client.get(f"/conversations/{conversation}/turns", headers=TENANT_A)
+    assert [t["message"] for t in page.json()["items"]] == ["hello there", "and again"]
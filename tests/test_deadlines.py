@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from app import deadlines
+from app.core.errors import DeadlineExceededError
+from app.deadlines import Deadline
+from app.deps import _watch_disconnect
+from app.scheduler import FairScheduler
+from app.services import runs_service
+from tests.conftest import TENANT_A
+
+_SLOW_SQL = text(
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+    "SELECT count(*) FROM (SELECT i FROM n LIMIT 100000000)"
+)
+
+
+def _agent(client):
+    return client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=TENANT_A,
+    ).json()
+
+
+def _statuses(client, agent_id):
+    runs = client.get(f"/agents/{agent_id}/runs", headers=TENANT_A).json()
+    return [r["status"] for r in runs["items"]]
+
+
+def test_expired_deadline_records_timed_out_run(client):
+    agent = _agent(client)
+
+    res = client.post(
+        f"/agents/{agent['id']}/run",
+        json={"task": "hello", "model": "gpt-4o"},
+        headers={**TENANT_A, "X-Request-Timeout": "0"},
+    )
+
+    assert res.status_code == 504
+    assert _statuses(client, agent["id"]) == ["timed_out"]
+
+
+def test_cancelled_run_is_recorded(client, monkeypatch):
+    agent = _agent(client)
+
+    def disconnecting_llm(model, prompt):
+        deadlines.current().cancel()
+        return "too late"
+
+    monkeypatch.setattr(runs_service, "mock_llm_complete", disconnecting_llm)
+
+    res = client.post(
+        f"/agents/{agent['id']}/run",
+        json={"task": "hello", "model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+
+    assert res.status_code == 499
+    assert _statuses(client, agent["id"]) == ["cancelled"]
+
+
+def test_completed_run_status(client):
+    agent = _agent(client)
+    res = client.post(
+        f"/agents/{agent['id']}/run",
+        json={"task": "hello", "model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+    assert res.json()["status"] == "completed"
+
+
+def test_sqlite_statement_aborted_at_deadline(session_factory):
+    db = session_factory()
+    try:
+        with deadlines.bound(Deadline(0.05)):
+            with pytest.raises(DeadlineExceededError):
+                db.execute(_SLOW_SQL)
+    finally:
+        db.close()
+
+
+def test_scheduler_wait_ends_at_deadline():
+    sched = FairScheduler(capacity=1)
+    taken, release = threading.Event(), threading.Event()
+    holder = threading.Thread(
+        target=lambda: sched.run("a", "m", lambda: (taken.set(), release.wait()))
+    )
+    holder.start()
+    assert taken.wait(1)
+
+    with deadlines.bound(Deadline(0.1)):
+        with pytest.raises(DeadlineExceededError):
+            sched.acquire("b", "m")
+
+    stats = sched.stats()
+    assert stats["queued"] == 0
+    assert stats["tenants"]["b"]["abandoned"] == 1
+    release.set()
+    holder.join()
+
+
+class _FakeRequest:
+    def __init__(self, messages):
+        self._messages = iter(messages)
+
+    async def receive(self):
+        return next(self._messages)
+
+
+def test_disconnect_cancels_deadline():
+    body = {"type": "http.request", "body": b"", "more_body": False}
+
+    deadline = Deadline(10)
+    request = _FakeRequest([body, {"type": "http.disconnect"}])
+    asyncio.run(_watch_disconnect(request, deadline))
+    assert deadline.cancelled
+
+    # A caller that keeps answering with body messages ends the watcher.
+    deadline = Deadline(10)
+    asyncio.run(_watch_disconnect(_FakeRequest([body, body]), deadline))
+    assert not deadline.cancelled
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from app.db import interning
+from app.db.models import AgentExecution, ModelName, TenantName
+from app.repositories.runs_repo import RunsRepository
+from tests.conftest import TENANT_A, TENANT_B
+
+
+def _agent(client, headers):
+    return client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=headers,
+    ).json()["id"]
+
+
+def _run(client, agent_id, headers, task="t"):
+    res = client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": task, "model": "gpt-4o"},
+        headers=headers,
+    )
+    assert res.status_code == 200
+    return res.json()
+
+
+def test_rows_store_interned_ids_and_integer_timestamps(client, session_factory):
+    a, b = _agent(client, TENANT_A), _agent(client, TENANT_B)
+    for i in range(2):
+        _run(client, a, TENANT_A, task=f"a{i}")
+    _run(client, b, TENANT_B)
+
+    with session_factory() as db:
+        assert db.scalars(select(TenantName.name).order_by(TenantName.id)).all() == [
+            "tenant_a",
+            "tenant_b",
+        ]
+        assert db.scalars(select(ModelName.name)).all() == ["gpt-4o"]
+        raw = db.execute(
+            text(
+                "SELECT tenant_ref, model_ref, typeof(created_at) FROM agent_executions"
+            )
+        ).all()
+        assert raw == [(1, 1, "integer"), (1, 1, "integer"), (2, 1, "integer")]
+
+        execution = db.scalars(select(AgentExecution)).first()
+        assert (execution.tenant_id, execution.model) == ("tenant_a", "gpt-4o")
+
+    page = client.get(f"/agents/{a}/runs", headers=TENANT_A).json()
+    assert ["Task: a1" in r["prompt"] for r in page["items"]] == [True, False]
+    assert client.get(f"/agents/{a}/runs", headers=TENANT_B).json()["total"] == 0
+
+
+def test_timestamps_round_trip_to_the_microsecond(session_factory):
+    at = datetime(2025, 12, 31, 23, 59, 59, 999999)
+    with session_factory() as db:
+        db.execute(
+            text(
+                "INSERT INTO agents (tenant_id, name, role, description) VALUES ('t', 'a', 'r', 'd')"
+            )
+        )
+        execution = RunsRepository(db).create("t", 1, "gpt-4o", "p", "r")
+        execution.created_at = at
+        db.commit()
+        db.expire_all()
+        assert db.get(AgentExecution, execution.id).created_at == at
+
+
+def test_rolled_back_ids_are_not_cached(session_factory):
+    engine = session_factory.kw["bind"]
+    with session_factory() as db:
+        first = interning.tenants.ref(db, "tenant_x")
+        db.rollback()
+        assert engine not in interning.tenants._ids
+
+        second = interning.tenants.ref(db, "tenant_y")
+        db.commit()
+        assert interning.tenants._ids[engine] == {"tenant_y": second}
+        assert (
+            db.scalar(select(TenantName.id).where(TenantName.name == "tenant_x"))
+            is None
+        )
+    assert first == second  # the rolled-back id was reused
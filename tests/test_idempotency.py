@@ -0,0 +1,90 @@
+import threading
+import time
+
+from app import idempotency, rate_limit
+from app.services import runs_service
+from tests.conftest import TENANT_A, TENANT_B
+
+
+def _agent(client, headers=TENANT_A) -> int:
+    r = client.post(
+        "/agents",
+        json={"name": "runner", "role": "r", "description": "d"},
+        headers=headers,
+    )
+    return r.json()["id"]
+
+
+def _run(client, agent_id, key, task="hello", headers=TENANT_A):
+    return client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": task, "model": "gpt-4o"},
+        headers={**headers, "Idempotency-Key": key},
+    )
+
+
+def setup_function():
+    idempotency._entries.clear()
+
+
+def test_replay_returns_stored_response_without_rate_limit(client):
+    agent_id = _agent(client)
+
+    first = _run(client, agent_id, "k1")
+    assert first.status_code == 200
+
+    for _ in range(rate_limit.MAX_REQUESTS + 2):
+        r = _run(client, agent_id, "k1")
+        assert r.status_code == 200
+        assert r.json() == first.json()
+        assert r.headers["Idempotent-Replayed"] == "true"
+
+    assert client.get(f"/agents/{agent_id}/runs", headers=TENANT_A).json()["total"] == 1
+    assert len(rate_limit._requests["tenant_a"]) == 1
+
+
+def test_key_reused_with_different_payload_conflicts(client):
+    agent_id = _agent(client)
+    assert _run(client, agent_id, "k1").status_code == 200
+    assert _run(client, agent_id, "k1", task="other").status_code == 409
+
+
+def test_keys_are_tenant_scoped(client):
+    a = _agent(client)
+    b = _agent(client, TENANT_B)
+    assert _run(client, a, "k1").json()["agent_id"] == a
+    assert _run(client, b, "k1", headers=TENANT_B).json()["agent_id"] == b
+
+
+def test_failed_request_is_not_stored(client):
+    assert _run(client, 999, "k1").status_code == 400
+    agent_id = _agent(client)
+    assert _run(client, agent_id, "k2").status_code == 200
+    assert ("tenant_a", "k1") not in idempotency._entries
+
+
+def test_concurrent_duplicate_waits_for_first_result(client, monkeypatch):
+    agent_id = _agent(client)
+    calls = []
+    real = runs_service.mock_llm_complete
+
+    def slow(model, prompt):
+        calls.append(prompt)
+        time.sleep(0.2)
+        return real(model, prompt)
+
+    monkeypatch.setattr(runs_service, "mock_llm_complete", slow)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(_run(client, agent_id, "k1")))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert {r.status_code for r in results} == {200}
+    assert len({r.json()["created_at"] for r in results}) == 1
@@ -0,0 +1,69 @@
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from app.db.shards import MIGRATIONS_DIR
+
+_SCHEMA = text(
+    "SELECT type, name, sql FROM sqlite_master "
+    "WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+)
+
+
+def _migrate(engine, step, revision):
+    cfg = Config()
+    cfg.set_main_option("script_location", str(MIGRATIONS_DIR))
+    with engine.connect() as conn:
+        # As under the alembic CLI; see app.db.shards.migrate.
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.commit()
+        with conn.begin():
+            cfg.attributes["connection"] = conn
+            step(cfg, revision)
+
+
+def test_migrations_downgrade_and_upgrade_again(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    _migrate(engine, command.upgrade, "head")
+    with engine.begin() as conn:
+        schema = conn.execute(_SCHEMA).all()
+        conn.execute(
+            text(
+                "INSERT INTO agents (id, tenant_id, name, role, description) "
+                "VALUES (1, 'tenant_a', 'a', 'r', 'd')"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO conversations (id, tenant_id, agent_id, model, "
+                "turn_count, summary, summarized_turns, created_at) "
+                "VALUES (1, 'tenant_a', 1, 'gpt-4o', 1, '', 0, '2026-01-01')"
+            )
+        )
+        conn.execute(text("INSERT INTO tenant_names (id, name) VALUES (1, 'tenant_a')"))
+        conn.execute(text("INSERT INTO model_names (id, name) VALUES (1, 'gpt-4o')"))
+        conn.execute(
+            text(
+                "INSERT INTO agent_executions (id, agent_id, prompt, response, "
+                "conversation_id, turn, tenant_ref, model_ref, created_at) "
+                "VALUES (1, 1, 'p', 'r', 1, 1, 1, 1, 1767225600000000)"
+            )
+        )
+
+    # Back to before the executions were compacted: the turn keeps its
+    # conversation, and the column can still be dropped further down.
+    _migrate(engine, command.downgrade, "952a4e973c9f")
+    with engine.connect() as conn:
+        row = conn.execute(
+            text(
+                "SELECT tenant_id, model, conversation_id, turn, created_at "
+                "FROM agent_executions"
+            )
+        ).one()
+    assert tuple(row) == ("tenant_a", "gpt-4o", 1, 1, "2026-01-01 00:00:00.000000")
+
+    _migrate(engine, command.downgrade, "584751d7c2d3")
+    _migrate(engine, command.upgrade, "head")
+    with engine.connect() as conn:
+        assert conn.execute(_SCHEMA).all() == schema
+    engine.dispose()
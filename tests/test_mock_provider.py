@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+from app import deadlines, model_registry, rate_limit
+from app.core.errors import DeadlineExceededError, ProviderError
+from app.deadlines import Deadline
+from app.llm import mock_llm_complete, mock_llm_stream
+from app.mock_provider import LatencyProfile, MockProvider, parse_per_model
+from app.model_registry import Backend, ModelRegistry
+from tests.conftest import TENANT_A
+
+
+def _serve(monkeypatch, provider):
+    registry = ModelRegistry({"gpt-4o": [Backend("gpt-4o-0", provider)]})
+    monkeypatch.setattr(model_registry, "registry", registry)
+
+
+def _draws(provider, model, n):
+    return [provider._draw(model) for _ in range(n)]
+
+
+def test_profiles_are_parsed_per_model():
+    profiles = parse_per_model(
+        "lognormal:800:0.5,gpt-4o=long_tail:300:1.5", LatencyProfile.parse
+    )
+
+    assert (profiles[None].kind, profiles[None].params) == ("lognormal", (800, 0.5))
+    assert (profiles["gpt-4o"].kind, profiles["gpt-4o"].params) == (
+        "long_tail",
+        (300, 1.5),
+    )
+    with pytest.raises(ValueError):
+        LatencyProfile.parse("gaussian:100")
+    with pytest.raises(ValueError):
+        LatencyProfile.parse("lognormal:100")
+
+
+def test_draws_are_seeded_and_per_model():
+    make = lambda seed: MockProvider(
+        latency={None: LatencyProfile.parse("lognormal:100:0.5")},
+        error_rate={None: 0.3},
+        seed=seed,
+    )
+
+    a, b = make(1), make(1)
+    _draws(a, "other", 5)  # another model's calls do not shift the sequence
+
+    assert _draws(a, "gpt-4o", 50) == _draws(b, "gpt-4o", 50)
+    assert _draws(make(1), "gpt-4o", 50) != _draws(make(2), "gpt-4o", 50)
+
+
+def test_distributions_have_the_configured_shape():
+    rng_provider = lambda spec: MockProvider(latency={None: LatencyProfile.parse(spec)})
+    n = 4000
+
+    fixed = [d for d, _ in _draws(rng_provider("fixed:20"), "gpt-4o", 10)]
+    lognormal = sorted(d for d, _ in _draws(rng_provider("lognormal:100:0.5"), "m", n))
+    tail = sorted(d for d, _ in _draws(rng_provider("long_tail:100:1.5"), "m", n))
+
+    assert fixed == [0.02] * 10
+    assert lognormal[n // 2] == pytest.approx(0.1, rel=0.1)
+    assert tail[0] >= 0.1
+    # A heavy tail: p99 many times the median.
+    assert tail[int(n * 0.99)] > 10 * tail[n // 2]
+
+
+def test_error_rate_is_injected(monkeypatch):
+    _serve(monkeypatch, MockProvider(error_rate={"gpt-4o": 1.0}))
+
+    with pytest.raises(ProviderError):
+        mock_llm_complete("gpt-4o", "hello")
+
+
+def test_streamed_chunks_are_paced(monkeypatch):
+    _serve(
+        monkeypatch,
+        MockProvider(
+            latency={None: LatencyProfile.parse("fixed:20")},
+            chunk_chars=8,
+            chunk_seconds=0.01,
+        ),
+    )
+
+    started = time.perf_counter()
+    chunks = list(mock_llm_stream("gpt-4o", "hello"))
+    elapsed = time.perf_counter() - started
+
+    assert "".join(chunks) == mock_llm_complete("gpt-4o", "hello")
+    assert max(map(len, chunks)) == 8
+    assert elapsed >= 0.02 + 0.01 * (len(chunks) - 1)
+
+
+def test_slow_provider_call_ends_at_the_deadline(monkeypatch):
+    _serve(
+        monkeypatch,
+        MockProvider(latency={None: LatencyProfile.parse("fixed:5000")}),
+    )
+
+    started = time.perf_counter()
+    with deadlines.bound(Deadline(0.05)), pytest.raises(DeadlineExceededError):
+        mock_llm_complete("gpt-4o", "hello")
+
+    assert time.perf_counter() - started < 1
+
+
+def test_failed_provider_call_is_recorded(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 1000)
+    _serve(monkeypatch, MockProvider(error_rate={None: 1}))
+    agent_id = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=TENANT_A,
+    ).json()["id"]
+
+    res = client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": "t", "model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+
+    assert res.status_code == 502
+    runs = client.get(
+        f"/agents/{agent_id}/runs", params={"fields": "status"}, headers=TENANT_A
+    ).json()["items"]
+    assert [r["status"] for r in runs] == ["failed"]
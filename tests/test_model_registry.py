@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from app import model_registry
+from app.core.errors import ProviderError
+from app.mock_provider import LatencyProfile, MockProvider
+from app.model_registry import Backend, ModelRegistry
+
+
+def _backend(name, latency="fixed:0", error_rate=0.0):
+    return Backend(
+        name,
+        MockProvider(
+            latency={None: LatencyProfile.parse(latency)},
+            error_rate={None: error_rate},
+        ),
+    )
+
+
+def _call(registry):
+    return registry.call(
+        "m", lambda provider, cancel: (provider, provider.call("m", cancel))[0]
+    )
+
+
+def test_calls_go_to_the_fastest_backend():
+    slow, fast = _backend("slow", "fixed:20"), _backend("fast", "fixed:1")
+    registry = ModelRegistry({"m": [slow, fast]}, hedging=False, probe_rate=0)
+
+    # Unmeasured backends are tried first, then the fastest one is kept.
+    providers = [_call(registry) for _ in range(5)]
+
+    assert providers[:2] == [slow.provider, fast.provider]
+    assert providers[2:] == [fast.provider] * 3
+    assert fast.ewma < slow.ewma
+
+
+def test_failing_backend_is_taken_out_of_rotation(monkeypatch):
+    monkeypatch.setattr(model_registry, "FAILURE_THRESHOLD", 2)
+    broken, ok = _backend("broken", error_rate=1.0), _backend("ok", "fixed:5")
+    registry = ModelRegistry({"m": [broken, ok]}, hedging=False, probe_rate=0)
+    ok.record(0.005, ok=True)
+
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            _call(registry)
+
+    assert not broken.healthy()
+    assert [_call(registry) for _ in range(3)] == [ok.provider] * 3
+    assert registry.rank("m") == [ok]
+
+
+def test_slow_call_is_hedged_to_the_next_backend():
+    stuck, spare = _backend("stuck", "fixed:2000"), _backend("spare", "fixed:10")
+    # stuck looks fastest from its history, so it is tried first.
+    for _ in range(model_registry.HEDGE_MIN_SAMPLES):
+        stuck.record(0.005, ok=True)
+        spare.record(0.010, ok=True)
+    registry = ModelRegistry({"m": [stuck, spare]}, hedging=True, probe_rate=0)
+
+    started = time.perf_counter()
+    provider = _call(registry)
+    elapsed = time.perf_counter() - started
+
+    assert provider is spare.provider
+    assert elapsed < 0.5
+    assert (registry.hedged, registry.hedges_won) == (1, 1)
+    # The losing call was cancelled and not counted against its backend.
+    assert stuck.failures == 0
+
+
+def test_fast_call_is_not_hedged():
+    fast, spare = _backend("fast", "fixed:1"), _backend("spare", "fixed:1")
+    for _ in range(model_registry.HEDGE_MIN_SAMPLES):
+        fast.record(0.050, ok=True)
+    registry = ModelRegistry({"m": [fast, spare]}, hedging=True, probe_rate=0)
+    spare.record(0.100, ok=True)
+
+    assert _call(registry) is fast.provider
+    assert registry.hedged == 0
+
+
+def test_hedged_call_moves_on_after_a_failure():
+    broken, ok = _backend("broken", error_rate=1.0), _backend("ok", "fixed:5")
+    registry = ModelRegistry({"m": [broken, ok]}, hedging=True, probe_rate=0)
+
+    assert _call(registry) is ok.provider
+    assert broken.failures == 1
+
+
+def test_hedged_call_fails_when_every_attempt_fails():
+    a, b = _backend("a", "fixed:5", 1.0), _backend("b", "fixed:5", 1.0)
+    registry = ModelRegistry({"m": [a, b]}, hedging=True, probe_rate=0)
+
+    with pytest.raises(ProviderError):
+        _call(registry)
+    assert (a.failures, b.failures) == (1, 1)
@@ -0,0 +1,82 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.db import query_budget
+from app.db.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, QueryLog
+from tests.conftest import TENANT_A
+
+
+@pytest.fixture
+def raise_mode(monkeypatch):
+    monkeypatch.setattr(query_budget, "MODE", "raise")
+
+
+def test_shape_ignores_whitespace_and_in_list_length():
+    log = QueryLog()
+    log.record("SELECT * FROM tools WHERE id IN (?, ?)")
+    log.record("SELECT *  FROM tools\nWHERE id IN (?, ?, ?)")
+    assert log.count == 2
+    assert len(log.shapes) == 1
+
+
+def test_repeated_shape_flagged_as_n_plus_one():
+    log = QueryLog()
+    for _ in range(query_budget.N_PLUS_ONE_THRESHOLD):
+        log.record("SELECT * FROM tools WHERE agent_id = ?")
+
+    problems = query_budget.check(log, "GET /x", budget=None)
+    assert len(problems) == 1
+    assert "N+1" in problems[0]
+
+
+def test_over_budget_fails_request(raise_mode, session_factory):
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware)
+
+    @app.get("/chatty")
+    @query_budget.query_budget(1)
+    def chatty():
+        with session_factory() as db:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        return {}
+
+    with pytest.raises(QueryBudgetExceeded):
+        TestClient(app).get("/chatty")
+
+
+def test_hot_routes_stay_within_budget(raise_mode, client):
+    tool_ids = [
+        client.post(
+            "/tools", json={"name": f"t{i}", "description": "d"}, headers=TENANT_A
+        ).json()["id"]
+        for i in range(3)
+    ]
+    for i in range(3):
+        r = client.post(
+            "/agents",
+            json={
+                "name": f"a{i}",
+                "role": "r",
+                "description": "d",
+                "tool_ids": tool_ids,
+            },
+            headers=TENANT_A,
+        )
+        assert r.status_code == 201
+    agent_id = r.json()["id"]
+
+    r = client.get("/agents", headers=TENANT_A)
+    assert r.status_code == 200
+    assert r.headers["x-query-count"] == "2"
+
+    assert client.get(f"/agents/{agent_id}", headers=TENANT_A).status_code == 200
+    r = client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": "hello", "model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+    assert r.status_code == 200
+    assert client.get(f"/agents/{agent_id}/runs", headers=TENANT_A).status_code == 200
@@ -0,0 +1,149 @@
+import pytest
+from sqlalchemy import text
+
+from app import deps, quotas, rate_limit
+from app.core.errors import OverloadedError
+from tests.conftest import TENANT_A, TENANT_B
+
+
+def _tracker(**limits):
+    """A tracker with limits like runs_day=2 for tenant_a only."""
+    spec = {}
+    for name, value in limits.items():
+        metric, period = name.split("_")
+        spec[(metric, period)] = {"tenant_a": value}
+    return quotas.UsageTracker(spec, tenants=lambda: ["tenant_a"])
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 1000)
+
+
+def _agent(client, name="a", headers=TENANT_A):
+    return client.post(
+        "/agents",
+        json={"name": name, "role": "r", "description": "d", "tool_ids": []},
+        headers=headers,
+    ).json()["id"]
+
+
+def _run(client, agent_id, headers=TENANT_A):
+    return client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": "count me", "model": "gpt-4o"},
+        headers=headers,
+    )
+
+
+def test_daily_run_quota_returns_429_with_details(client, monkeypatch):
+    monkeypatch.setattr(quotas, "tracker", _tracker(runs_day=2))
+    agent_id = _agent(client)
+    other = _agent(client, "b", headers=TENANT_B)
+
+    assert [_run(client, agent_id).status_code for _ in range(2)] == [200, 200]
+    res = _run(client, agent_id)
+
+    assert res.status_code == 429
+    quota = res.json()["detail"]["quota"]
+    assert (quota["metric"], quota["period"], quota["limit"], quota["used"]) == (
+        "runs",
+        "day",
+        2,
+        2,
+    )
+    assert 0 < int(res.headers["Retry-After"]) <= 24 * 3600
+    assert _run(client, other, headers=TENANT_B).status_code == 200
+
+
+def test_token_quota_counts_prompt_and_response_tokens(client, monkeypatch):
+    monkeypatch.setattr(quotas, "tracker", _tracker(tokens_month=1))
+    agent_id = _agent(client)
+
+    first = _run(client, agent_id).json()
+    res = _run(client, agent_id)
+
+    assert res.status_code == 429
+    assert res.json()["detail"]["quota"]["metric"] == "tokens"
+    usage = client.get("/usage", headers=TENANT_A).json()
+    assert usage["month"]["runs"] == 1
+    assert usage["month"]["tokens"] == (
+        first["prompt_tokens"] + first["response_tokens"]
+    )
+    assert usage["month"]["tokens_limit"] == 1
+    assert usage["day"]["runs_limit"] is None
+
+
+def test_flushed_usage_is_shared_between_workers(client, session_factory):
+    first, second = _tracker(runs_day=5), _tracker(runs_day=5)
+    for _ in range(3):
+        first.reserve("tenant_a")
+    first.charge("tenant_a", 40)
+    second.reserve("tenant_a")
+
+    first.sync()
+    second.sync()  # adds its own run and reads the total back
+    first.sync()
+
+    for tracker in (first, second):
+        day = tracker.usage("tenant_a")["day"]
+        assert (day["runs"], day["tokens"]) == (4, 40)
+    with session_factory() as db:
+        rows = db.execute(text("SELECT period, runs FROM tenant_usage")).all()
+    assert sorted(rows) == [("day", 4), ("month", 4)]
+
+    second.reserve("tenant_a")
+    with pytest.raises(quotas.QuotaExceededError):
+        second.reserve("tenant_a")
+
+
+def test_unflushed_counts_survive_a_failed_flush(client, session_factory, monkeypatch):
+    tracker = _tracker(runs_day=5)
+    tracker.reserve("tenant_a")
+
+    def frozen(tenant_id):
+        raise OverloadedError("moving")
+
+    real = deps.write_session
+    monkeypatch.setattr(deps, "write_session", frozen)
+    tracker.sync()
+    assert tracker.stats()["flush_errors"] == 1
+    assert tracker.usage("tenant_a")["day"]["runs"] == 1
+
+    monkeypatch.setattr(deps, "write_session", real)
+    tracker.sync()
+    with session_factory() as db:
+        assert db.scalar(text("SELECT sum(runs) FROM tenant_usage")) == 2
+    assert tracker.stats()["unflushed_runs"] == 0
+
+
+def test_limits_parse_defaults_and_per_tenant_overrides():
+    limits = quotas.parse_limits("100, tenant_b=5,tenant_c=0")
+    tracker = quotas.UsageTracker({("runs", "day"): limits})
+
+    assert tracker.limit("tenant_a", "runs", "day") == 100
+    assert tracker.limit("tenant_b", "runs", "day") == 5
+    assert tracker.limit("tenant_c", "runs", "day") is None
+    assert tracker.limit("tenant_a", "tokens", "month") is None
+
+
+def test_conversation_turns_count_against_the_run_quota(client, monkeypatch):
+    monkeypatch.setattr(quotas, "tracker", _tracker(runs_day=2))
+    agent_id = _agent(client)
+    conversation_id = client.post(
+        f"/agents/{agent_id}/conversations", json={"model": "gpt-4o"}, headers=TENANT_A
+    ).json()["id"]
+
+    def say():
+        return client.post(
+            f"/conversations/{conversation_id}/turns",
+            json={"message": "count me"},
+            headers=TENANT_A,
+        )
+
+    assert [say().status_code for _ in range(2)] == [200, 200]
+    res = say()
+
+    assert res.status_code == 429
+    assert res.json()["detail"]["quota"]["metric"] == "runs"
+    assert _run(client, agent_id).status_code == 429
@@ -0,0 +1,138 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import OperationalError
+
+from app import deps
+from app.db import database
+from app.db.database import Base, read_only_url, wrote_recently
+from app.db.models import Tool
+from app.services import runs_service
+from tests.conftest import TENANT_A
+
+
+def test_read_only_url_for_sqlite_files():
+    assert (
+        read_only_url("sqlite:///./agent_platform.db")
+        == "sqlite:///file:./agent_platform.db?mode=ro&uri=true"
+    )
+    assert read_only_url("sqlite://") == "sqlite://"
+    assert read_only_url("postgresql://db/app") == "postgresql://db/app"
+
+
+def test_sqlite_connection_options_only_apply_to_sqlite(monkeypatch):
+    engine = database._create_engine("sqlite://")
+    assert event.contains(engine, "connect", database.enable_sqlite_foreign_keys)
+    engine.dispose()
+
+    created = {}
+
+    def fake_create_engine(url, **kwargs):
+        created.update(kwargs, url=url)
+        return object()  # no Postgres driver here; nothing may touch it
+
+    monkeypatch.setattr(database, "create_engine", fake_create_engine)
+    database._create_engine("postgresql://replica.internal/agents")
+    assert created["connect_args"] == {}
+
+
+def test_read_session_rejects_writes(read_session_factory):
+    db = read_session_factory()
+    try:
+        with pytest.raises(OperationalError, match="readonly"):
+            db.execute(text("DELETE FROM tools"))
+    finally:
+        db.close()
+
+
+def test_get_served_from_read_side(client, session_factory, monkeypatch):
+    db = session_factory()
+    db.add(Tool(tenant_id="tenant_a", name="search", description="web search"))
+    db.commit()
+    db.close()
+
+    used = []
+    read_factory = deps.ReadSessionLocal
+
+    def tracking_read_factory():
+        used.append("read")
+        return read_factory()
+
+    monkeypatch.setattr(deps, "ReadSessionLocal", tracking_read_factory)
+
+    res = client.get("/tools", headers=TENANT_A)
+    assert res.status_code == 200
+    assert [t["name"] for t in res.json()] == ["search"]
+    assert used == ["read"]
+
+
+def test_read_your_writes_window(client, monkeypatch):
+    res = client.post(
+        "/tools",
+        json={"name": "calc", "description": "calculator"},
+        headers=TENANT_A,
+    )
+    assert res.status_code == 201
+    assert wrote_recently("tenant_a")
+    assert not wrote_recently("tenant_b")
+
+    used = []
+    read_factory = deps.ReadSessionLocal
+    monkeypatch.setattr(
+        deps, "ReadSessionLocal", lambda: used.append("read") or read_factory()
+    )
+
+    # Within the window the writer's own read goes to the write side.
+    assert client.get("/tools", headers=TENANT_A).json()[0]["name"] == "calc"
+    assert used == []
+
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 0.0)
+    assert client.get("/tools", headers=TENANT_A).status_code == 200
+    assert used == ["read"]
+
+
+def test_failed_write_is_not_recorded(client):
+    res = client.put(
+        "/tools/999", json={"name": "x", "description": "y"}, headers=TENANT_A
+    )
+    assert res.status_code == 404
+    assert not wrote_recently("tenant_a")
+
+
+def test_runs_do_not_hold_a_writer_connection_during_llm_call(
+    client, tmp_path, monkeypatch
+):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'writer.db'}",
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.5,
+    )
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(deps, "SessionLocal", sessionmaker(bind=engine))
+
+    def slow_llm(model, prompt):
+        time.sleep(1)
+        return "ok"
+
+    monkeypatch.setattr(runs_service, "mock_llm_complete", slow_llm)
+    agent_id = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=TENANT_A,
+    ).json()["id"]
+
+    def run():
+        return client.post(
+            f"/agents/{agent_id}/run",
+            json={"task": "hello", "model": "gpt-4o"},
+            headers=TENANT_A,
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert list(pool.map(lambda _: run(), range(3))) == [200, 200, 200]
+    engine.dispose()
@@ -0,0 +1,207 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from app import rate_limit, replay
+from app.prompts import build_prompt, task_from_prompt
+from scripts.backfill_tasks import backfill
+from tests.conftest import TENANT_A, TENANT_B
+
+
+@pytest.fixture(autouse=True)
+def inline_replays(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 1000)
+
+    # Finish each job before the request returns, still off the request thread.
+    def start(*args):
+        worker = threading.Thread(target=replay.runner.run, args=args)
+        worker.start()
+        worker.join()
+
+    monkeypatch.setattr(replay.runner, "start", start)
+
+
+def _agent(client, name="a", headers=TENANT_A):
+    return client.post(
+        "/agents",
+        json={"name": name, "role": "r", "description": "d", "tool_ids": []},
+        headers=headers,
+    ).json()["id"]
+
+
+def _run(client, agent_id, task, model="gpt-4o", headers=TENANT_A):
+    return client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": task, "model": model},
+        headers=headers,
+    ).json()
+
+
+def test_task_is_stored_with_the_run(client):
+    agent_id = _agent(client)
+    _run(client, agent_id, "summarise the report")
+
+    item = client.get(
+        f"/agents/{agent_id}/runs", params={"fields": "task"}, headers=TENANT_A
+    ).json()["items"][0]
+
+    assert item["task"] == "summarise the report"
+
+
+def test_task_from_prompt_round_trips():
+    agent = SimpleNamespace(name="a", role="r", description="d", tool_names=["x"])
+
+    assert task_from_prompt(build_prompt(agent, "line 1\n\nTask: 2")) == (
+        "line 1\n\nTask: 2"
+    )
+    assert task_from_prompt(build_prompt(agent, "")) == ""
+    assert task_from_prompt("free-form prompt") is None
+
+
+def test_backfill_recovers_tasks_from_prompts(client, session_factory):
+    agent_id = _agent(client)
+    _run(client, agent_id, "old task")
+    engine = session_factory.kw["bind"]
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE agent_executions SET task = NULL"))
+
+    assert backfill(engine, batch_size=1, pause=0) == 1
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT task FROM agent_executions")).scalar() == (
+            "old task"
+        )
+
+
+def test_replay_runs_matching_tasks_against_the_target_model(client):
+    agent_id = _agent(client)
+    other_id = _agent(client, "b")
+    runs = [_run(client, agent_id, f"task {i}") for i in range(3)]
+    _run(client, other_id, "other agent")
+
+    res = client.post(
+        "/replays",
+        json={"target_model": "gpt-4o", "agent_id": agent_id, "source_model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+    assert res.status_code == 201
+    assert res.json()["total"] == 3
+
+    job = client.get(f"/replays/{res.json()['id']}", headers=TENANT_A).json()
+    assert job["status"] == "completed"
+    assert (job["processed"], job["failed"]) == (3, 0)
+    assert job["started_at"] and job["finished_at"]
+
+    results = client.get(
+        f"/replays/{job['id']}/results", params={"limit": 2}, headers=TENANT_A
+    ).json()
+    assert len(results["items"]) == 2
+    # Same model, same agent: the rebuilt prompt matches the original one.
+    assert [r["response"] for r in results["items"]] == [
+        r["response"] for r in runs[:2]
+    ]
+    rest = client.get(
+        f"/replays/{job['id']}/results",
+        params={"after": results["next_after"]},
+        headers=TENANT_A,
+    ).json()
+    assert len(rest["items"]) == 1
+    assert rest["next_after"] is None
+
+
+def test_replay_filters_on_source_model(client):
+    _run(client, _agent(client), "task")
+
+    job = client.post(
+        "/replays",
+        json={"target_model": "gpt-4o", "source_model": "other"},
+        headers=TENANT_A,
+    ).json()
+    job = client.get(f"/replays/{job['id']}", headers=TENANT_A).json()
+
+    assert (job["total"], job["status"]) == (0, "completed")
+
+
+def test_replay_skips_conversation_turns(client):
+    agent_id = _agent(client)
+    _run(client, agent_id, "single run")
+    conversation = client.post(
+        f"/agents/{agent_id}/conversations", json={"model": "gpt-4o"}, headers=TENANT_A
+    ).json()
+    client.post(
+        f"/conversations/{conversation['id']}/turns",
+        json={"message": "hello"},
+        headers=TENANT_A,
+    )
+
+    job = client.post(
+        "/replays", json={"target_model": "gpt-4o"}, headers=TENANT_A
+    ).json()
+
+    assert job["total"] == 1
+
+
+def test_replay_jobs_are_tenant_scoped(client):
+    agent_id = _agent(client)
+    _run(client, agent_id, "mine")
+    _run(client, _agent(client, headers=TENANT_B), "theirs", headers=TENANT_B)
+
+    job = client.post(
+        "/replays", json={"target_model": "gpt-4o"}, headers=TENANT_A
+    ).json()
+
+    assert job["total"] == 1
+    assert client.get(f"/replays/{job['id']}", headers=TENANT_B).status_code == 404
+    assert (
+        client.get(f"/replays/{job['id']}/results", headers=TENANT_B).json()["items"]
+        == []
+    )
+
+
+def test_replay_validates_the_request(client):
+    agent_id = _agent(client, headers=TENANT_B)
+
+    unknown_model = client.post(
+        "/replays", json={"target_model": "nope"}, headers=TENANT_A
+    )
+    foreign_agent = client.post(
+        "/replays",
+        json={"target_model": "gpt-4o", "agent_id": agent_id},
+        headers=TENANT_A,
+    )
+    empty_range = client.post(
+        "/replays",
+        json={
+            "target_model": "gpt-4o",
+            "created_from": "2024-01-02T00:00:00",
+            "created_to": "2024-01-01T00:00:00",
+        },
+        headers=TENANT_A,
+    )
+
+    assert unknown_model.status_code == 400
+    assert foreign_agent.status_code == 400
+    assert empty_range.status_code == 400
+
+
+def test_replay_accepts_offset_aware_ranges(client):
+    _run(client, _agent(client), "recent")
+    now = datetime.now(timezone.utc)
+    # As UTC+2 wall clock time: dropping the offset instead of converting
+    # would put the start of the range in the future.
+    start = (now - timedelta(minutes=10)).astimezone(timezone(timedelta(hours=2)))
+
+    res = client.post(
+        "/replays",
+        json={
+            "target_model": "gpt-4o",
+            "created_from": start.isoformat(),
+            "created_to": (now + timedelta(minutes=10)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        },
+        headers=TENANT_A,
+    )
+
+    assert res.status_code == 201
+    assert res.json()["total"] == 1
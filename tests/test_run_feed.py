@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app import rate_limit, run_feed
+from app.api.routers import runs as runs_router
+from tests.conftest import TENANT_A, TENANT_B
+
+
+@pytest.fixture(autouse=True)
+def short_streams(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 1000)
+    monkeypatch.setattr(runs_router, "STREAM_MAX_SECONDS", 0.6)
+    monkeypatch.setattr(runs_router, "STREAM_HEARTBEAT_SECONDS", 0.2)
+
+
+def _agent(client, headers=TENANT_A):
+    return client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=headers,
+    ).json()["id"]
+
+
+def _run(client, agent_id, task, headers=TENANT_A):
+    client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": task, "model": "gpt-4o"},
+        headers=headers,
+    )
+
+
+def _later(delay, fn, *args):
+    """Call fn(*args) from another thread after `delay` seconds."""
+    thread = threading.Thread(target=lambda: (time.sleep(delay), fn(*args)))
+    thread.start()
+    return thread
+
+
+def _events(body: str) -> list[dict]:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if ": " in line
+        )
+        if fields.get("event") == "run":
+            events.append({"id": int(fields["id"]), **json.loads(fields["data"])})
+    return events
+
+
+def test_long_poll_returns_a_new_run_as_soon_as_it_is_stored(client):
+    agent_id = _agent(client)
+    writer = _later(0.2, _run, client, agent_id, "fresh")
+
+    started = time.perf_counter()
+    res = client.get(
+        f"/agents/{agent_id}/runs/changes",
+        params={"after": 0, "wait": 5},
+        headers=TENANT_A,
+    )
+    writer.join()
+
+    assert res.status_code == 200
+    assert time.perf_counter() - started < 2
+    body = res.json()
+    assert [i["prompt"].count("Task: fresh") for i in body["items"]] == [1]
+    assert body["last_id"] == body["items"][0]["id"]
+    assert "task" not in body["items"][0]
+
+
+def test_long_poll_catches_up_without_waiting(client):
+    agent_id = _agent(client)
+    for i in range(3):
+        _run(client, agent_id, f"t{i}")
+    first = client.get(
+        f"/agents/{agent_id}/runs/changes",
+        params={"after": 0, "wait": 0},
+        headers=TENANT_A,
+    ).json()
+
+    rest = client.get(
+        f"/agents/{agent_id}/runs/changes",
+        params={"after": first["items"][0]["id"], "wait": 0},
+        headers=TENANT_A,
+    ).json()
+    idle = client.get(
+        f"/agents/{agent_id}/runs/changes",
+        params={"after": rest["last_id"], "wait": 0.1},
+        headers=TENANT_A,
+    ).json()
+
+    assert len(first["items"]) == 3
+    assert [i["id"] for i in rest["items"]] == [i["id"] for i in first["items"][1:]]
+    assert idle == {"items": [], "last_id": rest["last_id"]}
+    assert run_feed.feed.stats()["subscribers"] == 0
+
+
+def test_stream_resumes_after_the_last_event_id_and_pushes_new_runs(client):
+    agent_id = _agent(client)
+    _run(client, agent_id, "seen before")
+    _run(client, agent_id, "missed")
+    seen = client.get(
+        f"/agents/{agent_id}/runs/changes", params={"after": 0}, headers=TENANT_A
+    ).json()["items"][0]["id"]
+    writer = _later(0.2, _run, client, agent_id, "live")
+
+    res = client.get(
+        f"/agents/{agent_id}/runs/stream",
+        headers={**TENANT_A, "Last-Event-ID": str(seen)},
+    )
+    writer.join()
+
+    assert res.headers["content-type"].startswith("text/event-stream")
+    assert res.text.startswith("retry: ")
+    tasks = [e["prompt"].split("Task: ")[1].splitlines()[0] for e in _events(res.text)]
+    assert tasks == ["missed", "live"]
+    assert ": heartbeat" in res.text
+    assert run_feed.feed.stats()["subscribers"] == 0
+
+
+def test_feeds_are_tenant_scoped(client):
+    agent_id = _agent(client)
+    _later(0.1, _run, client, agent_id, "private").join()
+
+    res = client.get(
+        f"/agents/{agent_id}/runs/changes",
+        params={"after": 0, "wait": 0},
+        headers=TENANT_B,
+    )
+
+    assert res.json()["items"] == []
+
+
+def test_subscriptions_are_capped(client, monkeypatch):
+    monkeypatch.setattr(run_feed.feed, "max_subscribers", 0)
+
+    res = client.get(
+        "/agents/1/runs/changes", params={"after": 0, "wait": 0}, headers=TENANT_A
+    )
+
+    assert res.status_code == 503
@@ -0,0 +1,112 @@
+from sqlalchemy import event
+
+from app import compression, rate_limit
+from tests.conftest import TENANT_A
+
+
+def _agent_with_runs(client, runs, task="t"):
+    agent_id = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=TENANT_A,
+    ).json()["id"]
+    for i in range(runs):
+        client.post(
+            f"/agents/{agent_id}/run",
+            json={"task": f"{task} {i}", "model": "gpt-4o"},
+            headers=TENANT_A,
+        )
+    return agent_id
+
+
+def test_default_listing_is_unchanged(client):
+    agent_id = _agent_with_runs(client, 1)
+
+    item = client.get(f"/agents/{agent_id}/runs", headers=TENANT_A).json()["items"][0]
+
+    assert set(item) == {
+        "id",
+        "model",
+        "prompt",
+        "response",
+        "prompt_tokens",
+        "response_tokens",
+        "status",
+        "created_at",
+    }
+
+
+def test_fields_are_pushed_down_into_the_query(
+    client, session_factory, read_session_factory
+):
+    agent_id = _agent_with_runs(client, 2)
+    statements = []
+    # Recent writers read from the write side, so watch both engines.
+    engines = [f.kw["bind"] for f in (session_factory, read_session_factory)]
+    listener = lambda conn, cursor, sql, *a: statements.append(sql)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", listener)
+    try:
+        res = client.get(
+            f"/agents/{agent_id}/runs",
+            params={"fields": "model,created_at"},
+            headers=TENANT_A,
+        )
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", listener)
+
+    assert res.status_code == 200
+    assert [set(i) for i in res.json()["items"]] == [{"id", "model", "created_at"}] * 2
+    page = statements[-1]
+    assert "prompt" not in page and "response" not in page
+
+
+def test_snippet_is_cut_in_sql(client):
+    agent_id = _agent_with_runs(client, 1)
+    full = client.get(f"/agents/{agent_id}/runs", headers=TENANT_A).json()["items"][0]
+
+    res = client.get(
+        f"/agents/{agent_id}/runs",
+        params={"fields": "snippet", "snippet_len": 10},
+        headers=TENANT_A,
+    )
+
+    assert res.json()["items"] == [{"id": full["id"], "snippet": full["response"][:10]}]
+
+
+def test_invalid_fields_and_snippet_len_are_rejected(client):
+    agent_id = _agent_with_runs(client, 0)
+    for params in ({"fields": "model,secret"}, {"snippet_len": 0}):
+        res = client.get(f"/agents/{agent_id}/runs", params=params, headers=TENANT_A)
+        assert res.status_code == 400
+
+
+def test_large_responses_are_compressed(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 100)
+    agent_id = _agent_with_runs(client, 20, task="a fairly long task " * 20)
+    url = f"/agents/{agent_id}/runs"
+
+    big = client.get(url, headers={**TENANT_A, "Accept-Encoding": "gzip"})
+    small = client.get(
+        url,
+        params={"fields": "status", "limit": 1},
+        headers={**TENANT_A, "Accept-Encoding": "gzip"},
+    )
+    plain = client.get(url, headers={**TENANT_A, "Accept-Encoding": "identity"})
+
+    assert big.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in big.headers["vary"].lower()
+    assert int(big.headers["content-length"]) < len(big.content)
+    assert big.json() == plain.json()
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in plain.headers
+
+
+def test_brotli_is_preferred_when_installed(monkeypatch):
+    assert compression.choose_encoding("gzip;q=0, deflate") is None
+    monkeypatch.setattr(compression, "brotli", None)
+    assert compression.choose_encoding("br, gzip") == "gzip"
+    monkeypatch.setattr(compression, "brotli", object())
+    assert compression.choose_encoding("gzip, br") == "br"
+    assert compression.choose_encoding("gzip, br;q=0") == "gzip"
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from app import scheduler
+from app.core.errors import OverloadedError
+from app.scheduler import FairScheduler, parse_weights
+from tests.conftest import TENANT_A, TENANT_B
+
+
+def _hold(sched: FairScheduler, tenant_id: str, model: str = "m"):
+    """Take a slot in a thread and keep it until the returned event is set."""
+    taken, release = threading.Event(), threading.Event()
+
+    def body():
+        taken.set()
+        release.wait()
+
+    t = threading.Thread(target=lambda: sched.run(tenant_id, model, body))
+    t.start()
+    assert taken.wait(1)
+    return release, t
+
+
+def _enqueue(sched, tenant_id, order, model="m"):
+    t = threading.Thread(
+        target=lambda: sched.run(tenant_id, model, lambda: order.append(tenant_id))
+    )
+    t.start()
+    return t
+
+
+def _wait_queued(sched, n):
+    deadline = time.monotonic() + 1
+    while sched.stats()["queued"] < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_parse_weights():
+    assert parse_weights("a=2, b=0.5,") == {"a": 2.0, "b": 0.5}
+    assert parse_weights("") == {}
+
+
+def test_small_tenant_is_not_queued_behind_a_flood():
+    sched = FairScheduler(capacity=1, tenant_limit=1, model_limit=1)
+    release, holder = _hold(sched, "big")
+    order = []
+
+    threads = [_enqueue(sched, "big", order) for _ in range(5)]
+    _wait_queued(sched, 5)
+    threads.append(_enqueue(sched, "small", order))
+    _wait_queued(sched, 6)
+
+    release.set()
+    for t in [holder, *threads]:
+        t.join()
+
+    assert order.index("small") <= 1
+    assert sched.stats()["tenants"]["small"]["calls"] == 1
+
+
+def test_weights_split_slots_proportionally():
+    sched = FairScheduler(capacity=1, tenant_limit=1, model_limit=1, weights={"a": 2})
+    release, holder = _hold(sched, "warmup")
+    order = []
+
+    threads = []
+    for _ in range(6):
+        threads.append(_enqueue(sched, "a", order))
+        threads.append(_enqueue(sched, "b", order))
+    _wait_queued(sched, 12)
+
+    release.set()
+    for t in [holder, *threads]:
+        t.join()
+
+    assert order[:6].count("a") == 4
+    assert order[:6].count("b") == 2
+
+
+def test_tenant_and_model_caps():
+    sched = FairScheduler(capacity=10, tenant_limit=1, model_limit=2)
+    release_a, holder_a = _hold(sched, "a", model="x")
+    order = []
+
+    # Tenant "a" is at its cap; "b" may still use model "x" up to two calls.
+    blocked = _enqueue(sched, "a", order, model="y")
+    _wait_queued(sched, 1)
+    release_b, holder_b = _hold(sched, "b", model="x")
+    blocked_model = _enqueue(sched, "c", order, model="x")
+    _wait_queued(sched, 2)
+    assert sched.stats()["running"] == 2
+    assert order == []
+
+    release_a.set()
+    release_b.set()
+    for t in (holder_a, holder_b, blocked, blocked_model):
+        t.join()
+    assert sorted(order) == ["a", "c"]
+    assert sched.stats()["running"] == 0
+
+
+def test_run_endpoint_goes_through_scheduler(client, monkeypatch):
+    sched = FairScheduler()
+    monkeypatch.setattr(scheduler, "llm_scheduler", sched)
+    monkeypatch.setattr(scheduler, "ENABLED", True)
+
+    agent = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=TENANT_A,
+    ).json()
+    res = client.post(
+        f"/agents/{agent['id']}/run",
+        json={"task": "hello", "model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+    assert res.status_code == 200
+
+    stats = client.get("/metrics", headers=TENANT_A).json()["llm_scheduling"]
+    assert stats["tenants"]["tenant_a"]["calls"] == 1
+    assert stats["running"] == stats["queued"] == 0
+
+    # Other tenants only get the aggregate counts; anonymous callers nothing.
+    other = client.get("/metrics", headers=TENANT_B).json()["llm_scheduling"]
+    assert other["tenants"] == {}
+    assert client.get("/metrics").status_code == 401
+
+
+def test_queued_call_times_out_with_overloaded_error():
+    sched = FairScheduler(capacity=1, queue_timeout=0.1)
+    release, holder = _hold(sched, "a")
+
+    with pytest.raises(OverloadedError):
+        sched.acquire("b", "m")
+
+    stats = sched.stats()
+    assert stats["queued"] == 0
+    assert stats["tenants"]["b"]["abandoned"] == 1
+    release.set()
+    holder.join()
+    assert sched.stats()["running"] == 0
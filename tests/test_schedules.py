@@ -0,0 +1,146 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app import quotas, rate_limit, schedules
+from app.repositories.runs_repo import RunsRepository
+from tests.conftest import TENANT_A, TENANT_B
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 1000)
+
+
+@pytest.fixture
+def runner():
+    # Driven by the tests with dispatch(); its thread is never started.
+    return schedules.ScheduleRunner(tenants=lambda: ["tenant_a"], workers=2)
+
+
+def _agent(client, name="a", headers=TENANT_A):
+    return client.post(
+        "/agents",
+        json={"name": name, "role": "r", "description": "d", "tool_ids": []},
+        headers=headers,
+    ).json()["id"]
+
+
+def _schedule(client, agent_id, task, interval=3600, headers=TENANT_A):
+    res = client.post(
+        f"/agents/{agent_id}/schedules",
+        json={"task": task, "model": "gpt-4o", "interval_seconds": interval},
+        headers=headers,
+    )
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+def _make_due(session_factory):
+    with session_factory() as db:
+        db.execute(text("UPDATE agent_schedules SET next_fire_at = 0"))
+        db.commit()
+
+
+def _tasks(client, agent_id):
+    res = client.get(f"/agents/{agent_id}/runs?fields=task", headers=TENANT_A)
+    return sorted(r["task"] for r in res.json()["items"])
+
+
+def test_fire_times_are_jittered_but_keep_their_period(client):
+    agent_id = _agent(client)
+    created = [_schedule(client, agent_id, f"task {i}") for i in range(5)]
+
+    offsets = {s["offset_seconds"] for s in created}
+    assert len(offsets) > 1
+    assert all(0 <= o < schedules.MAX_JITTER_SECONDS for o in offsets)
+    for s in created:
+        next_fire = datetime.fromisoformat(s["next_fire_at"])
+        since_epoch = (next_fire - datetime(1970, 1, 1)).total_seconds()
+        assert since_epoch % 3600 == s["offset_seconds"]
+        assert 0 < (next_fire - datetime.utcnow()).total_seconds() <= 3600
+        assert s["offset_seconds"] == schedules.jitter("tenant_a", s["id"], 3600)
+
+
+def test_due_schedules_run_in_one_batch_per_agent(
+    client, session_factory, runner, monkeypatch
+):
+    batches = []
+    create_many = RunsRepository.create_many
+
+    def spy(self, tenant_id, agent_id, runs):
+        batches.append((agent_id, len(runs)))
+        return create_many(self, tenant_id, agent_id, runs)
+
+    monkeypatch.setattr(RunsRepository, "create_many", spy)
+    first, second = _agent(client), _agent(client, "b")
+    for i in range(3):
+        _schedule(client, first, f"first {i}")
+    _schedule(client, second, "second")
+    _make_due(session_factory)
+
+    assert runner.dispatch("tenant_a", wait=True) == 4
+
+    assert sorted(batches) == sorted([(first, 3), (second, 1)])
+    assert _tasks(client, first) == ["first 0", "first 1", "first 2"]
+    assert _tasks(client, second) == ["second"]
+    listed = client.get(f"/agents/{first}/schedules", headers=TENANT_A).json()
+    for s in listed:
+        assert datetime.fromisoformat(s["next_fire_at"]) > datetime.utcnow()
+        assert s["last_fired_at"] is not None
+    assert runner.dispatch("tenant_a", wait=True) == 0
+    assert runner.stats()["stored"] == 4
+
+
+def test_tenant_concurrency_limit_defers_the_rest(client, session_factory):
+    runner = schedules.ScheduleRunner(workers=2, tenant_limit=2)
+    agent_id = _agent(client)
+    for i in range(3):
+        _schedule(client, agent_id, f"task {i}")
+    _make_due(session_factory)
+
+    assert runner.dispatch("tenant_a", wait=True) == 2
+    assert runner.dispatch("tenant_a", wait=True) == 1
+    assert len(_tasks(client, agent_id)) == 3
+
+
+def test_runs_over_quota_are_skipped(client, session_factory, runner, monkeypatch):
+    tracker = quotas.UsageTracker(
+        {("runs", "day"): {"tenant_a": 1}}, tenants=lambda: ["tenant_a"]
+    )
+    monkeypatch.setattr(quotas, "tracker", tracker)
+    agent_id = _agent(client)
+    _schedule(client, agent_id, "one")
+    _schedule(client, agent_id, "two")
+    _make_due(session_factory)
+
+    assert runner.dispatch("tenant_a", wait=True) == 2
+
+    assert len(_tasks(client, agent_id)) == 1
+    assert runner.stats()["skipped"] == 1
+    assert tracker.usage("tenant_a")["day"]["runs"] == 1
+
+
+def test_schedules_are_validated_and_tenant_scoped(client):
+    agent_id = _agent(client)
+    url = f"/agents/{agent_id}/schedules"
+    body = {"task": "t", "model": "gpt-4o", "interval_seconds": 3600}
+
+    assert (
+        client.post(
+            url, json={**body, "interval_seconds": 10}, headers=TENANT_A
+        ).status_code
+        == 400
+    )
+    assert (
+        client.post(url, json={**body, "model": "nope"}, headers=TENANT_A).status_code
+        == 400
+    )
+    assert client.post(url, json=body, headers=TENANT_B).status_code == 404
+    schedule = _schedule(client, agent_id, "t")
+
+    assert client.get(url, headers=TENANT_B).status_code == 404
+    assert client.delete(f"{url}/{schedule['id']}", headers=TENANT_B).status_code == 404
+    assert client.delete(f"{url}/{schedule['id']}", headers=TENANT_A).status_code == 204
+    assert client.get(url, headers=TENANT_A).json() == []
@@ -0,0 +1,94 @@
+from sqlalchemy import text
+
+from app import rate_limit
+from scripts.backfill_search_index import backfill
+from tests.conftest import TENANT_A, TENANT_B
+
+
+def _agent(client, headers=TENANT_A):
+    return client.post(
+        "/agents",
+        json={"name": "runner", "role": "r", "description": "d"},
+        headers=headers,
+    ).json()["id"]
+
+
+def _run(client, agent_id, task, headers=TENANT_A):
+    r = client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": task, "model": "gpt-4o"},
+        headers=headers,
+    )
+    assert r.status_code == 200
+
+
+def _search(client, q, headers=TENANT_A, **params):
+    return client.get("/runs/search", params={"q": q, **params}, headers=headers)
+
+
+def test_search_is_tenant_scoped(client):
+    a = _agent(client)
+    b = _agent(client, TENANT_B)
+    _run(client, a, "summarize the quarterly invoices")
+    _run(client, a, "draft a welcome email")
+    _run(client, b, "reconcile invoices", headers=TENANT_B)
+
+    items = _search(client, "invoices").json()["items"]
+    assert len(items) == 1
+    assert "quarterly" in items[0]["prompt"]
+    assert items[0]["agent_id"] == a
+
+
+def test_search_paginates_with_cursor(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 100)
+    agent_id = _agent(client)
+    for i in range(5):
+        _run(client, agent_id, "invoice " * (i + 1))
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = _search(client, "invoice", **params).json()
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 5
+    # bm25 favours rows with more occurrences of the term
+    assert seen[0] == max(seen)
+
+
+def test_deleted_agent_runs_leave_index(client):
+    agent_id = _agent(client)
+    _run(client, agent_id, "invoices")
+    client.delete(f"/agents/{agent_id}", headers=TENANT_A)
+    assert _search(client, "invoices").json()["items"] == []
+
+
+def test_invalid_query_and_cursor(client):
+    assert _search(client, "***").status_code == 400
+    assert _search(client, "x", cursor="not-a-cursor").status_code == 400
+
+
+def test_backfill_indexes_rows_below_watermark(client, session_factory):
+    agent_id = _agent(client)
+    for task in ("alpha", "beta", "gamma"):
+        _run(client, agent_id, f"{task} report")
+
+    # Pretend these rows predate the index.
+    engine = session_factory.kw["bind"]
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO agent_executions_fts(agent_executions_fts) "
+                "VALUES ('delete-all')"
+            )
+        )
+        conn.execute(
+            text("UPDATE search_index_backfill SET watermark = 3, position = 0")
+        )
+    assert _search(client, "report").json()["items"] == []
+
+    assert backfill(engine, batch_size=2, pause=0) == 3
+    assert len(_search(client, "report").json()["items"]) == 3
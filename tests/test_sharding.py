@@ -0,0 +1,208 @@
+import pytest
+from sqlalchemy import func, select
+
+from app import quotas, webhooks
+from app.core.errors import OverloadedError
+from app.db import interning, shards
+from app.db.models import (
+    AgentSchedule,
+    TenantUsage,
+    Tool,
+    Webhook,
+    WebhookDelivery,
+)
+from scripts.move_tenant import move_tenant, purge
+from tests.conftest import TENANT_A, TENANT_B
+
+
+@pytest.fixture
+def registry(session_factory, tmp_path, monkeypatch):
+    registry = shards.ShardRegistry(
+        session_factory.kw["bind"],
+        url_template=f"sqlite:///{tmp_path}/shards/{{tenant_id}}.db",
+    )
+    monkeypatch.setattr(shards, "ENABLED", True)
+    monkeypatch.setattr(shards, "registry", registry)
+
+    yield registry
+
+    registry.dispose()
+
+
+def _tool_names(registry, tenant_id):
+    url, _ = registry.lookup(tenant_id)
+    with registry.engine(url).connect() as conn:
+        return sorted(conn.execute(select(Tool.name)).scalars())
+
+
+# Tenant tables besides tools, agents and runs that a move must carry over.
+_TENANT_TABLES = (Webhook, WebhookDelivery, TenantUsage, AgentSchedule)
+
+
+def _tenant_rows(registry, url, tenant_id) -> dict[str, int]:
+    with registry.engine(url).connect() as conn:
+        return {
+            model.__tablename__: conn.execute(
+                select(func.count())
+                .select_from(model)
+                .where(model.tenant_id == tenant_id)
+            ).scalar()
+            for model in _TENANT_TABLES
+        }
+
+
+def _create_agent_with_runs(client, headers, runs):
+    agent = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=headers,
+    ).json()
+    for i in range(runs):
+        res = client.post(
+            f"/agents/{agent['id']}/run",
+            json={"task": f"task {i}", "model": "gpt-4o"},
+            headers=headers,
+        )
+        assert res.status_code == 200
+    return agent
+
+
+def test_tenants_live_in_separate_shards(client, registry, tmp_path):
+    client.post("/tools", json={"name": "a-tool", "description": "x"}, headers=TENANT_A)
+    client.post("/tools", json={"name": "b-tool", "description": "x"}, headers=TENANT_B)
+
+    assert (tmp_path / "shards" / "tenant_a.db").exists()
+    assert _tool_names(registry, "tenant_a") == ["a-tool"]
+    assert _tool_names(registry, "tenant_b") == ["b-tool"]
+    assert [t["name"] for t in client.get("/tools", headers=TENANT_B).json()] == [
+        "b-tool"
+    ]
+
+
+def test_registry_bounds_open_engines(session_factory, tmp_path):
+    registry = shards.ShardRegistry(
+        session_factory.kw["bind"],
+        url_template=f"sqlite:///{tmp_path}/{{tenant_id}}.db",
+        max_open=1,
+    )
+    first = registry.engine(registry.default_url("t1"))
+    registry.engine(registry.default_url("t2"))
+
+    assert registry.stats() == {"open": 1, "max_open": 1}
+    assert registry.engine(registry.default_url("t1")) is not first
+    registry.dispose()
+
+
+def test_frozen_tenant_rejects_writes_but_serves_reads(client, registry):
+    client.post("/tools", json={"name": "calc", "description": "x"}, headers=TENANT_A)
+    registry.assign("tenant_a", registry.default_url("tenant_a"), frozen=True)
+
+    res = client.post(
+        "/tools", json={"name": "other", "description": "x"}, headers=TENANT_A
+    )
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert client.get("/tools", headers=TENANT_A).status_code == 200
+    assert (
+        client.post(
+            "/tools", json={"name": "b", "description": "x"}, headers=TENANT_B
+        ).status_code
+        == 201
+    )
+
+
+def test_move_tenant(client, registry, tmp_path):
+    agent = _create_agent_with_runs(client, TENANT_A, runs=4)
+    before = client.get(f"/agents/{agent['id']}/runs", headers=TENANT_A).json()
+    target = f"sqlite:///{tmp_path}/moved.db"
+    with registry.engine(target).begin() as conn:
+        # Dictionary ids are per shard, so copied runs must be remapped.
+        interning.tenants.ensure(conn, "someone_else")
+        interning.models.ensure(conn, "another-model")
+
+    copied = move_tenant(registry, "tenant_a", target, batch_size=2, pause=0, settle=0)
+
+    assert copied == 4
+    assert registry.lookup("tenant_a") == (target, False)
+    assert client.get(f"/agents/{agent['id']}/runs", headers=TENANT_A).json() == before
+    # Copied runs are indexed on the new shard as well.
+    hits = client.get("/runs/search", params={"q": "task"}, headers=TENANT_A).json()
+    assert len(hits["items"]) == 4
+
+    res = client.post(
+        f"/agents/{agent['id']}/run",
+        json={"task": "after move", "model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+    assert res.status_code == 200
+    assert (
+        client.get(f"/agents/{agent['id']}/runs", headers=TENANT_A).json()["total"] == 5
+    )
+
+
+def test_move_and_purge_cover_every_tenant_table(
+    client, registry, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(webhooks, "ALLOW_PRIVATE", True)
+    source = registry.default_url("tenant_a")
+    client.post("/webhooks", json={"url": "http://127.0.0.1:9/hook"}, headers=TENANT_A)
+    agent = _create_agent_with_runs(client, TENANT_A, runs=2)
+    client.post(
+        f"/agents/{agent['id']}/schedules",
+        json={"task": "t", "model": "gpt-4o", "interval_seconds": 3600},
+        headers=TENANT_A,
+    )
+    tracker = quotas.UsageTracker({}, tenants=lambda: ["tenant_a"])
+    tracker.reserve("tenant_a")
+    tracker.sync()
+    before = _tenant_rows(registry, source, "tenant_a")
+    assert before == {
+        "webhooks": 1,
+        "webhook_deliveries": 2,
+        "tenant_usage": 2,
+        "agent_schedules": 1,
+    }
+
+    target = f"sqlite:///{tmp_path}/moved.db"
+    move_tenant(registry, "tenant_a", target, pause=0, settle=0)
+    assert _tenant_rows(registry, target, "tenant_a") == before
+
+    purge(registry, source, "tenant_a")
+    assert set(_tenant_rows(registry, source, "tenant_a").values()) == {0}
+    assert len(client.get("/webhooks", headers=TENANT_A).json()) == 1
+
+
+def test_write_started_before_freeze_cannot_commit_to_old_shard(client, registry):
+    client.post("/tools", json={"name": "a", "description": "x"}, headers=TENANT_A)
+    db = registry.write_session("tenant_a")
+    db.add(Tool(tenant_id="tenant_a", name="late", description="x"))
+
+    registry.assign("tenant_a", registry.default_url("tenant_a"), frozen=True)
+    with pytest.raises(OverloadedError):
+        db.commit()
+    db.close()
+
+    registry.assign("tenant_a", registry.default_url("tenant_a"))
+    assert _tool_names(registry, "tenant_a") == ["a"]
+
+
+def test_frozen_agent_write_returns_503(client, registry):
+    registry.assign("tenant_a", registry.default_url("tenant_a"))
+    agent = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=TENANT_A,
+    ).json()
+
+    # Freeze between the session being opened and the commit.
+    real = registry.write_session
+
+    def freeze_after_open(tenant_id):
+        db = real(tenant_id)
+        registry.assign(tenant_id, registry.default_url(tenant_id), frozen=True)
+        return db
+
+    registry.write_session = freeze_after_open
+    res = client.delete(f"/agents/{agent['id']}", headers=TENANT_A)
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
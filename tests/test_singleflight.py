@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import deadlines, singleflight
+from app.core.errors import DeadlineExceededError
+from app.services import runs_service
+from app.singleflight import SingleFlight
+from tests.conftest import TENANT_A
+
+
+def _slow_counter(calls: list, delay: float = 0.2):
+    def fn():
+        calls.append(1)
+        time.sleep(delay)
+        return "result"
+
+    return fn
+
+
+def test_concurrent_sync_calls_share_one_flight():
+    sf = SingleFlight()
+    calls = []
+    fn = _slow_counter(calls)
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(sf.do("k", fn)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["result"] * 5
+    assert sf.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+
+def test_async_and_sync_callers_share_one_flight():
+    sf = SingleFlight()
+    calls = []
+    fn = _slow_counter(calls)
+
+    async def main():
+        sync_result = []
+        t = threading.Thread(target=lambda: sync_result.append(sf.do("k", fn)))
+        t.start()
+        await asyncio.sleep(0.05)
+        results = await asyncio.gather(*(sf.do_async("k", fn) for _ in range(3)))
+        t.join()
+        return sync_result + list(results)
+
+    assert asyncio.run(main()) == ["result"] * 4
+    assert len(calls) == 1
+
+
+def test_errors_propagate_and_release_key():
+    sf = SingleFlight()
+
+    def boom():
+        raise ValueError("boom")
+
+    for _ in range(2):
+        try:
+            sf.do("k", boom)
+        except ValueError:
+            pass
+    assert sf.stats()["in_flight"] == 0
+    assert sf.do("k", lambda: 1) == 1
+
+
+def test_identical_runs_coalesce_but_keep_own_executions(client, monkeypatch):
+    monkeypatch.setattr(singleflight, "ENABLED", True)
+    monkeypatch.setattr(singleflight, "llm_calls", SingleFlight())
+
+    calls = []
+    real = runs_service.mock_llm_complete
+
+    def slow(model, prompt):
+        calls.append(prompt)
+        time.sleep(0.2)
+        return real(model, prompt)
+
+    monkeypatch.setattr(runs_service, "mock_llm_complete", slow)
+
+    agent_id = client.post(
+        "/agents",
+        json={"name": "runner", "role": "r", "description": "d"},
+        headers=TENANT_A,
+    ).json()["id"]
+
+    results = []
+
+    def run():
+        results.append(
+            client.post(
+                f"/agents/{agent_id}/run",
+                json={"task": "same", "model": "gpt-4o"},
+                headers=TENANT_A,
+            )
+        )
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert [r.status_code for r in results] == [200] * 3
+    assert len(calls) == 1
+    assert client.get(f"/agents/{agent_id}/runs", headers=TENANT_A).json()["total"] == 3
+    assert client.get("/metrics", headers=TENANT_A).json()["llm_coalescing"]["coalesced"] == 2
+
+
+def test_follower_gives_up_at_its_own_deadline():
+    sf = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: sf.do("k", lambda: release.wait(5)))
+    leader.start()
+    while sf.stats()["in_flight"] == 0:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    with deadlines.bound(deadlines.Deadline(0.1)):
+        with pytest.raises(DeadlineExceededError):
+            sf.do("k", lambda: "unused")
+    assert time.monotonic() - started < 1
+
+    release.set()
+    leader.join()
+    assert sf.stats()["coalesced"] == 1
@@ -0,0 +1,79 @@
+from app import llm, rate_limit
+from app.llm import estimate_tokens, prompt_budget
+from app.services import runs_service
+from tests.conftest import TENANT_A, TENANT_B
+
+
+def _agent(client, name, description="d", headers=TENANT_A):
+    return client.post(
+        "/agents",
+        json={"name": name, "role": "r", "description": description},
+        headers=headers,
+    ).json()["id"]
+
+
+def _run(client, agent_id, task="t", headers=TENANT_A):
+    return client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": task, "model": "gpt-4o"},
+        headers=headers,
+    )
+
+
+def test_estimate_rounds_up_per_model():
+    assert estimate_tokens("gpt-4o", "") == 0
+    assert estimate_tokens("gpt-4o", "abcd") == 1
+    assert estimate_tokens("gpt-4o", "abcde") == 2
+
+
+def test_runs_store_token_counts_and_usage_ranks_agents(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 100)
+    cheap = _agent(client, "cheap")
+    costly = _agent(client, "costly", description="long " * 200)
+    _run(client, _agent(client, "other", headers=TENANT_B), headers=TENANT_B)
+
+    body = _run(client, costly, task="x" * 400).json()
+    assert body["prompt_tokens"] == estimate_tokens("gpt-4o", body["prompt"])
+    assert body["response_tokens"] == estimate_tokens("gpt-4o", body["response"])
+    cheap_body = _run(client, cheap).json()
+
+    res = client.get("/analytics/tokens", headers=TENANT_A)
+    assert res.status_code == 200, res.text
+    usage = res.json()
+    assert [a["agent_id"] for a in usage["agents"]] == [costly, cheap]
+    expected = sum(
+        b["prompt_tokens"] + b["response_tokens"] for b in (body, cheap_body)
+    )
+    assert usage["tokens"]["total"] == expected
+
+    top = client.get("/analytics/tokens", params={"limit": 1}, headers=TENANT_A)
+    assert [a["agent_id"] for a in top.json()["agents"]] == [costly]
+    assert top.json()["tokens"]["total"] == expected
+
+
+def test_oversized_task_is_truncated_to_fit(client, monkeypatch):
+    monkeypatch.setitem(llm.CONTEXT_TOKENS, "gpt-4o", llm.RESPONSE_TOKEN_RESERVE + 100)
+
+    res = _run(client, _agent(client, "a"), task="word " * 1000)
+
+    assert res.status_code == 200
+    body = res.json()
+    assert llm.TRUNCATION_MARKER in body["prompt"]
+    assert body["prompt_tokens"] <= prompt_budget("gpt-4o")
+
+
+def test_oversized_task_can_be_rejected(client, monkeypatch):
+    monkeypatch.setitem(llm.CONTEXT_TOKENS, "gpt-4o", llm.RESPONSE_TOKEN_RESERVE + 100)
+    monkeypatch.setattr(runs_service, "CONTEXT_OVERFLOW", "reject")
+    calls = []
+    monkeypatch.setattr(
+        runs_service, "mock_llm_complete", lambda *a: calls.append(a) or "r"
+    )
+    agent_id = _agent(client, "a")
+
+    res = _run(client, agent_id, task="word " * 1000)
+
+    assert res.status_code == 400
+    assert "accepts" in res.json()["detail"]
+    assert calls == []
+    assert _run(client, agent_id, task="short").status_code == 200
@@ -0,0 +1,145 @@
+import threading
+
+from sqlalchemy import select
+
+from app.db.models import ExecutionStep
+from app.tools import ToolCall, ToolExecutor, ToolRegistry, ToolResultCache
+from tests.conftest import TENANT_A
+
+
+def _executor(cache=None, parallelism=4):
+    registry = ToolRegistry()
+    calls = []
+
+    @registry.register("echo")
+    def echo(query):
+        calls.append(query)
+        return query.upper()
+
+    @registry.register("broken")
+    def broken(query):
+        calls.append(query)
+        raise RuntimeError("down")
+
+    return ToolExecutor(registry, cache, parallelism), registry, calls
+
+
+def test_calls_of_one_step_run_concurrently():
+    executor, registry, _ = _executor()
+    barrier = threading.Barrier(3, timeout=2)
+
+    @registry.register("wait")
+    def wait(query):
+        barrier.wait()  # only passes if all three calls run at once
+        return query
+
+    calls = [ToolCall(i, "wait", {"query": str(i)}) for i in range(3)]
+    results = executor.execute(0, calls)
+
+    assert [r.output for r in results] == ["0", "1", "2"]
+    assert not any(r.error for r in results)
+
+
+def test_results_are_memoized_per_tool_and_arguments():
+    executor, _, calls = _executor(ToolResultCache(ttl=60))
+
+    first = executor.execute(0, [ToolCall(1, "echo", {"query": "a"})])
+    again = executor.execute(1, [ToolCall(1, "echo", {"query": "a"})])
+    other = executor.execute(1, [ToolCall(2, "echo", {"query": "a"})])
+
+    assert calls == ["a", "a"]  # tool 2 is a different key
+    assert (first[0].cached, again[0].cached, other[0].cached) == (False, True, False)
+    assert again[0].output == "A"
+
+    # Renamed, tool 1 maps to another implementation.
+    (renamed,) = executor.execute(2, [ToolCall(1, "broken", {"query": "a"})])
+    assert not renamed.cached and renamed.error
+
+
+def test_expired_and_failed_results_are_not_reused():
+    executor, _, calls = _executor(ToolResultCache(ttl=0))
+    executor.execute(0, [ToolCall(1, "echo", {"query": "a"})])
+    executor.execute(0, [ToolCall(1, "echo", {"query": "a"})])
+    assert calls == ["a", "a"]
+
+    executor, _, calls = _executor(ToolResultCache(ttl=60))
+    for _ in range(2):
+        (result,) = executor.execute(0, [ToolCall(3, "broken", {"query": "b"})])
+        assert result.error and result.output == "RuntimeError: down"
+    assert calls == ["b", "b"]
+
+
+def test_run_executes_tools_and_persists_steps(client, session_factory):
+    ids = [
+        client.post(
+            "/tools", json={"name": name, "description": "d"}, headers=TENANT_A
+        ).json()["id"]
+        for name in ("search", "word_count", "calc")
+    ]
+    agent_id = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": ids},
+        headers=TENANT_A,
+    ).json()["id"]
+
+    def run():
+        res = client.post(
+            f"/agents/{agent_id}/run",
+            json={"task": "three small words", "model": "gpt-4o"},
+            headers=TENANT_A,
+        )
+        assert res.status_code == 200
+        return res.json()
+
+    body = run()
+    # "calc" has no implementation, so it is never called.
+    assert [s["tool_name"] for s in body["steps"]] == ["search", "word_count"]
+    assert body["steps"][1]["output"] == "3"
+    assert body["steps"][0]["arguments"] == {"query": "three small words"}
+    assert not any(s["cached"] for s in body["steps"])
+
+    assert all(s["cached"] for s in run()["steps"])
+
+    with session_factory() as db:
+        rows = db.scalars(select(ExecutionStep)).all()
+    assert len(rows) == 4
+    assert {r.tenant_id for r in rows} == {"tenant_a"}
+
+
+def test_run_without_runnable_tools_has_no_steps(client):
+    agent_id = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": []},
+        headers=TENANT_A,
+    ).json()["id"]
+    res = client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": "t", "model": "gpt-4o"},
+        headers=TENANT_A,
+    )
+    assert res.json()["steps"] == []
+
+
+def test_updating_a_tool_drops_its_cached_results(client):
+    tool_id = client.post(
+        "/tools", json={"name": "search", "description": "d"}, headers=TENANT_A
+    ).json()["id"]
+    agent_id = client.post(
+        "/agents",
+        json={"name": "a", "role": "r", "description": "d", "tool_ids": [tool_id]},
+        headers=TENANT_A,
+    ).json()["id"]
+
+    def cached():
+        res = client.post(
+            f"/agents/{agent_id}/run",
+            json={"task": "look it up", "model": "gpt-4o"},
+            headers=TENANT_A,
+        )
+        return [s["cached"] for s in res.json()["steps"]]
+
+    assert cached() == [False]
+    assert cached() == [True]
+    res = client.put(f"/tools/{tool_id}", json={"description": "new"}, headers=TENANT_A)
+    assert res.status_code == 200
+    assert cached() == [False]
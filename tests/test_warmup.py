@@ -0,0 +1,31 @@
+import asyncio
+
+from sqlalchemy import create_engine, func, select
+
+from app.db import interning
+from app.db.models import Agent, AgentExecution, ModelName, RunRollup, TenantName
+from app.main import app
+from app.warmup import _compile_hot_statements, warm_routes, warm_up
+
+
+def test_hot_statements_compiled_without_leaving_rows(session_factory):
+    engine = session_factory.kw["bind"]
+    cached_before = len(engine._compiled_cache)
+
+    _compile_hot_statements(engine)
+
+    assert len(engine._compiled_cache) > cached_before
+    with session_factory() as db:
+        for model in (Agent, AgentExecution, RunRollup, TenantName, ModelName):
+            assert db.scalar(select(func.count()).select_from(model)) == 0
+    # ...nor dictionary ids that were rolled back with them.
+    assert engine not in interning.tenants._ids
+
+
+def test_warm_up_tolerates_unmigrated_database(tmp_path):
+    warm_up(create_engine(f"sqlite:///{tmp_path / 'empty.db'}"))
+
+
+def test_warm_routes_does_not_touch_data(client):
+    asyncio.run(warm_routes(app))
+    assert client.get("/agents", headers={"X-API-Key": "key_tenant_a"}).json() == []
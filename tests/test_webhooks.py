@@ -0,0 +1,218 @@
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import rate_limit, replay, webhooks
+from tests.conftest import TENANT_A, TENANT_B
+
+
+class Receiver:
+    """A local stand-in for a client's webhook endpoint."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.requests: list[tuple[dict, bytes]] = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.requests.append((dict(self.headers), body))
+                failing = receiver.failures > 0
+                receiver.failures -= 1
+                self.send_response(500 if failing else 204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def deliveries(self) -> list[dict]:
+        return [d for _, body in self.requests for d in json.loads(body)["deliveries"]]
+
+
+@pytest.fixture
+def receiver(monkeypatch):
+    # Listens on localhost, which webhooks are otherwise kept away from.
+    monkeypatch.setattr(webhooks, "ALLOW_PRIVATE", True)
+    r = Receiver()
+    yield r
+    r.server.shutdown()
+    r.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_REQUESTS", 1000)
+
+
+@pytest.fixture
+def dispatcher():
+    # Driven by the tests with dispatch(); its thread is never started.
+    return webhooks.WebhookDispatcher(workers=2, seed=0)
+
+
+def _register(client, url, headers=TENANT_A):
+    res = client.post("/webhooks", json={"url": url}, headers=headers)
+    assert res.status_code == 201
+    return res.json()
+
+
+def _agent(client, name="a", headers=TENANT_A):
+    return client.post(
+        "/agents",
+        json={"name": name, "role": "r", "description": "d", "tool_ids": []},
+        headers=headers,
+    ).json()["id"]
+
+
+def _run(client, agent_id, task, headers=TENANT_A):
+    res = client.post(
+        f"/agents/{agent_id}/run",
+        json={"task": task, "model": "gpt-4o"},
+        headers=headers,
+    )
+    assert res.status_code == 200
+
+
+def _deliveries(client, webhook_id, headers=TENANT_A):
+    return client.get(f"/webhooks/{webhook_id}/deliveries", headers=headers).json()
+
+
+def test_finished_runs_are_delivered_in_one_signed_batch(client, receiver, dispatcher):
+    hook = _register(client, receiver.url)
+    agent_id = _agent(client)
+    for i in range(3):
+        _run(client, agent_id, f"task {i}")
+
+    assert dispatcher.dispatch("tenant_a") == 3
+
+    assert len(receiver.requests) == 1
+    headers, body = receiver.requests[0]
+    assert webhooks.verify(hook["secret"], headers["X-Webhook-Signature"], body)
+    assert not webhooks.verify("wrong", headers["X-Webhook-Signature"], body)
+    events = receiver.deliveries()
+    assert [e["event"] for e in events] == ["run.finished"] * 3
+    assert [e["data"]["task"] for e in events] == ["task 0", "task 1", "task 2"]
+    assert {e["data"]["status"] for e in events} == {"completed"}
+    assert events[0]["data"]["agent_id"] == agent_id
+    assert events[0]["data"]["response"]
+
+    items = _deliveries(client, hook["id"])["items"]
+    assert [(d["status"], d["attempts"]) for d in items] == [("delivered", 1)] * 3
+    assert dispatcher.dispatch("tenant_a") == 0
+
+
+def test_failed_batches_are_retried_then_given_up(
+    client, receiver, dispatcher, monkeypatch
+):
+    monkeypatch.setattr(webhooks, "MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(webhooks, "RETRY_BASE_SECONDS", 0)
+    receiver.failures = 5
+    hook = _register(client, receiver.url)
+    agent_id = _agent(client)
+    _run(client, agent_id, "flaky")
+
+    dispatcher.dispatch("tenant_a")
+    (first,) = _deliveries(client, hook["id"])["items"]
+    assert (first["status"], first["attempts"]) == ("pending", 1)
+    assert first["last_error"] == "HTTP 500"
+    dispatcher.dispatch("tenant_a")
+    dispatcher.dispatch("tenant_a")
+
+    (last,) = _deliveries(client, hook["id"])["items"]
+    assert (last["status"], last["attempts"]) == ("failed", 3)
+    assert dispatcher.dispatch("tenant_a") == 0
+    assert [d["attempt"] for d in receiver.deliveries()] == [1, 2, 3]
+
+    # With a real backoff the retry waits.
+    monkeypatch.setattr(webhooks, "RETRY_BASE_SECONDS", 3600)
+    _run(client, agent_id, "later")
+    assert dispatcher.dispatch("tenant_a") == 1
+    assert dispatcher.dispatch("tenant_a") == 0
+
+
+def test_retry_delay_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(webhooks, "RETRY_BASE_SECONDS", 2)
+    monkeypatch.setattr(webhooks, "RETRY_MAX_SECONDS", 60)
+    rng = random.Random(0)
+
+    delays = {a: [webhooks.retry_delay(a, rng) for _ in range(200)] for a in (1, 4, 10)}
+
+    assert max(delays[1]) <= 2 and max(delays[4]) <= 16 and max(delays[10]) <= 60
+    assert max(delays[10]) > 30
+    assert len(set(delays[4])) == 200
+
+
+def test_webhooks_and_events_are_tenant_scoped(client, receiver, dispatcher):
+    hook = _register(client, receiver.url)
+    _run(client, _agent(client, "b", headers=TENANT_B), "other", headers=TENANT_B)
+
+    assert dispatcher.dispatch("tenant_b") == 0
+    assert client.get("/webhooks", headers=TENANT_B).json() == []
+    listed = client.get("/webhooks", headers=TENANT_A).json()
+    assert [w["id"] for w in listed] == [hook["id"]] and "secret" not in listed[0]
+    res = client.delete(f"/webhooks/{hook['id']}", headers=TENANT_B)
+    assert res.status_code == 404
+    assert client.delete(f"/webhooks/{hook['id']}", headers=TENANT_A).status_code == 204
+
+
+def test_finished_replay_jobs_are_delivered(client, receiver, dispatcher, monkeypatch):
+    def start(*args):
+        worker = threading.Thread(target=replay.runner.run, args=args)
+        worker.start()
+        worker.join()
+
+    monkeypatch.setattr(replay.runner, "start", start)
+    _run(client, _agent(client), "replay me")
+    _register(client, receiver.url)
+
+    job = client.post(
+        "/replays", json={"target_model": "gpt-4o"}, headers=TENANT_A
+    ).json()
+    dispatcher.dispatch("tenant_a")
+
+    (event,) = receiver.deliveries()
+    assert event["event"] == "replay.finished"
+    assert event["data"]["id"] == job["id"]
+    assert event["data"]["status"] == "completed"
+    assert event["data"]["processed"] == 1
+
+
+def test_only_http_urls_are_accepted(client):
+    for url in ("ftp://example.com/hook", "/relative", "not a url"):
+        res = client.post("/webhooks", json={"url": url}, headers=TENANT_A)
+        assert res.status_code == 400
+
+
+def test_webhooks_cannot_target_internal_addresses(client):
+    for url in (
+        "http://127.0.0.1:8000/hook",
+        "http://localhost/hook",
+        "http://10.0.0.5/hook",
+        "http://169.254.169.254/latest/meta-data",
+        "http://[::1]/hook",
+        "http://[::ffff:192.168.0.1]/hook",
+    ):
+        res = client.post("/webhooks", json={"url": url}, headers=TENANT_A)
+        assert res.status_code == 400, url
+        assert "non-public address" in res.json()["detail"]
+
+
+def test_host_is_checked_again_when_sending(client, receiver, dispatcher, monkeypatch):
+    hook = _register(client, receiver.url)
+    _run(client, _agent(client), "rebound")
+    monkeypatch.setattr(webhooks, "ALLOW_PRIVATE", False)
+
+    assert dispatcher.dispatch("tenant_a") == 1
+
+    assert receiver.requests == []
+    (delivery,) = _deliveries(client, hook["id"])["items"]
+    assert delivery["status"] == "pending"
+    assert "non-public address 127.0.0.1" in delivery["last_error"]